@@ -0,0 +1,110 @@
+# agrupamento.py
+import threading
+
+
+class _Pendente:
+    """Um item aguardando a gravação do seu grupo"""
+
+    def __init__(self, item):
+        self.item = item
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class AgrupadorEscritas:
+    """
+    Junta escritas concorrentes sobre a mesma chave (ex: o mesmo produto) e as
+    grava numa única transação, em vez de uma transação por chamador disputando
+    o mesmo lock de linha.
+
+    O primeiro chamador de uma chave vira o líder do grupo: espera `janela`
+    segundos (ou até o grupo chegar a `max_lote` itens), grava todos com
+    `gravar_lote` e entrega a cada chamador o seu resultado. Se a gravação do
+    grupo falhar, cada item é regravado sozinho com `gravar_um`, para que cada
+    chamador receba o próprio resultado ou erro. `gravar_lote` só deve levantar
+    exceção quando nada foi gravado.
+
+    O agrupamento depende de chamadores concorrentes no mesmo processo (servidor
+    com threads); com um chamador por vez cada grupo tem um item e a janela é
+    só espera.
+
+    Args:
+        gravar_lote (callable): Recebe a lista de itens e retorna um resultado por item
+        gravar_um (callable): Grava um único item e retorna o seu resultado
+        janela (float): Segundos de espera para juntar o grupo
+        chaves (iterable): Chaves agrupadas; None agrupa todas
+        max_lote (int): Tamanho a partir do qual o grupo é gravado sem esperar a janela
+    """
+
+    def __init__(self, gravar_lote, gravar_um, janela=0.005, chaves=(), max_lote=200):
+        self.gravar_lote = gravar_lote
+        self.gravar_um = gravar_um
+        self.janela = janela
+        self.chaves = None if chaves is None else set(chaves)
+        self.max_lote = max_lote
+        self._lock = threading.Lock()
+        self._grupos = {}  # chave -> (pendentes, evento de grupo cheio)
+        self._stats = {'itens': 0, 'grupos': 0, 'maior_grupo': 0, 'regravados': 0}
+
+    def ativo_para(self, chave):
+        """Indica se as escritas desta chave devem ser agrupadas"""
+        return self.janela > 0 and (self.chaves is None or chave in self.chaves)
+
+    def gravar(self, chave, item):
+        """Grava `item` junto com os demais da mesma chave e retorna o seu resultado"""
+        pendente = _Pendente(item)
+        with self._lock:
+            self._stats['itens'] += 1
+            grupo = self._grupos.get(chave)
+            lider = grupo is None
+            if lider:
+                grupo = self._grupos[chave] = ([], threading.Event())
+            pendentes, cheio = grupo
+            pendentes.append(pendente)
+            if len(pendentes) >= self.max_lote:
+                cheio.set()
+
+        if lider:
+            cheio.wait(self.janela)
+            with self._lock:
+                pendentes, _ = self._grupos.pop(chave)
+                self._stats['grupos'] += 1
+                self._stats['maior_grupo'] = max(self._stats['maior_grupo'], len(pendentes))
+            self._gravar_grupo(pendentes)
+
+        pendente.pronto.wait()
+        if pendente.erro is not None:
+            raise pendente.erro
+        return pendente.resultado
+
+    def _gravar_grupo(self, pendentes):
+        try:
+            try:
+                resultados = self.gravar_lote([p.item for p in pendentes])
+            except Exception:
+                # Só a falha da gravação do grupo leva à regravação item a item
+                resultados = None
+            if resultados is not None:
+                for pendente, resultado in zip(pendentes, resultados):
+                    pendente.resultado = resultado
+                return
+            with self._lock:
+                self._stats['regravados'] += 1
+            for pendente in pendentes:
+                try:
+                    pendente.resultado = self.gravar_um(pendente.item)
+                except Exception as e:
+                    pendente.erro = e
+        finally:
+            for pendente in pendentes:
+                pendente.pronto.set()
+
+    def estatisticas(self):
+        """Retorna contadores de itens, grupos gravados e grupos regravados item a item"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['media_por_grupo'] = stats['itens'] / stats['grupos'] if stats['grupos'] else 0.0
+        stats['janela'] = self.janela
+        stats['chaves'] = 'todas' if self.chaves is None else sorted(self.chaves)
+        return stats
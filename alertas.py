@@ -0,0 +1,234 @@
+# alertas.py
+import html
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class SMTPLocal:
+    """
+    Substituto do servidor SMTP para testes e desenvolvimento.
+    Guarda as mensagens enviadas em memória em vez de enviá-las.
+    """
+
+    enviadas = []
+
+    def send_message(self, msg):
+        SMTPLocal.enviadas.append(msg)
+
+    def quit(self):
+        pass
+
+
+def conectar_smtp():
+    """
+    Abre uma sessão SMTP autenticada com as configurações do .env
+
+    Returns:
+        Objeto com send_message() e quit(), ou None se a configuração estiver incompleta
+    """
+    if os.getenv("EMAIL_BACKEND") == "local":
+        return SMTPLocal()
+
+    email_host = os.getenv("EMAIL_HOST")
+    email_port = os.getenv("EMAIL_PORT")
+    email_user = os.getenv("EMAIL_USER")
+    email_password = os.getenv("EMAIL_PASSWORD")
+
+    if not all([email_host, email_port, email_user, email_password]):
+        print("Configurações de email incompletas. Verifique o arquivo .env")
+        return None
+
+    server = smtplib.SMTP(email_host, int(email_port))
+    server.starttls()  # Iniciar conexão segura
+    server.login(email_user, email_password)
+    return server
+
+
+def montar_resumo(produtos):
+    """Monta o assunto e o corpo HTML de um email com vários produtos em estoque baixo"""
+    if len(produtos) == 1:
+        assunto = f"ALERTA: Estoque baixo do produto {produtos[0]['nome']}"
+    else:
+        assunto = f"ALERTA: {len(produtos)} produtos com estoque baixo"
+
+    # Nomes vêm do cadastro: escapados para não injetar HTML no email
+    linhas = "".join(
+        f"""
+            <tr>
+                <td>{html.escape(str(p['id']))}</td>
+                <td>{html.escape(str(p['nome']))}</td>
+                <td>{html.escape(str(p.get('categoria_nome', 'N/A')))}</td>
+                <td>{html.escape(str(p['quantidade']))}</td>
+                <td>{html.escape(str(p['quantidade_minima']))}</td>
+            </tr>"""
+        for p in produtos
+    )
+
+    mensagem = f"""
+    <html>
+    <body>
+        <h2>Alerta de Estoque Baixo</h2>
+        <p>Os produtos abaixo estão com estoque abaixo do mínimo:</p>
+
+        <table border="1" cellpadding="4">
+            <tr>
+                <th>ID</th><th>Nome</th><th>Categoria</th>
+                <th>Quantidade Atual</th><th>Quantidade Mínima</th>
+            </tr>{linhas}
+        </table>
+
+        <p>Por favor, verifique e reponha o estoque quando possível.</p>
+    </body>
+    </html>
+    """
+    return assunto, mensagem
+
+
+class AlertaWorker:
+    """
+    Processa alertas de estoque baixo em segundo plano.
+
+    O handler da requisição só chama enfileirar(); a thread do worker agrupa os
+    produtos recebidos durante `janela` segundos, descarta repetidos e produtos
+    alertados há menos de `intervalo` segundos, consulta o estoque atual de todos
+    de uma vez e envia um email-resumo por destinatário numa única sessão SMTP.
+
+    Args:
+        janela (float): Segundos de espera para agrupar alertas num mesmo envio
+        intervalo (float): Intervalo mínimo entre dois alertas do mesmo produto
+        conectar (callable): Fábrica da sessão SMTP (troque por SMTPLocal em testes)
+    """
+
+    def __init__(self, janela=5, intervalo=3600, conectar=conectar_smtp):
+        self.janela = janela
+        self.intervalo = intervalo
+        self.conectar = conectar
+        self._fila = queue.Queue()
+        self._ultimo_alerta = {}  # produto_id -> momento do último alerta
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'enfileirados': 0, 'suprimidos': 0, 'emails': 0, 'falhas': 0}
+
+    def iniciar(self):
+        """Inicia a thread do worker, se ainda não estiver rodando"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._executar, name="alerta-worker", daemon=True
+                )
+                self._thread.start()
+
+    def enfileirar(self, produto_id, destinatario):
+        """Agenda a verificação de estoque baixo de um produto"""
+        self.iniciar()
+        self._contar('enfileirados')
+        self._fila.put((int(produto_id), destinatario))
+
+    def _contar(self, evento, quantidade=1):
+        # enfileirar() roda nas threads das requisições, em paralelo com o worker
+        with self._lock:
+            self._stats[evento] += quantidade
+
+    def _coletar_lote(self):
+        """Bloqueia até o primeiro item e junta o que chegar durante a janela"""
+        pendentes = {}  # produto_id -> destinatários
+        produto_id, destinatario = self._fila.get()
+        pendentes.setdefault(produto_id, set()).add(destinatario)
+
+        limite = time.monotonic() + self.janela
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                produto_id, destinatario = self._fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            pendentes.setdefault(produto_id, set()).add(destinatario)
+        return pendentes
+
+    def processar(self, pendentes):
+        """
+        Consulta os produtos pendentes e envia os resumos
+
+        Args:
+            pendentes (dict): produto_id -> conjunto de emails a alertar
+        """
+        from models import Produto
+
+        agora = time.monotonic()
+        ids = []
+        for produto_id in pendentes:
+            ultimo = self._ultimo_alerta.get(produto_id)
+            if ultimo is not None and agora - ultimo < self.intervalo:
+                self._contar('suprimidos')
+                continue
+            ids.append(produto_id)
+
+        if not ids:
+            return
+
+        por_destinatario = {}
+        for produto in Produto.com_estoque_baixo_por_ids(ids):
+            for destinatario in pendentes[produto['id']]:
+                por_destinatario.setdefault(destinatario, []).append(produto)
+
+        if not por_destinatario:
+            return
+
+        server = self.conectar()
+        if server is None:
+            self._contar('falhas', len(por_destinatario))
+            return
+
+        try:
+            remetente = os.getenv("EMAIL_USER")
+            for destinatario, produtos in por_destinatario.items():
+                assunto, mensagem = montar_resumo(produtos)
+                msg = MIMEMultipart()
+                msg['From'] = remetente
+                msg['To'] = destinatario
+                msg['Subject'] = assunto
+                msg.attach(MIMEText(mensagem, 'html'))
+                try:
+                    server.send_message(msg)
+                    self._contar('emails')
+                    for produto in produtos:
+                        self._ultimo_alerta[produto['id']] = agora
+                except Exception as e:
+                    self._contar('falhas')
+                    print(f"Erro ao enviar email para {destinatario}: {e}")
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    def _executar(self):
+        while True:
+            pendentes = self._coletar_lote()
+            try:
+                self.processar(pendentes)
+            except Exception as e:
+                print(f"Erro ao processar alertas de estoque: {e}")
+
+    def estatisticas(self):
+        """Retorna contadores do worker e o tamanho atual da fila"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['na_fila'] = self._fila.qsize()
+        return stats
+
+
+worker_alertas = AlertaWorker(
+    janela=float(os.getenv("ALERTA_JANELA", 5)),
+    intervalo=float(os.getenv("ALERTA_INTERVALO", 3600)),
+)
@@ -1,23 +1,147 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, make_response
 from flask_cors import CORS
 import jwt
 import datetime
 from functools import wraps
 from dotenv import load_dotenv
 import os
+import io
+import csv
+import json
+import zlib
+import hmac
+import operator
 
-from models import Usuario, Categoria, Produto, Movimento
-from utils import validar_campos_obrigatorios, validar_email, verificar_enviar_alertas
+from database import Database, consistencia_leitura
+from models import (Usuario, Categoria, Produto, Movimento, ResumoMovimento, VersaoTabela, cache_modelos,
+                    agrupador_movimentos, montar_pagina)
+from utils import validar_campos_obrigatorios, validar_email, linhas_para_json
+from alertas import worker_alertas
+from importacao import importar_produtos, ler_linhas, detectar_formato
+from historico import estoque_em
+from reposicao import aplicar_sugestoes, listar_sugestoes
+from senhas import servico_senhas, ErroSobrecarga
+from metricas import metricas
+from busca import indice_produtos, ErroIndiceIndisponivel
+from respostas import configurar_json, comprimir_resposta
 
 load_dotenv()
 app = Flask(__name__)
 CORS(app)
+configurar_json(app)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "chave_padrao")
+# Se ativo, o usuário é montado a partir das claims assinadas do token, sem consultar o banco
+JWT_CONFIAR_CLAIMS = os.getenv("JWT_CONFIAR_CLAIMS", "0") == "1"
+
+LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", 100))
+LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", 1000))
+LOTE_MAXIMO = int(os.getenv("MOVIMENTO_LOTE_MAXIMO", 1000))
+# /metrics exige "Authorization: Bearer <METRICAS_TOKEN>" se definido, senão um JWT
+# de usuário; só fica aberto com METRICAS_ABERTAS=1 (ex: porta interna do coletor)
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")
+METRICAS_ABERTAS = os.getenv("METRICAS_ABERTAS", "0") == "1"
+
+# Índice de busca de GET /produtos?q=, carregado em segundo plano
+BUSCA_INDICE = os.getenv("BUSCA_INDICE", "1") == "1"
+
+# ------------------------
+# RESPOSTAS CONDICIONAIS (ETag)
+# ------------------------
+def calcular_etag(tabelas, versoes, caminho):
+    """Monta o ETag a partir das versões das tabelas e do caminho com query string"""
+    # A query string entra no ETag porque filtros e paginação mudam o corpo
+    assinatura = "-".join(f"{tabela}{versoes[tabela]}" for tabela in tabelas)
+    return f"{assinatura}-{zlib.crc32(caminho.encode('utf-8')):08x}"
+
+def resposta_condicional(*tabelas):
+    """
+    Gera ETag a partir da versão das tabelas (ver VersaoTabela) e responde 304
+    sem executar a rota quando o If-None-Match do cliente ainda é válido
+    """
+    def decorador(f):
+        @wraps(f)
+        def decorator(*args, **kwargs):
+            try:
+                versoes = VersaoTabela.obter(*tabelas)
+            except Exception as e:
+                print(f"Erro ao obter versões de {tabelas}: {e}")
+                versoes = None
+            if versoes is None:
+                return f(*args, **kwargs)
+
+            etag = calcular_etag(tabelas, versoes, request.full_path)
+
+            if request.if_none_match.contains_weak(etag):
+                resposta = app.response_class(status=304)
+            else:
+                resposta = make_response(f(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            resposta.set_etag(etag, weak=True)
+            resposta.headers['Cache-Control'] = 'no-cache'
+            return resposta
+        return decorator
+    return decorador
+
+# ------------------------
+# PAGINAÇÃO
+# ------------------------
+def parametros_paginacao(args=None):
+    """
+    Lê limit, after e fields da query string (ou de `args`, se informado)
+
+    Returns:
+        tuple: (paginado, limite, cursor, campos). `paginado` é False quando o
+        cliente não pediu limit nem after, mantendo a resposta em lista completa.
+    """
+    args = request.args if args is None else args
+    paginado = 'limit' in args or 'after' in args
+    limite = args.get('limit', LIMITE_PADRAO, type=int)
+    if limite is None or limite < 1:
+        raise ValueError("Parâmetro limit inválido")
+    limite = min(limite, LIMITE_MAXIMO)
+    cursor = args.get('after') or None
+    fields = args.get('fields')
+    campos = [campo.strip() for campo in fields.split(',') if campo.strip()] if fields else None
+    return paginado, limite, cursor, campos
+
+# ------------------------
+# INSTRUMENTAÇÃO
+# ------------------------
+@app.before_request
+def iniciar_metricas():
+    metricas.iniciar_requisicao()
+
+@app.before_request
+def iniciar_sessao_leitura():
+    # Leituras da requisição podem ir para réplicas até a primeira escrita (ver database.py)
+    consistencia_leitura.iniciar()
+
+@app.after_request
+def registrar_metricas(resposta):
+    rota = request.url_rule.rule if request.url_rule else 'nao_encontrada'
+    requisicao, duracao = metricas.finalizar_requisicao(request.method, rota, resposta.status_code)
+    if requisicao is not None:
+        resposta.headers['Server-Timing'] = requisicao.server_timing(duracao)
+    return resposta
+
+@app.after_request
+def comprimir(resposta):
+    # Registrado depois de registrar_metricas, então roda antes e entra no tempo medido
+    return comprimir_resposta(resposta, request)
 
 # ------------------------
 # AUTENTICAÇÃO JWT
 # ------------------------
+@app.before_request
+def iniciar_indice_busca():
+    # Na primeira requisição e não na importação: scripts e benchmarks importam
+    # este módulo sem servir requisições (app_async chama este mesmo gancho)
+    if BUSCA_INDICE:
+        indice_produtos.iniciar()
+
 def token_requerido(f):
     @wraps(f)
     def decorator(*args, **kwargs):
@@ -27,9 +151,18 @@ def token_requerido(f):
         try:
             token = token.replace("Bearer ", "")
             dados = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            usuario = Usuario.obter_por_id(dados['id'])
+            if JWT_CONFIAR_CLAIMS and 'nivel_acesso' in dados:
+                usuario = Usuario(
+                    id=dados['id'],
+                    nome=dados.get('nome'),
+                    email=dados.get('email'),
+                    nivel_acesso=dados['nivel_acesso']
+                )
+            else:
+                usuario = Usuario.obter_por_id_em_cache(dados['id'])
             if not usuario:
                 raise Exception("Usuário não encontrado")
+            consistencia_leitura.identificar(usuario.id)
             return f(usuario, *args, **kwargs)
         except Exception as e:
             return jsonify({'erro': 'Token inválido', 'detalhes': str(e)}), 401
@@ -53,6 +186,8 @@ def criar_usuario():
         usuario = Usuario(nome=dados['nome'], email=dados['email'], senha=dados['senha'])
         usuario_id = usuario.salvar()
         return jsonify({"mensagem": "Usuário criado", "id": usuario_id}), 201
+    except ErroSobrecarga as e:
+        return jsonify({"erro": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"erro": "Erro ao criar usuário", "detalhes": str(e)}), 500
 
@@ -66,16 +201,20 @@ def login():
                 "id": usuario.id,
                 "email": usuario.email,
                 "nome": usuario.nome,
+                "nivel_acesso": usuario.nivel_acesso,
                 "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=3)
             }
             token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
             return jsonify({"token": token})
         return jsonify({"erro": "Credenciais inválidas"}), 401
+    except ErroSobrecarga as e:
+        return jsonify({"erro": str(e)}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"erro": "Erro no login", "detalhes": str(e)}), 500
 
 @app.route("/categorias", methods=["GET"])
 @token_requerido
+@resposta_condicional("categorias")
 def listar_categorias(usuario):
     try:
         return jsonify(Categoria.listar())
@@ -99,12 +238,13 @@ def criar_categoria(usuario):
 
 @app.route("/categorias/<int:id>", methods=["GET"])
 @token_requerido
+@resposta_condicional("categorias")
 def obter_categoria(usuario, id):
     try:
         categoria = Categoria.obter_por_id(id)
         if not categoria:
             return jsonify({"erro": "Categoria não encontrada"}), 404
-        return jsonify(vars(categoria))
+        return jsonify(categoria.para_dict())
     except Exception as e:
         return jsonify({"erro": "Erro ao obter categoria", "detalhes": str(e)}), 500
 
@@ -133,11 +273,32 @@ def excluir_categoria(usuario, id):
     except Exception as e:
         return jsonify({"erro": "Erro ao excluir categoria", "detalhes": str(e)}), 500
 
+def buscar_produtos(args, limite, cursor, campos):
+    """Busca de GET /produtos?q=, sempre paginada, ordenada por relevância"""
+    itens = indice_produtos.buscar(
+        args.get('q', ''),
+        categoria_id=args.get('categoria_id', type=int),
+        estoque_baixo=args.get('estoque_baixo') in ('1', 'true'),
+        limite=limite,
+        apos=cursor,
+    )
+    return montar_pagina(itens, limite, ('relevancia', 'nome', 'id'), campos)
+
 @app.route("/produtos", methods=["GET"])
 @token_requerido
+@resposta_condicional("produtos")
 def listar_produtos(usuario):
     try:
-        return jsonify(Produto.listar())
+        paginado, limite, cursor, campos = parametros_paginacao()
+        if 'q' in request.args:
+            return jsonify(buscar_produtos(request.args, limite, cursor, campos))
+        if paginado:
+            return jsonify(Produto.listar_paginado(limite, apos=cursor, campos=campos))
+        return jsonify(Produto.listar(campos))
+    except ErroIndiceIndisponivel as e:
+        return jsonify({"erro": str(e)}), 503, {"Retry-After": "5"}
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
     except Exception as e:
         return jsonify({"erro": "Erro ao listar produtos", "detalhes": str(e)}), 500
 
@@ -157,14 +318,93 @@ def criar_produto(usuario):
     except Exception as e:
         return jsonify({"erro": "Erro ao criar produto", "detalhes": str(e)}), 500
 
+@app.route("/produtos/importar", methods=["POST"])
+@token_requerido
+def importar_produtos_em_massa(usuario):
+    try:
+        arquivo = request.files.get('arquivo')
+        if arquivo:
+            stream = arquivo.stream
+            formato = request.args.get('formato') or detectar_formato(arquivo.filename or '')
+        else:
+            stream = request.stream
+            tipos = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/json': 'json'}
+            formato = request.args.get('formato') or tipos.get(request.mimetype)
+
+        if formato not in ('csv', 'ndjson', 'json'):
+            return jsonify({"erro": "Formato inválido, use csv, ndjson ou json"}), 400
+
+        tamanho_lote = request.args.get('lote', 1000, type=int)
+        texto = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        resultado = importar_produtos(ler_linhas(texto, formato), tamanho_lote=max(tamanho_lote, 1))
+        return jsonify(resultado)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao importar produtos", "detalhes": str(e)}), 500
+
+@app.route("/produtos/estoque-baixo", methods=["GET"])
+@token_requerido
+def listar_estoque_baixo(usuario):
+    try:
+        return jsonify(Produto.produtos_com_estoque_baixo())
+    except Exception as e:
+        return jsonify({"erro": "Erro ao listar produtos com estoque baixo", "detalhes": str(e)}), 500
+
+@app.route("/produtos/estoque-em", methods=["GET"])
+@token_requerido
+def listar_estoque_em(usuario):
+    try:
+        data = request.args.get('data')
+        if not data:
+            return jsonify({"erro": "Informe a data"}), 400
+        return jsonify(estoque_em(data, request.args.get('produto_id', type=int)))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao calcular estoque na data", "detalhes": str(e)}), 500
+
+@app.route("/produtos/reposicao", methods=["GET"])
+@token_requerido
+def listar_reposicao(usuario):
+    try:
+        paginado, limite, cursor, _ = parametros_paginacao()
+        return jsonify(listar_sugestoes(
+            limite if paginado else None, cursor,
+            divergentes=request.args.get('divergentes') in ('1', 'true')
+        ))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao listar pontos de reposição", "detalhes": str(e)}), 500
+
+@app.route("/produtos/reposicao/aplicar", methods=["POST"])
+@token_requerido
+def aplicar_reposicao(usuario):
+    try:
+        dados = request.get_json(silent=True) or {}
+        produto_ids = dados.get('produto_ids')
+        if produto_ids is not None and not isinstance(produto_ids, list):
+            return jsonify({"erro": "produto_ids deve ser uma lista"}), 400
+        if 'min_dias_com_saida' in dados:
+            atualizados = aplicar_sugestoes(produto_ids, int(dados['min_dias_com_saida']))
+        else:
+            atualizados = aplicar_sugestoes(produto_ids)
+        return jsonify({"mensagem": "Pontos de reposição aplicados", "atualizados": atualizados})
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao aplicar pontos de reposição", "detalhes": str(e)}), 500
+
 @app.route("/produtos/<int:id>", methods=["GET"])
 @token_requerido
+@resposta_condicional("produtos")
 def obter_produto(usuario, id):
     try:
         produto = Produto.obter_por_id(id)
         if not produto:
             return jsonify({"erro": "Produto não encontrado"}), 404
-        return jsonify(vars(produto))
+        return jsonify(produto.para_dict())
     except Exception as e:
         return jsonify({"erro": "Erro ao obter produto", "detalhes": str(e)}), 500
 
@@ -192,6 +432,8 @@ def excluir_produto(usuario, id):
     try:
         Produto.excluir(id)
         return jsonify({"mensagem": "Produto excluído"})
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
     except Exception as e:
         return jsonify({"erro": "Erro ao excluir produto", "detalhes": str(e)}), 500
 
@@ -215,13 +457,47 @@ def registrar_movimento(usuario):
 
         movimento_id = movimento.salvar()
 
-        if dados['tipo_movimento'] in ["saida", "ajuste"]:
-            verificar_enviar_alertas(usuario.email)
+        if movimento.cruzou_estoque_minimo:
+            # O email é enviado pelo worker de alertas, fora da requisição
+            worker_alertas.enfileirar(dados['produto_id'], usuario.email)
 
         return jsonify({"mensagem": "Movimento registrado", "id": movimento_id}), 201
     except Exception as e:
         return jsonify({"erro": "Erro ao registrar movimento", "detalhes": str(e)}), 500
     
+@app.route("/movimentos/lote", methods=["POST"])
+@token_requerido
+def registrar_movimentos_lote(usuario):
+    try:
+        dados = request.json
+        if isinstance(dados, list):
+            dados = {"movimentos": dados}
+
+        movimentos = dados.get("movimentos") if isinstance(dados, dict) else None
+        if not isinstance(movimentos, list) or not movimentos:
+            return jsonify({"erro": "Informe uma lista de movimentos"}), 400
+        if len(movimentos) > LOTE_MAXIMO:
+            return jsonify({"erro": f"O lote aceita no máximo {LOTE_MAXIMO} movimentos"}), 400
+
+        modo = dados.get("modo", "tudo_ou_nada")
+        if modo not in ("tudo_ou_nada", "melhor_esforco"):
+            return jsonify({"erro": "modo deve ser tudo_ou_nada ou melhor_esforco"}), 400
+
+        lote = Movimento.salvar_lote(movimentos, usuario.id, atomico=(modo == "tudo_ou_nada"))
+
+        for produto_id in lote['alertas']:
+            worker_alertas.enfileirar(produto_id, usuario.email)
+
+        registrados = sum(1 for r in lote['resultados'] if r['status'] == 'ok')
+        resposta = {
+            "mensagem": "Lote registrado" if lote['confirmado'] else "Lote não registrado",
+            "registrados": registrados,
+            "resultados": lote['resultados']
+        }
+        return jsonify(resposta), 201 if lote['confirmado'] else 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao registrar lote de movimentos", "detalhes": str(e)}), 500
+    
 @app.route("/movimentos", methods=["GET"])
 @token_requerido
 def listar_todas_movimentacoes(usuario):
@@ -229,18 +505,171 @@ def listar_todas_movimentacoes(usuario):
         tipo = request.args.get('tipo')       
         categoria_id = request.args.get('categoria_id') 
         data = request.args.get('data')                  
+        de = request.args.get('de')
+        ate = request.args.get('ate')
         
-        movimentos = Movimento.listar_com_filtros(tipo_movimento=tipo, categoria_id=categoria_id, data=data)
-        return jsonify(movimentos)
+        paginado, limite, cursor, campos = parametros_paginacao()
+        if paginado:
+            pagina = Movimento.listar_paginado(
+                limite, apos=cursor, campos=campos,
+                tipo_movimento=tipo, categoria_id=categoria_id, data=data, de=de, ate=ate
+            )
+            return jsonify(pagina)
+
+        colunas, linhas = Movimento.listar_tuplas(
+            tipo_movimento=tipo, categoria_id=categoria_id, data=data, de=de, ate=ate, campos=campos
+        )
+        return Response(iniciar_stream(gerar_json(colunas, linhas)), mimetype='application/json')
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
     except Exception as e:
         return jsonify({"erro": "Erro ao listar movimentações", "detalhes": str(e)}), 500
 
 
+COLUNAS_EXPORTACAO = [
+    "id", "produto_id", "produto_nome", "categoria_id", "usuario_id", "usuario_nome",
+    "tipo_movimento", "quantidade", "observacao", "data_movimento"
+]
+
+def iniciar_stream(corpo):
+    """
+    Gera o primeiro bloco do corpo antes de a resposta ser devolvida
+
+    A consulta roda e o primeiro lote é lido ainda dentro do try da rota: um erro
+    de conexão, de SQL ou do arquivo vira um 500 em vez de um corpo truncado
+    depois dos cabeçalhos do 200.
+    """
+    try:
+        primeiro = next(corpo)
+    except StopIteration:
+        return iter(())
+
+    def continuar():
+        try:
+            yield primeiro
+            yield from corpo
+        finally:
+            # Cliente que desconecta: libera a conexão do stream_query
+            corpo.close()
+    return continuar()
+
+def gerar_json(colunas, linhas):
+    """Array JSON das linhas (tuplas) no mesmo formato do jsonify, entregue em blocos"""
+    return linhas_para_json(colunas, linhas, app.json.dumps)
+
+def gerar_ndjson(colunas, linhas):
+    for linha in linhas:
+        yield json.dumps(dict(zip(colunas, linha)), default=str, ensure_ascii=False) + "\n"
+
+def gerar_csv(colunas, linhas, lote=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUNAS_EXPORTACAO)
+    # As tuplas já vêm do cursor; só reordena para as colunas do CSV
+    ordenar = operator.itemgetter(*(colunas.index(coluna) for coluna in COLUNAS_EXPORTACAO))
+    for i, linha in enumerate(linhas, 1):
+        writer.writerow(ordenar(linha))
+        # Envia o CSV em blocos para não criar um chunk HTTP por linha
+        if i % lote == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+@app.route("/movimentos/exportar", methods=["GET"])
+@token_requerido
+def exportar_movimentacoes(usuario):
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in ('ndjson', 'csv'):
+        return jsonify({"erro": "Formato inválido, use ndjson ou csv"}), 400
+
+    try:
+        colunas, linhas = Movimento.exportar_com_filtros(
+            tipo_movimento=request.args.get('tipo'),
+            categoria_id=request.args.get('categoria_id'),
+            data=request.args.get('data'),
+            de=request.args.get('de'),
+            ate=request.args.get('ate')
+        )
+
+        if formato == 'csv':
+            corpo, mimetype = gerar_csv(colunas, linhas), 'text/csv'
+        else:
+            corpo, mimetype = gerar_ndjson(colunas, linhas), 'application/x-ndjson'
+
+        resposta = Response(stream_with_context(iniciar_stream(corpo)), mimetype=mimetype)
+        resposta.headers['Content-Disposition'] = f'attachment; filename=movimentos.{formato}'
+        return resposta
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao exportar movimentações", "detalhes": str(e)}), 500
+
+
 @app.route("/produtos/<int:id>/movimentos", methods=["GET"])
 @token_requerido
 def listar_movimentos(usuario, id):
     try:
-        movimentos = Movimento.listar_por_produto(id)
-        return jsonify(movimentos)
+        paginado, limite, cursor, campos = parametros_paginacao()
+        if paginado:
+            return jsonify(Movimento.listar_paginado(limite, apos=cursor, campos=campos, produto_id=id))
+
+        return jsonify(Movimento.listar_por_produto(id, campos))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
     except Exception as e:
         return jsonify({"erro": "Erro ao listar movimentos", "detalhes": str(e)}), 500
+
+
+@app.route("/relatorios/movimentos", methods=["GET"])
+@token_requerido
+def relatorio_movimentos(usuario):
+    try:
+        agrupar = request.args.get('agrupar', 'dia')
+        dimensoes = [d.strip() for d in agrupar.split(',') if d.strip()]
+        totais = ResumoMovimento.totais(
+            de=request.args.get('de'),
+            ate=request.args.get('ate'),
+            agrupar=dimensoes,
+            produto_id=request.args.get('produto_id'),
+            categoria_id=request.args.get('categoria_id')
+        )
+        return jsonify(totais)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao gerar relatório de movimentos", "detalhes": str(e)}), 500
+
+@app.route("/status/pool", methods=["GET"])
+@token_requerido
+def status_pool(usuario):
+    try:
+        return jsonify({
+            "pool": Database.estatisticas_pool(),
+            "alertas": worker_alertas.estatisticas(),
+            "cache": cache_modelos.estatisticas(),
+            "senhas": servico_senhas.estatisticas(),
+            "agrupamento": agrupador_movimentos.estatisticas(),
+            "busca": indice_produtos.estatisticas(),
+            "replicas": Database.estatisticas_replicas()
+        })
+    except Exception as e:
+        return jsonify({"erro": "Erro ao obter estatísticas do pool", "detalhes": str(e)}), 500
+
+def resposta_metricas():
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+@token_requerido
+def metricas_com_usuario(usuario):
+    return resposta_metricas()
+
+@app.route("/metrics", methods=["GET"])
+def exportar_metricas():
+    if METRICAS_ABERTAS:
+        return resposta_metricas()
+    if METRICAS_TOKEN:
+        recebido = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(recebido.encode(), f"Bearer {METRICAS_TOKEN}".encode()):
+            return jsonify({'erro': 'Token inválido'}), 401
+        return resposta_metricas()
+    return metricas_com_usuario()
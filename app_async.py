@@ -0,0 +1,300 @@
+# app_async.py
+"""
+Modo de execução ASGI: uvicorn app_async:app
+
+As rotas de leitura mais acessadas rodam de forma assíncrona sobre o pool do
+aiomysql (database_async.py), então a espera pelo MySQL não prende um worker.
+As demais rotas são repassadas para o app Flask de app.py (via WsgiToAsgi),
+com a mesma autenticação e os mesmos formatos de resposta.
+"""
+import asyncio
+import itertools
+from functools import wraps
+
+import jwt
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, Response, request, jsonify
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+import app as app_sync
+from database import consistencia_leitura
+from database_async import DatabaseAsync
+from metricas import metricas
+from busca import ErroIndiceIndisponivel
+from respostas import configurar_json, comprimir_resposta_async
+from models import (Usuario, Categoria, Produto, Movimento, VersaoTabela,
+                    cache_modelos, cache_usuarios, montar_pagina,
+                    QUERY_USUARIO_POR_ID, QUERY_CATEGORIAS, QUERY_CATEGORIA_POR_ID, QUERY_PRODUTO_POR_ID)
+
+app_async = Quart(__name__)
+configurar_json(app_async)
+app_wsgi = WsgiToAsgi(app_sync.app)
+
+# ------------------------
+# AUTENTICAÇÃO JWT
+# ------------------------
+async def obter_usuario(dados):
+    """Mesma resolução de usuário de token_requerido, com consulta assíncrona"""
+    if app_sync.JWT_CONFIAR_CLAIMS and 'nivel_acesso' in dados:
+        return Usuario(
+            id=dados['id'],
+            nome=dados.get('nome'),
+            email=dados.get('email'),
+            nivel_acesso=dados['nivel_acesso']
+        )
+
+    usuario = cache_usuarios.obter(dados['id'])
+    if usuario is None:
+        result = await DatabaseAsync.execute_query(QUERY_USUARIO_POR_ID, (dados['id'],), fetch=True)
+        if result:
+            usuario = Usuario.de_linha(result[0])
+            cache_usuarios.definir(dados['id'], usuario)
+    return usuario
+
+def token_requerido(f):
+    @wraps(f)
+    async def decorator(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        if not token:
+            return jsonify({'erro': 'Token ausente'}), 401
+        try:
+            token = token.replace("Bearer ", "")
+            dados = jwt.decode(token, app_sync.SECRET_KEY, algorithms=["HS256"])
+            usuario = await obter_usuario(dados)
+            if not usuario:
+                raise Exception("Usuário não encontrado")
+            consistencia_leitura.identificar(usuario.id)
+        except Exception as e:
+            return jsonify({'erro': 'Token inválido', 'detalhes': str(e)}), 401
+        return await f(usuario, *args, **kwargs)
+    return decorator
+
+# ------------------------
+# RESPOSTAS CONDICIONAIS (ETag)
+# ------------------------
+def resposta_condicional(*tabelas):
+    """Versão assíncrona de app.resposta_condicional"""
+    def decorador(f):
+        @wraps(f)
+        async def decorator(*args, **kwargs):
+            try:
+                query, params = VersaoTabela.consulta(*tabelas)
+                # Antes dos dados e da mesma réplica, como em VersaoTabela.obter
+                linhas = await DatabaseAsync.execute_query(query, params, fetch=True)
+                versoes = VersaoTabela.de_linhas(linhas, tabelas)
+            except Exception as e:
+                print(f"Erro ao obter versões de {tabelas}: {e}")
+                versoes = None
+            if versoes is None:
+                return await f(*args, **kwargs)
+
+            etag = app_sync.calcular_etag(tabelas, versoes, request.full_path)
+            if request.if_none_match.contains_weak(etag):
+                resposta = app_async.response_class("", status=304)
+            else:
+                resposta = await app_async.make_response(await f(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            resposta.set_etag(etag, weak=True)
+            resposta.headers['Cache-Control'] = 'no-cache'
+            return resposta
+        return decorator
+    return decorador
+
+@app_async.before_request
+async def iniciar_metricas():
+    metricas.iniciar_requisicao()
+
+@app_async.before_request
+async def iniciar_indice_busca():
+    app_sync.iniciar_indice_busca()
+
+@app_async.before_request
+async def iniciar_sessao_leitura():
+    consistencia_leitura.iniciar()
+
+@app_async.after_request
+async def cabecalhos_resposta(resposta):
+    # Mesmo comportamento padrão do flask-cors em app.py
+    if request.headers.get('Origin'):
+        resposta.headers['Access-Control-Allow-Origin'] = '*'
+    rota = request.url_rule.rule if request.url_rule else 'nao_encontrada'
+    requisicao, duracao = metricas.finalizar_requisicao(request.method, rota, resposta.status_code)
+    if requisicao is not None:
+        resposta.headers['Server-Timing'] = requisicao.server_timing(duracao)
+    return resposta
+
+@app_async.after_request
+async def comprimir(resposta):
+    return await comprimir_resposta_async(resposta, request)
+
+@app_async.after_serving
+async def encerrar():
+    await DatabaseAsync.fechar()
+
+# ------------------------
+# CATEGORIAS
+# ------------------------
+@app_async.route("/categorias", methods=["GET"])
+@token_requerido
+@resposta_condicional("categorias")
+async def listar_categorias(usuario):
+    try:
+        categorias = cache_modelos.obter('categorias:lista')
+        if categorias is None:
+            categorias = await DatabaseAsync.execute_query(QUERY_CATEGORIAS, fetch=True, primario=True)
+            cache_modelos.definir('categorias:lista', categorias)
+        return jsonify(categorias)
+    except Exception as e:
+        return jsonify({"erro": "Erro ao listar categorias", "detalhes": str(e)}), 500
+
+@app_async.route("/categorias/<int:id>", methods=["GET"])
+@token_requerido
+@resposta_condicional("categorias")
+async def obter_categoria(usuario, id):
+    try:
+        chave = f'categoria:{id}'
+        c = cache_modelos.obter(chave)
+        if c is None:
+            result = await DatabaseAsync.execute_query(QUERY_CATEGORIA_POR_ID, (id,), fetch=True, primario=True)
+            if not result:
+                return jsonify({"erro": "Categoria não encontrada"}), 404
+            c = result[0]
+            cache_modelos.definir(chave, c)
+        return jsonify(Categoria.de_linha(c).para_dict())
+    except Exception as e:
+        return jsonify({"erro": "Erro ao obter categoria", "detalhes": str(e)}), 500
+
+# ------------------------
+# PRODUTOS
+# ------------------------
+@app_async.route("/produtos", methods=["GET"])
+@token_requerido
+@resposta_condicional("produtos")
+async def listar_produtos(usuario):
+    try:
+        paginado, limite, cursor, campos = app_sync.parametros_paginacao(request.args)
+        if 'q' in request.args:
+            # A busca é só em memória, não há o que esperar do banco
+            return jsonify(app_sync.buscar_produtos(request.args, limite, cursor, campos))
+        if paginado:
+            query, params = Produto.consulta_paginada(limite, cursor, campos)
+            itens = await DatabaseAsync.execute_query(query, params, fetch=True)
+            return jsonify(montar_pagina(itens, limite, ('nome', 'id'), campos))
+
+        query, params = Produto.consulta_listagem(campos)
+        return jsonify(await DatabaseAsync.execute_query(query, params, fetch=True))
+    except ErroIndiceIndisponivel as e:
+        return jsonify({"erro": str(e)}), 503, {"Retry-After": "5"}
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao listar produtos", "detalhes": str(e)}), 500
+
+@app_async.route("/produtos/<int:id>", methods=["GET"])
+@token_requerido
+@resposta_condicional("produtos")
+async def obter_produto(usuario, id):
+    try:
+        # Como em Produto.obter_por_id: só em cache com backend compartilhado
+        compartilhado = cache_modelos.compartilhado
+        chave = f'produto:{id}'
+        p = cache_modelos.obter(chave) if compartilhado else None
+        if p is None:
+            result = await DatabaseAsync.execute_query(QUERY_PRODUTO_POR_ID, (id,), fetch=True,
+                                                       primario=compartilhado)
+            if not result:
+                return jsonify({"erro": "Produto não encontrado"}), 404
+            p = result[0]
+            if compartilhado:
+                cache_modelos.definir(chave, p)
+        return jsonify(Produto.de_linha(p).para_dict())
+    except Exception as e:
+        return jsonify({"erro": "Erro ao obter produto", "detalhes": str(e)}), 500
+
+# ------------------------
+# MOVIMENTOS
+# ------------------------
+@app_async.route("/movimentos", methods=["GET"])
+@token_requerido
+async def listar_todas_movimentacoes(usuario):
+    try:
+        filtros = {
+            'tipo_movimento': request.args.get('tipo'),
+            'categoria_id': request.args.get('categoria_id'),
+            'data': request.args.get('data'),
+            'de': request.args.get('de'),
+            'ate': request.args.get('ate'),
+        }
+
+        paginado, limite, cursor, campos = app_sync.parametros_paginacao(request.args)
+        if paginado:
+            query, params = Movimento.consulta_paginada(limite, cursor, campos, **filtros)
+            itens = await DatabaseAsync.execute_query(query, params, fetch=True)
+            # Os segmentos arquivados são lidos em disco: fora do loop de eventos
+            itens = await asyncio.to_thread(
+                Movimento.completar_com_arquivo, itens, limite, cursor, campos, **filtros
+            )
+            return jsonify(montar_pagina(itens, limite, ('data_movimento', 'id'), campos))
+
+        query, params = Movimento.consulta_com_filtros(**filtros, campos=campos)
+        linhas = await DatabaseAsync.execute_query(query, params, fetch=True, tuplas=True)
+        colunas = Movimento.colunas(campos)
+        arquivados = await asyncio.to_thread(list, Movimento.listar_arquivados(colunas, **filtros))
+        corpo = app_sync.iniciar_stream(
+            parte.encode('utf-8') for parte in app_sync.gerar_json(colunas, itertools.chain(linhas, arquivados))
+        )
+        return Response(corpo, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao listar movimentações", "detalhes": str(e)}), 500
+
+@app_async.route("/produtos/<int:id>/movimentos", methods=["GET"])
+@token_requerido
+async def listar_movimentos(usuario, id):
+    try:
+        paginado, limite, cursor, campos = app_sync.parametros_paginacao(request.args)
+        if paginado:
+            query, params = Movimento.consulta_paginada(limite, cursor, campos, produto_id=id)
+            itens = await DatabaseAsync.execute_query(query, params, fetch=True)
+            itens = await asyncio.to_thread(
+                Movimento.completar_com_arquivo, itens, limite, cursor, campos, produto_id=id
+            )
+            return jsonify(montar_pagina(itens, limite, ('data_movimento', 'id'), campos))
+
+        query, params = Movimento.consulta_por_produto(id, campos)
+        movimentos = await DatabaseAsync.execute_query(query, params, fetch=True)
+        # Os segmentos arquivados são lidos em disco: fora do loop de eventos
+        movimentos = await asyncio.to_thread(Movimento.incluir_arquivados_do_produto, movimentos, id, campos)
+        return jsonify(movimentos)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"erro": "Erro ao listar movimentos", "detalhes": str(e)}), 500
+
+# ------------------------
+# DESPACHO ASGI
+# ------------------------
+rotas_async = Map([Rule(r.rule, methods=r.methods, endpoint=r.endpoint)
+                   for r in app_async.url_map.iter_rules()
+                   if r.endpoint != 'static'])
+
+def rota_assincrona(scope):
+    """Indica se a requisição tem uma implementação assíncrona em app_async"""
+    if scope['method'] == 'OPTIONS':
+        # Preflight de CORS continua com o flask-cors
+        return False
+    try:
+        rotas_async.bind('').match(scope['path'], method=scope['method'])
+        return True
+    except HTTPException:
+        return False
+
+async def app(scope, receive, send):
+    if scope['type'] == 'http' and not rota_assincrona(scope):
+        await app_wsgi(scope, receive, send)
+    else:
+        await app_async(scope, receive, send)
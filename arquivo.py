@@ -0,0 +1,643 @@
+# arquivo.py
+"""
+Arquivo frio de movimentos_estoque.
+
+A tabela é particionada por mês (migração 008, partições pAAAAMM e p_futuro).
+Os meses fechados além dos ARQUIVO_MESES_QUENTES mais recentes saem do MySQL
+para segmentos colunares em disco (python arquivo.py manter, agendado
+diariamente), um diretório por mês:
+
+    <ARQUIVO_MOVIMENTOS_DIR>/AAAA-MM/
+        meta.json           intervalo de datas, ids e produtos, linhas
+        id.npy              int64
+        produto_id.npy      int32 (-1 = nulo)
+        usuario_id.npy      int32 (-1 = nulo)
+        tipo.npy            int8 (0 entrada, 1 saida, 2 ajuste)
+        quantidade.npy      int32
+        segundos.npy        uint32, segundos desde meta['base']
+        observacao.json.gz  lista de observações
+
+As colunas numéricas são abertas com mmap e ocupam de 1 a 8 bytes por linha
+(a data vira um deslocamento de 4 bytes); só as observações, de tamanho
+variável, vão comprimidas e são lidas apenas quando pedidas. As linhas ficam
+em ordem de (data_movimento, id), então um intervalo de datas é um
+searchsorted, e meta.json permite pular os segmentos fora do filtro sem abrir
+as colunas.
+
+Nomes de produto e usuário e a categoria não são arquivados: vêm das tabelas
+atuais, como nos LEFT JOINs das listagens.
+"""
+import argparse
+import datetime
+import gzip
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from array import array
+
+import numpy as np
+from dotenv import load_dotenv
+
+from database import Database
+
+load_dotenv()
+
+ARQUIVO_MOVIMENTOS_DIR = os.getenv(
+    "ARQUIVO_MOVIMENTOS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "arquivo", "movimentos")
+)
+ARQUIVO_MESES_QUENTES = int(os.getenv("ARQUIVO_MESES_QUENTES", 6))
+ARQUIVO_MESES_FUTUROS = int(os.getenv("ARQUIVO_MESES_FUTUROS", 3))
+
+TIPOS = ('entrada', 'saida', 'ajuste')
+CODIGOS_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+
+# Colunas gravadas em cada segmento: nome -> dtype
+COLUNAS_SEGMENTO = {
+    'id': np.int64,
+    'produto_id': np.int32,
+    'usuario_id': np.int32,
+    'tipo': np.int8,
+    'quantidade': np.int32,
+    'segundos': np.uint32,
+}
+
+# Colunas que consultar() sabe montar (as mesmas de models.MOVIMENTO_COLUNAS)
+COLUNAS_CONSULTA = (
+    'id', 'produto_id', 'usuario_id', 'tipo_movimento', 'quantidade', 'observacao',
+    'data_movimento', 'usuario_nome', 'produto_nome', 'categoria_id',
+)
+
+SEGUNDOS_MAX = np.iinfo(np.uint32).max
+LOTE_LINHAS = 1000
+
+
+def somar_meses(data, meses):
+    """Primeiro dia do mês `meses` depois (ou antes) do mês de `data`"""
+    total = data.year * 12 + data.month - 1 + meses
+    return datetime.date(total // 12, total % 12 + 1, 1)
+
+
+def meses_entre(primeiro, ultimo):
+    """Primeiro dia de cada mês de `primeiro` a `ultimo`, inclusive"""
+    mes = primeiro.replace(day=1)
+    while mes <= ultimo:
+        yield mes
+        mes = somar_meses(mes, 1)
+
+
+def nome_particao(mes):
+    """Nome da partição de um mês: 2024-01 -> p202401"""
+    return f"p{mes:%Y%m}"
+
+
+def definicao_particoes(primeiro_mes, ultimo_mes):
+    """Cláusulas PARTITION de cada mês entre os dois (inclusive), seguidas de p_futuro"""
+    particoes = [
+        f"PARTITION {nome_particao(mes)} VALUES LESS THAN ('{somar_meses(mes, 1)}')"
+        for mes in meses_entre(primeiro_mes, ultimo_mes)
+    ]
+    particoes.append("PARTITION p_futuro VALUES LESS THAN (MAXVALUE)")
+    return particoes
+
+
+def _datetime(valor):
+    return datetime.datetime.fromisoformat(valor) if valor else None
+
+
+# ------------------------
+# SEGMENTOS
+# ------------------------
+class Segmento:
+    """Um mês arquivado, com as colunas abertas sob demanda via mmap"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with open(os.path.join(caminho, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.mes = self.meta['mes']
+        self.linhas = self.meta['linhas']
+        self.base = _datetime(self.meta['base'])
+        self.fim_mes = _datetime(self.meta['fim'])
+        self.data_min = _datetime(self.meta['data_min'])
+        self.data_max = _datetime(self.meta['data_max'])
+        self._colunas = {}
+        self._observacoes = None
+        self._lock = threading.Lock()
+
+    def coluna(self, nome):
+        """Array (somente leitura, mapeado do disco) de uma coluna do segmento"""
+        arr = self._colunas.get(nome)
+        if arr is None:
+            arr = np.load(os.path.join(self.caminho, f'{nome}.npy'), mmap_mode='r')
+            self._colunas[nome] = arr
+        return arr
+
+    def observacoes(self):
+        if self._observacoes is None:
+            with self._lock:
+                if self._observacoes is None:
+                    with gzip.open(os.path.join(self.caminho, 'observacao.json.gz'), 'rt', encoding='utf-8') as f:
+                        self._observacoes = json.load(f)
+        return self._observacoes
+
+    def cobre(self, inicio=None, fim=None, produto_id=None):
+        """Indica, só pelo meta.json, se o segmento pode ter linhas no filtro"""
+        if not self.linhas:
+            return False
+        if inicio is not None and self.data_max < inicio:
+            return False
+        if fim is not None and self.data_min >= fim:
+            return False
+        if produto_id is not None and not (
+            self.meta['produto_min'] <= produto_id <= self.meta['produto_max']
+        ):
+            return False
+        return True
+
+    def _relativo(self, momento):
+        """Deslocamento de `momento` em segundos inteiros, limitado ao intervalo do uint32"""
+        segundos = math.ceil((momento - self.base).total_seconds())
+        return min(max(segundos, 0), int(SEGUNDOS_MAX))
+
+    def selecionar(self, inicio=None, fim=None, tipo=None, produtos=None, apos=None):
+        """
+        Posições das linhas que passam nos filtros, da mais recente para a mais antiga
+
+        Args:
+            inicio, fim (datetime): Intervalo semiaberto [inicio, fim)
+            tipo (int): Código do tipo de movimento
+            produtos (np.ndarray): Produtos aceitos, ordenados
+            apos (tuple): (data_movimento, id) da última linha já entregue
+        """
+        segundos = self.coluna('segundos')
+        lo = 0 if inicio is None else int(np.searchsorted(segundos, self._relativo(inicio), 'left'))
+        hi = len(segundos) if fim is None else int(np.searchsorted(segundos, self._relativo(fim), 'left'))
+        if apos is not None:
+            corte = self._relativo(apos[0])
+            hi = min(hi, int(np.searchsorted(segundos, corte, 'right')))
+        if hi <= lo:
+            return np.empty(0, dtype=np.int64)
+
+        mascara = np.ones(hi - lo, dtype=bool)
+        if tipo is not None:
+            mascara &= self.coluna('tipo')[lo:hi] == tipo
+        if produtos is not None:
+            coluna = self.coluna('produto_id')[lo:hi]
+            mascara &= (coluna == produtos[0]) if len(produtos) == 1 else np.isin(coluna, produtos)
+        if apos is not None:
+            # No mesmo segundo do cursor, só ids menores
+            mascara &= ~((segundos[lo:hi] == corte) & (self.coluna('id')[lo:hi] >= apos[1]))
+        return (np.flatnonzero(mascara) + lo)[::-1]
+
+    def valores(self, coluna, posicoes):
+        """Valores Python de uma coluna armazenada nas posições pedidas"""
+        if coluna == 'tipo_movimento':
+            return np.array(TIPOS, dtype=object)[self.coluna('tipo')[posicoes]].tolist()
+        if coluna == 'data_movimento':
+            base = np.datetime64(self.base, 's')
+            return (base + self.coluna('segundos')[posicoes].astype('timedelta64[s]')).tolist()
+        if coluna == 'observacao':
+            observacoes = self.observacoes()
+            return [observacoes[i] for i in posicoes.tolist()]
+        valores = self.coluna(coluna)[posicoes]
+        if coluna in ('produto_id', 'usuario_id') and (valores < 0).any():
+            return [None if v < 0 else v for v in valores.tolist()]
+        return valores.tolist()
+
+
+def gravar_segmento(destino, mes, base, colunas, observacoes):
+    """
+    Grava um segmento em `destino` (diretório novo)
+
+    Args:
+        mes (date): Primeiro dia do mês arquivado
+        base (datetime): Origem de `segundos`
+        colunas (dict): Nome -> np.ndarray, na ordem de (data_movimento, id)
+        observacoes (list): Observação de cada linha (ou None)
+    """
+    os.makedirs(destino)
+    for nome, dtype in COLUNAS_SEGMENTO.items():
+        np.save(os.path.join(destino, f'{nome}.npy'), np.ascontiguousarray(colunas[nome], dtype=dtype))
+    with gzip.open(os.path.join(destino, 'observacao.json.gz'), 'wt', encoding='utf-8') as f:
+        json.dump(observacoes, f, ensure_ascii=False)
+
+    linhas = len(colunas['id'])
+    segundos = colunas['segundos']
+    produtos = colunas['produto_id']
+    meta = {
+        'mes': f"{mes:%Y-%m}",
+        'fim': datetime.datetime.combine(somar_meses(mes, 1), datetime.time()).isoformat(),
+        'base': base.isoformat(),
+        'linhas': linhas,
+        'data_min': (base + datetime.timedelta(seconds=int(segundos[0]))).isoformat() if linhas else None,
+        'data_max': (base + datetime.timedelta(seconds=int(segundos[-1]))).isoformat() if linhas else None,
+        'id_min': int(colunas['id'].min()) if linhas else None,
+        'id_max': int(colunas['id'].max()) if linhas else None,
+        'produto_min': int(produtos.min()) if linhas else None,
+        'produto_max': int(produtos.max()) if linhas else None,
+        'arquivado_em': datetime.datetime.now().replace(microsecond=0).isoformat(),
+    }
+    with open(os.path.join(destino, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# ------------------------
+# CONSULTA
+# ------------------------
+class ArquivoMovimentos:
+    """
+    Leitura dos meses arquivados, no mesmo formato das listagens de Movimento
+
+    Os segmentos são relidos quando o conteúdo do diretório muda (um mês
+    arquivado por outro processo passa a aparecer na consulta seguinte; um
+    diretório substituído é reconhecido pelo inode).
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        self._chaves = None
+        self._segmentos = []  # do mês mais recente ao mais antigo
+
+    def segmentos(self):
+        """Segmentos publicados, do mais recente ao mais antigo"""
+        try:
+            with os.scandir(self.diretorio) as entradas:
+                chaves = tuple(sorted(
+                    ((e.name, e.inode()) for e in entradas if re.fullmatch(r'\d{4}-\d{2}', e.name)),
+                    reverse=True
+                ))
+        except FileNotFoundError:
+            chaves = ()
+        with self._lock:
+            if chaves != self._chaves:
+                atuais = dict(zip(self._chaves or (), self._segmentos))
+                self._segmentos = [
+                    atuais.get(chave) or Segmento(os.path.join(self.diretorio, chave[0])) for chave in chaves
+                ]
+                self._chaves = chaves
+            return self._segmentos
+
+    def limite_quente(self):
+        """Início do primeiro mês ainda no MySQL (None se nada foi arquivado)"""
+        segmentos = self.segmentos()
+        return max(s.fim_mes for s in segmentos) if segmentos else None
+
+    def _nomes_relacionados(self, colunas, produtos, usuarios):
+        """Busca nomes e categorias atuais dos produtos e usuários de um lote"""
+        relacionados = {'produtos': {}, 'usuarios': {}}
+        if produtos and any(c in colunas for c in ('produto_nome', 'categoria_id')):
+            marcadores = ", ".join(["%s"] * len(produtos))
+            for id_, nome, categoria_id in Database.execute_query(
+                f"SELECT id, nome, categoria_id FROM produtos WHERE id IN ({marcadores})",
+                tuple(produtos), fetch=True, tuplas=True
+            ):
+                relacionados['produtos'][id_] = (nome, categoria_id)
+        if usuarios and 'usuario_nome' in colunas:
+            marcadores = ", ".join(["%s"] * len(usuarios))
+            relacionados['usuarios'] = dict(Database.execute_query(
+                f"SELECT id, nome FROM usuarios WHERE id IN ({marcadores})",
+                tuple(usuarios), fetch=True, tuplas=True
+            ))
+        return relacionados
+
+    def _montar(self, segmento, posicoes, colunas):
+        """Tuplas na ordem de `colunas` para as posições de um segmento"""
+        armazenadas = {'produto_id', 'usuario_id'} | {
+            c for c in colunas if c not in ('usuario_nome', 'produto_nome', 'categoria_id')
+        }
+        valores = {c: segmento.valores(c, posicoes) for c in armazenadas}
+        relacionados = self._nomes_relacionados(
+            colunas,
+            sorted({p for p in valores['produto_id'] if p is not None}),
+            sorted({u for u in valores['usuario_id'] if u is not None}),
+        )
+        if 'usuario_nome' in colunas:
+            nomes = relacionados['usuarios']
+            valores['usuario_nome'] = [nomes.get(u) for u in valores['usuario_id']]
+        produtos = relacionados['produtos']
+        if 'produto_nome' in colunas:
+            valores['produto_nome'] = [produtos.get(p, (None, None))[0] for p in valores['produto_id']]
+        if 'categoria_id' in colunas:
+            valores['categoria_id'] = [produtos.get(p, (None, None))[1] for p in valores['produto_id']]
+        return zip(*(valores[c] for c in colunas))
+
+    def consultar(self, colunas, tipo_movimento=None, categoria_id=None, produto_id=None,
+                  inicio=None, fim=None, apos=None, limite=None):
+        """
+        Gera as linhas arquivadas que passam nos filtros, em ordem de (data_movimento, id) decrescente
+
+        Args:
+            colunas (tuple): Colunas de cada tupla, entre COLUNAS_CONSULTA
+            tipo_movimento, categoria_id, produto_id: Mesmos filtros das listagens
+            inicio, fim (datetime): Intervalo semiaberto de data_movimento
+            apos (tuple): (data_movimento, id) do cursor de paginação
+            limite (int): Máximo de linhas
+
+        Yields:
+            tuple: Uma linha por vez, na ordem de `colunas`
+        """
+        invalidas = [c for c in colunas if c not in COLUNAS_CONSULTA]
+        if invalidas:
+            raise ValueError(f"Campos inválidos: {', '.join(invalidas)}")
+        produto_id = int(produto_id) if produto_id else None
+        fim_efetivo = fim
+        if apos is not None:
+            corte = apos[0] + datetime.timedelta(seconds=1)
+            fim_efetivo = min(fim, corte) if fim else corte
+        segmentos = [s for s in self.segmentos() if s.cobre(inicio, fim_efetivo, produto_id)]
+        if not segmentos or limite == 0:
+            return
+
+        tipo = None
+        if tipo_movimento:
+            if tipo_movimento not in CODIGOS_TIPO:
+                return
+            tipo = CODIGOS_TIPO[tipo_movimento]
+
+        produtos = None
+        if produto_id is not None:
+            produtos = np.array([produto_id], dtype=np.int32)
+        if categoria_id:
+            da_categoria = np.array(sorted(
+                linha[0] for linha in Database.execute_query(
+                    "SELECT id FROM produtos WHERE categoria_id = %s", (categoria_id,), fetch=True, tuplas=True
+                )
+            ), dtype=np.int32)
+            produtos = da_categoria if produtos is None else np.intersect1d(produtos, da_categoria)
+            if not len(produtos):
+                return
+
+        entregues = 0
+        for segmento in segmentos:
+            posicoes = segmento.selecionar(inicio, fim, tipo, produtos, apos)
+            if limite is not None:
+                posicoes = posicoes[:limite - entregues]
+            for i in range(0, len(posicoes), LOTE_LINHAS):
+                yield from self._montar(segmento, posicoes[i:i + LOTE_LINHAS], colunas)
+            entregues += len(posicoes)
+            if limite is not None and entregues >= limite:
+                return
+
+    def movimentos_para_reproducao(self, apos_id, fim, produto_id=None):
+        """
+        Movimentos arquivados com id > apos_id e data < fim, para historico.estoque_em
+
+        Returns:
+            np.ndarray: Matriz int64 (id, produto_id, tipo, quantidade) em ordem de id
+        """
+        partes = []
+        for segmento in self.segmentos():
+            if not segmento.cobre(None, fim, produto_id) or segmento.meta['id_max'] <= apos_id:
+                continue
+            segundos = segmento.coluna('segundos')
+            hi = int(np.searchsorted(segundos, segmento._relativo(fim), 'left'))
+            ids = segmento.coluna('id')[:hi]
+            mascara = ids > apos_id
+            if produto_id is not None:
+                mascara &= segmento.coluna('produto_id')[:hi] == produto_id
+            partes.append(np.column_stack([
+                ids[mascara],
+                segmento.coluna('produto_id')[:hi][mascara],
+                segmento.coluna('tipo')[:hi][mascara],
+                segmento.coluna('quantidade')[:hi][mascara],
+            ]).astype(np.int64))
+        if not partes:
+            return np.empty((0, 4), dtype=np.int64)
+        movimentos = np.concatenate(partes)
+        return movimentos[np.argsort(movimentos[:, 0], kind='stable')]
+
+    def movimentos_do_tipo(self, tipo_movimento, inicio, fim):
+        """
+        Produto, data e quantidade dos movimentos arquivados de um tipo em [inicio, fim)
+
+        Returns:
+            tuple: (produto_id int64, data datetime64[s], quantidade int64) como np.ndarray
+        """
+        tipo = CODIGOS_TIPO[tipo_movimento]
+        produtos, datas, quantidades = [], [], []
+        for segmento in self.segmentos():
+            if not segmento.cobre(inicio, fim):
+                continue
+            segundos = segmento.coluna('segundos')
+            lo = int(np.searchsorted(segundos, segmento._relativo(inicio), 'left'))
+            hi = int(np.searchsorted(segundos, segmento._relativo(fim), 'left'))
+            mascara = segmento.coluna('tipo')[lo:hi] == tipo
+            produtos.append(segmento.coluna('produto_id')[lo:hi][mascara].astype(np.int64))
+            datas.append(np.datetime64(segmento.base, 's') + segundos[lo:hi][mascara].astype('timedelta64[s]'))
+            quantidades.append(segmento.coluna('quantidade')[lo:hi][mascara].astype(np.int64))
+        if not produtos:
+            return np.empty(0, np.int64), np.empty(0, 'datetime64[s]'), np.empty(0, np.int64)
+        return np.concatenate(produtos), np.concatenate(datas), np.concatenate(quantidades)
+
+    def possui_movimentos(self, produto_id):
+        """Indica se algum mês arquivado tem movimentos do produto"""
+        return any(
+            segmento.cobre(produto_id=produto_id) and bool((segmento.coluna('produto_id') == produto_id).any())
+            for segmento in self.segmentos()
+        )
+
+    def estatisticas(self):
+        """Resumo dos segmentos: meses, linhas e bytes em disco"""
+        segmentos = self.segmentos()
+        return {
+            'diretorio': self.diretorio,
+            'segmentos': len(segmentos),
+            'linhas': sum(s.linhas for s in segmentos),
+            'bytes': sum(
+                os.path.getsize(os.path.join(s.caminho, nome))
+                for s in segmentos for nome in os.listdir(s.caminho)
+            ),
+            'limite_quente': self.limite_quente(),
+        }
+
+
+arquivo_movimentos = ArquivoMovimentos(ARQUIVO_MOVIMENTOS_DIR)
+
+
+# ------------------------
+# PARTIÇÕES E ARQUIVAMENTO
+# ------------------------
+def listar_particoes():
+    """Partições de movimentos_estoque em ordem: [{'nome', 'mes', 'linhas'}] (mes None em p_futuro)"""
+    particoes = Database.execute_query("""
+        SELECT PARTITION_NAME AS nome, TABLE_ROWS AS linhas
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'movimentos_estoque'
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, fetch=True)
+    for particao in particoes:
+        encontrado = re.fullmatch(r'p(\d{4})(\d{2})', particao['nome'])
+        particao['mes'] = datetime.date(int(encontrado[1]), int(encontrado[2]), 1) if encontrado else None
+    return particoes
+
+
+def criar_particoes_futuras(meses=ARQUIVO_MESES_FUTUROS):
+    """
+    Garante partições mensais até `meses` meses à frente, dividindo p_futuro
+
+    Returns:
+        list: Nomes das partições criadas
+    """
+    particoes = listar_particoes()
+    if not particoes:
+        raise RuntimeError("movimentos_estoque não está particionada: aplique a migração 008")
+    ultimo = max((p['mes'] for p in particoes if p['mes']), default=None)
+    alvo = somar_meses(datetime.date.today(), meses)
+    primeiro = somar_meses(ultimo, 1) if ultimo else datetime.date.today().replace(day=1)
+    if primeiro > alvo:
+        return []
+
+    novas = definicao_particoes(primeiro, alvo)
+    Database.execute_query(
+        "ALTER TABLE movimentos_estoque REORGANIZE PARTITION p_futuro INTO (" + ", ".join(novas) + ")"
+    )
+    return [nome_particao(mes) for mes in meses_entre(primeiro, alvo)]
+
+
+def _caminhos(diretorio, mes):
+    return os.path.join(diretorio, f"{mes:%Y-%m}"), os.path.join(diretorio, f".{mes:%Y-%m}.pendente")
+
+
+def _exportar_particao(particao, mes):
+    """Lê uma partição inteira para colunas em memória, na ordem de (data_movimento, id)"""
+    colunas = {nome: array(codigo) for nome, codigo in (
+        ('id', 'q'), ('produto_id', 'l'), ('usuario_id', 'l'), ('tipo', 'b'), ('quantidade', 'l'),
+    )}
+    datas = []
+    observacoes = []
+    linhas = Database.stream_query(f"""
+        SELECT id, produto_id, usuario_id, tipo_movimento, quantidade, observacao, data_movimento
+        FROM movimentos_estoque PARTITION ({particao})
+        ORDER BY data_movimento, id
+    """, lote=5000, tuplas=True)
+    for id_, produto_id, usuario_id, tipo, quantidade, observacao, data in linhas:
+        if tipo not in CODIGOS_TIPO:
+            raise ValueError(f"Movimento {id_} com tipo desconhecido: {tipo}")
+        colunas['id'].append(id_)
+        colunas['produto_id'].append(-1 if produto_id is None else produto_id)
+        colunas['usuario_id'].append(-1 if usuario_id is None else usuario_id)
+        colunas['tipo'].append(CODIGOS_TIPO[tipo])
+        colunas['quantidade'].append(quantidade)
+        observacoes.append(observacao)
+        datas.append(data)
+
+    # A primeira partição também recebe datas anteriores ao seu mês
+    base = datetime.datetime.combine(mes, datetime.time())
+    if datas and datas[0] < base:
+        base = datas[0].replace(microsecond=0)
+    resultado = {nome: np.frombuffer(valores, dtype=valores.typecode) for nome, valores in colunas.items()}
+    resultado['segundos'] = np.array([(d - base).total_seconds() for d in datas], dtype=np.uint32)
+    return base, resultado, observacoes
+
+
+def arquivar_mes(particao, mes, diretorio=ARQUIVO_MOVIMENTOS_DIR):
+    """
+    Move uma partição mensal para um segmento em disco
+
+    O segmento é gravado num diretório .pendente, conferido contra a partição
+    (contagem, maior id e soma das quantidades), e só então a partição é
+    removida e o diretório publicado com o nome do mês.
+
+    Returns:
+        dict: meta.json do segmento
+
+    Raises:
+        RuntimeError: Se a partição mudou durante a exportação
+    """
+    destino, pendente = _caminhos(diretorio, mes)
+    if os.path.exists(pendente):
+        shutil.rmtree(pendente)
+
+    base, colunas, observacoes = _exportar_particao(particao, mes)
+    meta = gravar_segmento(pendente, mes, base, colunas, observacoes)
+
+    conferencia = Database.execute_query(f"""
+        SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(quantidade), 0)
+        FROM movimentos_estoque PARTITION ({particao})
+    """, fetch=True, tuplas=True)[0]
+    exportado = (meta['linhas'], meta['id_max'] or 0, int(colunas['quantidade'].sum(dtype=np.int64)))
+    if tuple(int(v) for v in conferencia) != exportado:
+        shutil.rmtree(pendente)
+        raise RuntimeError(f"A partição {particao} mudou durante o arquivamento; tente novamente")
+
+    Database.execute_query(f"ALTER TABLE movimentos_estoque DROP PARTITION {particao}")
+    os.rename(pendente, destino)
+    return meta
+
+
+def _concluir_pendentes(diretorio, particoes):
+    """Retoma arquivamentos interrompidos: publica os que já removeram a partição, descarta os demais"""
+    existentes = {p['mes'] for p in particoes if p['mes']}
+    if not os.path.isdir(diretorio):
+        return
+    for nome in os.listdir(diretorio):
+        encontrado = re.fullmatch(r'\.(\d{4})-(\d{2})\.pendente', nome)
+        if not encontrado:
+            continue
+        mes = datetime.date(int(encontrado[1]), int(encontrado[2]), 1)
+        destino, pendente = _caminhos(diretorio, mes)
+        if mes in existentes or os.path.exists(destino):
+            shutil.rmtree(pendente)
+        else:
+            os.rename(pendente, destino)
+            print(f"Arquivamento de {mes:%Y-%m} concluído")
+
+
+def arquivar(meses_quentes=ARQUIVO_MESES_QUENTES, diretorio=ARQUIVO_MOVIMENTOS_DIR):
+    """
+    Arquiva os meses fechados anteriores aos `meses_quentes` mais recentes
+
+    Returns:
+        list: meta.json de cada segmento criado
+    """
+    particoes = listar_particoes()
+    os.makedirs(diretorio, exist_ok=True)
+    _concluir_pendentes(diretorio, particoes)
+
+    limite = somar_meses(datetime.date.today(), -meses_quentes)
+    arquivados = []
+    for particao in particoes:
+        if particao['mes'] is None or particao['mes'] >= limite:
+            continue
+        meta = arquivar_mes(particao['nome'], particao['mes'], diretorio)
+        print(f"{meta['mes']}: {meta['linhas']} movimentos arquivados")
+        arquivados.append(meta)
+    return arquivados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partições e arquivo frio de movimentos_estoque")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    subcomandos.add_parser("particoes", help="Lista as partições e as linhas estimadas de cada uma")
+
+    manter = subcomandos.add_parser("manter", help="Cria as partições futuras e arquiva os meses antigos")
+    manter.add_argument("--meses-quentes", type=int, default=ARQUIVO_MESES_QUENTES)
+    manter.add_argument("--meses-futuros", type=int, default=ARQUIVO_MESES_FUTUROS)
+
+    subcomandos.add_parser("segmentos", help="Lista os meses arquivados")
+    args = parser.parse_args()
+
+    if args.comando == "particoes":
+        for particao in listar_particoes():
+            print(f"{particao['nome']:>10}  {particao['linhas']:>12}")
+
+    elif args.comando == "manter":
+        criadas = criar_particoes_futuras(args.meses_futuros)
+        if criadas:
+            print(f"Partições criadas: {', '.join(criadas)}")
+        if not arquivar(args.meses_quentes):
+            print("Nenhum mês a arquivar")
+
+    elif args.comando == "segmentos":
+        for segmento in reversed(arquivo_movimentos.segmentos()):
+            tamanho = sum(os.path.getsize(os.path.join(segmento.caminho, nome))
+                          for nome in os.listdir(segmento.caminho))
+            print(f"{segmento.mes}  {segmento.linhas:>10} movimentos  {tamanho / 1024 ** 2:8.1f} MB")
@@ -0,0 +1,684 @@
+# benchmark.py
+"""
+Carga e benchmark reproduzíveis da API contra um banco local.
+
+    python benchmark.py popular --produtos 5000 --movimentos 200000
+    python benchmark.py executar --url http://localhost:5000 --mix padrao --salvar antes
+    python benchmark.py executar --url http://localhost:5000 --mix padrao --comparar antes
+    python benchmark.py comparar antes depois
+    python benchmark.py memoria --linhas 1000000
+    python benchmark.py preparadas --iteracoes 5000
+
+Os dados gerados usam prefixos próprios (sku BENCH-, emails @benchmark.local,
+categorias "Bench ") e podem ser removidos com `popular --limpar`.
+As linhas de base ficam em benchmarks/<nome>.json, com o commit de origem.
+"""
+import argparse
+import datetime
+import gc
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+DIRETORIO_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+SENHA_BENCHMARK = "senha-benchmark"
+DOMINIO_EMAIL = "benchmark.local"
+# Fim do período dos movimentos gerados: fixo para que a mesma semente gere os
+# mesmos dados em qualquer dia (e baselines continuem comparáveis)
+DATA_REFERENCIA = datetime.datetime(2025, 1, 1)
+
+# Peso de cada operação em cada mix de tráfego
+MIXES = {
+    'leitura': {
+        'listar_produtos': 30,
+        'obter_produto': 40,
+        'movimentos_filtrados': 15,
+        'movimentos_produto': 15,
+    },
+    'padrao': {
+        'login': 2,
+        'listar_produtos': 25,
+        'obter_produto': 30,
+        'registrar_movimento': 20,
+        'movimentos_filtrados': 13,
+        'movimentos_produto': 10,
+    },
+    'escrita': {
+        'login': 5,
+        'obter_produto': 25,
+        'registrar_movimento': 60,
+        'movimentos_filtrados': 10,
+    },
+}
+
+
+# ------------------------
+# POPULAR O BANCO
+# ------------------------
+def limpar_dados():
+    """Remove os dados criados por `popular`"""
+    from database import Database
+
+    comandos = [
+        ("""
+            DELETE m FROM movimentos_estoque m
+            JOIN produtos p ON m.produto_id = p.id
+            WHERE p.sku LIKE %s
+        """, ('BENCH-%',)),
+        ("""
+            DELETE r FROM movimentos_resumo_diario r
+            JOIN produtos p ON r.produto_id = p.id
+            WHERE p.sku LIKE %s
+        """, ('BENCH-%',)),
+        ("DELETE FROM produtos WHERE sku LIKE %s", ('BENCH-%',)),
+        ("DELETE FROM categorias WHERE nome LIKE %s", ('Bench %',)),
+        ("DELETE FROM usuarios WHERE email LIKE %s", (f'%@{DOMINIO_EMAIL}',)),
+    ]
+    for comando, params in comandos:
+        Database.execute_query(comando, params)
+
+
+def _inserir_em_lotes(cursor, conn, query, linhas, lote=5000):
+    for inicio in range(0, len(linhas), lote):
+        cursor.executemany(query, linhas[inicio:inicio + lote])
+        conn.commit()
+
+
+def popular(categorias=20, produtos=5000, usuarios=50, movimentos=200000, dias=365, semente=42):
+    """
+    Gera dados determinísticos (mesma semente, mesmos dados) para o benchmark
+
+    Os movimentos são gerados em ordem cronológica e a quantidade final de cada
+    produto é a soma dos seus movimentos, como se tivessem passado pela API.
+    """
+    from database import Database
+    from models import Produto, ResumoMovimento, VersaoTabela
+    from senhas import servico_senhas
+
+    rnd = random.Random(semente)
+    conn = Database.get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Um único hash para todos os usuários: o bcrypt dominaria o tempo de carga
+        senha_hash = servico_senhas.gerar_hash(SENHA_BENCHMARK)
+        _inserir_em_lotes(cursor, conn,
+            "INSERT INTO usuarios (nome, email, senha, nivel_acesso) VALUES (%s, %s, %s, %s)",
+            [(f"Benchmark {i}", f"bench{i}@{DOMINIO_EMAIL}", senha_hash, 'usuario')
+             for i in range(usuarios)])
+
+        _inserir_em_lotes(cursor, conn,
+            "INSERT INTO categorias (nome, descricao) VALUES (%s, %s)",
+            [(f"Bench {i:03d}", f"Categoria de benchmark {i}") for i in range(categorias)])
+
+        cursor.execute("SELECT id FROM usuarios WHERE email LIKE %s ORDER BY id", (f'%@{DOMINIO_EMAIL}',))
+        ids_usuarios = [linha[0] for linha in cursor.fetchall()]
+        cursor.execute("SELECT id FROM categorias WHERE nome LIKE %s ORDER BY id", ('Bench %',))
+        ids_categorias = [linha[0] for linha in cursor.fetchall()]
+
+        _inserir_em_lotes(cursor, conn, """
+            INSERT INTO produtos (sku, nome, descricao, preco, quantidade, quantidade_minima, categoria_id)
+            VALUES (%s, %s, %s, %s, 0, %s, %s)
+        """, [(f"BENCH-{i:07d}", f"Produto {i:07d}", f"Produto de benchmark {i}",
+               round(rnd.uniform(1, 500), 2), rnd.randint(1, 20), rnd.choice(ids_categorias))
+              for i in range(produtos)])
+
+        cursor.execute("SELECT id FROM produtos WHERE sku LIKE %s ORDER BY id", ('BENCH-%',))
+        ids_produtos = [linha[0] for linha in cursor.fetchall()]
+
+        fim = DATA_REFERENCIA
+        segundos = dias * 86400
+        datas = sorted(fim - datetime.timedelta(seconds=rnd.randrange(segundos)) for _ in range(movimentos))
+
+        estoque = dict.fromkeys(ids_produtos, 0)
+        linhas = []
+        for data in datas:
+            produto_id = rnd.choice(ids_produtos)
+            atual = estoque[produto_id]
+            sorteio = rnd.random()
+            if sorteio < 0.02:
+                tipo, quantidade = 'ajuste', rnd.randint(0, 100)
+            elif sorteio < 0.55 or atual == 0:
+                tipo, quantidade = 'entrada', rnd.randint(1, 50)
+            else:
+                tipo, quantidade = 'saida', rnd.randint(1, atual)
+            estoque[produto_id] = atual + quantidade if tipo == 'entrada' else (
+                atual - quantidade if tipo == 'saida' else quantidade)
+            linhas.append((produto_id, rnd.choice(ids_usuarios), tipo, quantidade, None, data))
+
+        _inserir_em_lotes(cursor, conn, """
+            INSERT INTO movimentos_estoque
+                (produto_id, usuario_id, tipo_movimento, quantidade, observacao, data_movimento)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, linhas)
+
+        _inserir_em_lotes(cursor, conn,
+            "UPDATE produtos SET quantidade = %s WHERE id = %s",
+            [(quantidade, produto_id) for produto_id, quantidade in estoque.items()])
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao popular o banco: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    ResumoMovimento.reconstruir()
+    Produto.invalidar_cache()
+    VersaoTabela.incrementar('categorias', 'produtos')
+    return {'usuarios': usuarios, 'categorias': categorias, 'produtos': produtos, 'movimentos': movimentos}
+
+
+# ------------------------
+# GERAR CARGA
+# ------------------------
+class ClienteAPI:
+    """Cliente HTTP com conexão keep-alive, um por thread"""
+
+    def __init__(self, url, timeout=30):
+        partes = urlsplit(url)
+        classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self._criar = lambda: classe(partes.hostname, partes.port, timeout=timeout)
+        self._prefixo = partes.path.rstrip('/')
+        self._conexao = self._criar()
+        self.token = None
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        """Retorna (status, corpo decodificado, cabeçalho Server-Timing)"""
+        cabecalhos = {'Content-Type': 'application/json'}
+        if self.token:
+            cabecalhos['Authorization'] = f"Bearer {self.token}"
+        dados = json.dumps(corpo) if corpo is not None else None
+        try:
+            self._conexao.request(metodo, self._prefixo + caminho, body=dados, headers=cabecalhos)
+            resposta = self._conexao.getresponse()
+            bruto = resposta.read()
+        except (http.client.HTTPException, OSError):
+            # O servidor pode ter fechado a conexão keep-alive: abre outra
+            self._conexao.close()
+            self._conexao = self._criar()
+            raise
+        try:
+            conteudo = json.loads(bruto) if bruto else None
+        except ValueError:
+            conteudo = None
+        return resposta.status, conteudo, resposta.getheader('Server-Timing')
+
+    def login(self, email, senha=SENHA_BENCHMARK):
+        status, conteudo, _ = self.requisitar('POST', '/login', {'email': email, 'senha': senha})
+        if status != 200:
+            raise RuntimeError(f"Falha no login de {email}: {status} {conteudo}")
+        self.token = conteudo['token']
+
+    def fechar(self):
+        self._conexao.close()
+
+
+def _operacao(nome, cliente, rnd, contexto):
+    """Monta e executa uma operação do mix; retorna a resposta de ClienteAPI.requisitar"""
+    produto_id = rnd.choice(contexto['produtos'])
+    if nome == 'login':
+        email = f"bench{rnd.randrange(contexto['usuarios'])}@{DOMINIO_EMAIL}"
+        return cliente.requisitar('POST', '/login', {'email': email, 'senha': SENHA_BENCHMARK})
+    if nome == 'listar_produtos':
+        return cliente.requisitar('GET', '/produtos?limit=100')
+    if nome == 'obter_produto':
+        return cliente.requisitar('GET', f'/produtos/{produto_id}')
+    if nome == 'registrar_movimento':
+        # Entradas mantêm o estoque positivo, então as saídas sorteadas raramente falham
+        tipo = 'entrada' if rnd.random() < 0.6 else 'saida'
+        corpo = {'produto_id': produto_id, 'tipo_movimento': tipo, 'quantidade': rnd.randint(1, 5),
+                 'observacao': 'benchmark'}
+        return cliente.requisitar('POST', '/movimentos', corpo)
+    if nome == 'movimentos_filtrados':
+        ate = DATA_REFERENCIA.date()
+        de = ate - datetime.timedelta(days=rnd.randint(1, 90))
+        tipo = rnd.choice(('entrada', 'saida'))
+        return cliente.requisitar('GET', f'/movimentos?tipo={tipo}&de={de}&ate={ate}&limit=100')
+    if nome == 'movimentos_produto':
+        return cliente.requisitar('GET', f'/produtos/{produto_id}/movimentos?limit=50')
+    raise ValueError(f"Operação desconhecida: {nome}")
+
+
+def _tempo_db(server_timing):
+    """Extrai a duração do SQL (ms) do cabeçalho Server-Timing"""
+    if not server_timing:
+        return None
+    encontrado = re.search(r'\bdb;dur=([\d.]+)', server_timing)
+    return float(encontrado.group(1)) if encontrado else None
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not valores_ordenados:
+        return None
+    indice = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[indice]
+
+
+def resumir(amostras, duracao):
+    """Calcula latências (ms), vazão e erros de uma lista de amostras"""
+    latencias = sorted(a['latencia'] for a in amostras)
+    tempos_db = [a['db'] for a in amostras if a['db'] is not None]
+    erros = sum(1 for a in amostras if a['erro'])
+    return {
+        'requisicoes': len(amostras),
+        'erros': erros,
+        'vazao': round(len(amostras) / duracao, 2) if duracao else 0.0,
+        'p50_ms': round(percentil(latencias, 50), 2) if latencias else None,
+        'p95_ms': round(percentil(latencias, 95), 2) if latencias else None,
+        'p99_ms': round(percentil(latencias, 99), 2) if latencias else None,
+        'media_ms': round(sum(latencias) / len(latencias), 2) if latencias else None,
+        'db_media_ms': round(sum(tempos_db) / len(tempos_db), 2) if tempos_db else None,
+    }
+
+
+def executar(url, mix='padrao', concorrencia=8, duracao=30, aquecimento=5, semente=42, usuarios=50):
+    """
+    Dispara o mix de tráfego com `concorrencia` threads por `duracao` segundos
+
+    Returns:
+        dict: Configuração e resultados (total e por operação)
+    """
+    pesos = MIXES[mix]
+    operacoes = list(pesos)
+
+    preparo = ClienteAPI(url)
+    preparo.login(f"bench0@{DOMINIO_EMAIL}")
+    status, produtos, _ = preparo.requisitar('GET', '/produtos?fields=id')
+    preparo.fechar()
+    if status != 200 or not produtos:
+        raise RuntimeError("Nenhum produto encontrado; rode `python benchmark.py popular` antes")
+    contexto = {'produtos': [p['id'] for p in produtos], 'usuarios': usuarios}
+
+    amostras = []
+    lock = threading.Lock()
+    inicio_medicao = time.monotonic() + aquecimento
+    fim = inicio_medicao + duracao
+
+    def trabalhador(indice):
+        rnd = random.Random(semente + indice)
+        cliente = ClienteAPI(url)
+        cliente.login(f"bench{indice % usuarios}@{DOMINIO_EMAIL}")
+        locais = []
+        while True:
+            agora = time.monotonic()
+            if agora >= fim:
+                break
+            nome = rnd.choices(operacoes, weights=[pesos[o] for o in operacoes])[0]
+            inicio = time.perf_counter()
+            try:
+                status, _, server_timing = _operacao(nome, cliente, rnd, contexto)
+                erro = status >= 400
+            except (http.client.HTTPException, OSError):
+                status, server_timing, erro = None, None, True
+            latencia = (time.perf_counter() - inicio) * 1000
+            if agora >= inicio_medicao:
+                locais.append({'operacao': nome, 'latencia': latencia, 'erro': erro,
+                               'status': status, 'db': _tempo_db(server_timing)})
+        cliente.fechar()
+        with lock:
+            amostras.extend(locais)
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    por_operacao = {}
+    for amostra in amostras:
+        por_operacao.setdefault(amostra['operacao'], []).append(amostra)
+
+    return {
+        'configuracao': {
+            'url': url, 'mix': mix, 'concorrencia': concorrencia, 'duracao': duracao,
+            'aquecimento': aquecimento, 'semente': semente,
+        },
+        'commit': commit_atual(),
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'total': resumir(amostras, duracao),
+        'operacoes': {nome: resumir(lista, duracao) for nome, lista in sorted(por_operacao.items())},
+    }
+
+
+# ------------------------
+# MEMÓRIA DA LISTAGEM DE MOVIMENTOS
+# ------------------------
+def _movimentos_sinteticos(linhas, semente=42):
+    """Tuplas no formato de Movimento.listar_tuplas, como as do cursor"""
+    rnd = random.Random(semente)
+    inicio = datetime.datetime(2024, 1, 1)
+    tipos = ('entrada', 'saida', 'ajuste')
+    return [
+        (i, rnd.randint(1, 5000), rnd.randint(1, 50), rnd.choice(tipos), rnd.randint(1, 100),
+         None, inicio + datetime.timedelta(seconds=i * 30), f"Usuário {i % 50}",
+         f"Produto {i % 5000}", i % 20 + 1)
+        for i in range(linhas)
+    ]
+
+
+def _movimentos_do_banco(linhas):
+    from database import Database
+    from models import Movimento
+    query, params = Movimento.consulta_com_filtros()
+    return Database.execute_query(query + " LIMIT %s", params + (linhas,), fetch=True, tuplas=True)
+
+
+def _medir(funcao):
+    """Executa `funcao` e retorna (pico de memória alocada em bytes, segundos)"""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        funcao()
+        duracao = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico, duracao
+
+
+def medir_memoria(linhas=1000000, semente=42, banco=False):
+    """
+    Compara a memória de listar `linhas` movimentos nas duas representações
+
+    As tuplas de origem (o buffer do cursor) são geradas antes da medição,
+    então cada cenário mede só o que ele próprio aloca:
+    - dicionarios: um dict por linha e o JSON inteiro de uma vez (cursor dictionary=True + jsonify)
+    - tuplas: as tuplas do cursor serializadas em blocos (listar_tuplas + gerar_json)
+    - modelos_dict / modelos_slots: uma instância de Movimento por linha, sem e com __slots__
+
+    Os tempos são medidos com o tracemalloc ativo, servem só para comparação entre cenários.
+    """
+    from models import Movimento
+    from utils import linhas_para_json
+
+    tuplas = _movimentos_do_banco(linhas) if banco else _movimentos_sinteticos(linhas, semente)
+    colunas = Movimento.colunas()
+    dumps = lambda obj: json.dumps(obj, default=str)
+    MovimentoComDict = type('MovimentoComDict', (), {'__init__': Movimento.__init__})
+
+    def dicionarios():
+        itens = [dict(zip(colunas, linha)) for linha in tuplas]
+        return len(dumps(itens))
+
+    def tuplas_em_blocos():
+        return sum(len(parte) for parte in linhas_para_json(colunas, tuplas, dumps))
+
+    def modelos(classe):
+        return [classe(id=l[0], produto_id=l[1], usuario_id=l[2], tipo_movimento=l[3],
+                       quantidade=l[4], observacao=l[5]) for l in tuplas]
+
+    cenarios = {
+        'dicionarios': dicionarios,
+        'tuplas': tuplas_em_blocos,
+        'modelos_dict': lambda: modelos(MovimentoComDict),
+        'modelos_slots': lambda: modelos(Movimento),
+    }
+    resultado = {'linhas': len(tuplas), 'origem': 'banco' if banco else 'sintetica', 'cenarios': {}}
+    for nome, funcao in cenarios.items():
+        pico, duracao = _medir(funcao)
+        resultado['cenarios'][nome] = {
+            'pico_mb': round(pico / 2 ** 20, 1),
+            'bytes_por_linha': round(pico / max(len(tuplas), 1), 1),
+            'segundos': round(duracao, 3),
+        }
+    resultado['commit'] = commit_atual()
+    return resultado
+
+
+def imprimir_memoria(resultado):
+    print(f"{resultado['linhas']} movimentos ({resultado['origem']}), commit={resultado.get('commit')}")
+    print(f"{'cenário':<16}{'pico MB':>10}{'bytes/linha':>13}{'s':>8}")
+    for nome, r in resultado['cenarios'].items():
+        print(f"{nome:<16}{r['pico_mb']:>10.1f}{r['bytes_por_linha']:>13.1f}{r['segundos']:>8.2f}")
+
+
+# ------------------------
+# DECLARAÇÕES PREPARADAS
+# ------------------------
+# As consultas quentes de models.py, com o mesmo texto
+CONSULTAS_QUENTES = {
+    'usuario_por_id': "SELECT * FROM usuarios WHERE id = %s",
+    'produto_por_id': """
+                SELECT p.id AS id, p.nome AS nome, p.descricao AS descricao, p.preco AS preco,
+                       p.quantidade AS quantidade, p.quantidade_minima AS quantidade_minima,
+                       p.categoria_id AS categoria_id, c.nome AS categoria_nome
+                FROM produtos p
+                JOIN categorias c ON p.categoria_id = c.id
+                WHERE p.id = %s
+            """,
+    'versoes_tabelas': "SELECT tabela, versao FROM versoes_tabelas WHERE tabela IN (%s)",
+}
+
+
+def _status_servidor(Database):
+    linhas = Database.execute_query(
+        "SHOW GLOBAL STATUS WHERE Variable_name IN ('Com_select', 'Com_stmt_prepare', 'Com_stmt_execute')",
+        fetch=True, tuplas=True
+    )
+    return {nome: int(valor) for nome, valor in linhas}
+
+
+def medir_preparadas(iteracoes=5000, semente=42):
+    """
+    Compara, consulta a consulta, execute_query (texto analisado pelo MySQL a cada
+    execução) com executar_preparada (analisado uma vez por conexão)
+
+    Usa os usuários e produtos criados por `popular`. As execuções são
+    sequenciais, numa mesma conexão reaproveitada do pool, então a diferença
+    de latência é essencialmente o parse e o plano que deixam de ser refeitos.
+    """
+    from database import Database
+
+    rnd = random.Random(semente)
+    ids_usuarios = [l[0] for l in Database.execute_query(
+        "SELECT id FROM usuarios WHERE email LIKE %s", (f'%@{DOMINIO_EMAIL}',), fetch=True, tuplas=True)]
+    ids_produtos = [l[0] for l in Database.execute_query(
+        "SELECT id FROM produtos WHERE sku LIKE %s", ('BENCH-%',), fetch=True, tuplas=True)]
+    if not ids_usuarios or not ids_produtos:
+        raise RuntimeError("Sem dados de benchmark: rode `python benchmark.py popular` antes")
+
+    parametros = {
+        'usuario_por_id': lambda: (rnd.choice(ids_usuarios),),
+        'produto_por_id': lambda: (rnd.choice(ids_produtos),),
+        'versoes_tabelas': lambda: ('produtos',),
+    }
+    modos = {'texto': Database.execute_query, 'preparada': Database.executar_preparada}
+
+    resultado = {'iteracoes': iteracoes, 'consultas': {}, 'commit': commit_atual()}
+    for nome, query in CONSULTAS_QUENTES.items():
+        resultado['consultas'][nome] = {}
+        for modo, executar_consulta in modos.items():
+            for _ in range(min(100, iteracoes)):
+                executar_consulta(query, parametros[nome](), fetch=True)
+            antes = _status_servidor(Database)
+            latencias = []
+            for _ in range(iteracoes):
+                params = parametros[nome]()
+                inicio = time.perf_counter()
+                executar_consulta(query, params, fetch=True)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            depois = _status_servidor(Database)
+            latencias.sort()
+            resultado['consultas'][nome][modo] = {
+                'media_ms': round(sum(latencias) / len(latencias), 4),
+                'p50_ms': round(percentil(latencias, 50), 4),
+                'p95_ms': round(percentil(latencias, 95), 4),
+                'servidor': {k: depois[k] - antes[k] for k in depois},
+            }
+    resultado['pool'] = Database.estatisticas_pool()
+    return resultado
+
+
+def imprimir_preparadas(resultado):
+    print(f"{resultado['iteracoes']} execuções por consulta e modo, commit={resultado.get('commit')}")
+    print(f"{'consulta':<18}{'modo':<11}{'média ms':>10}{'p50':>9}{'p95':>9}{'prepare':>9}{'Δ média':>10}")
+    for nome, modos in resultado['consultas'].items():
+        texto = modos['texto']['media_ms']
+        for modo, r in modos.items():
+            delta = (r['media_ms'] - texto) / texto * 100 if texto else 0.0
+            print(f"{nome:<18}{modo:<11}{r['media_ms']:>10.3f}{r['p50_ms']:>9.3f}{r['p95_ms']:>9.3f}"
+                  f"{r['servidor']['Com_stmt_prepare']:>9}{delta:>+9.1f}%")
+
+
+# ------------------------
+# RELATÓRIO E LINHAS DE BASE
+# ------------------------
+def commit_atual():
+    """Commit do código medido, se estiver num repositório git"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(resultado):
+    config = resultado['configuracao']
+    print(f"mix={config['mix']} concorrencia={config['concorrencia']} duracao={config['duracao']}s "
+          f"commit={resultado.get('commit')}")
+    print(f"{'operação':<22}{'req':>8}{'erros':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'db':>8}")
+    linhas = list(resultado['operacoes'].items()) + [('TOTAL', resultado['total'])]
+    for nome, r in linhas:
+        campos = [r['p50_ms'], r['p95_ms'], r['p99_ms'], r['db_media_ms']]
+        p50, p95, p99, db = ('-' if v is None else f"{v:.1f}" for v in campos)
+        print(f"{nome:<22}{r['requisicoes']:>8}{r['erros']:>7}{r['vazao']:>9.1f}{p50:>9}{p95:>9}{p99:>9}{db:>8}")
+
+
+def caminho_baseline(nome):
+    return os.path.join(DIRETORIO_BASELINES, f"{nome}.json")
+
+
+def salvar_baseline(nome, resultado):
+    os.makedirs(DIRETORIO_BASELINES, exist_ok=True)
+    with open(caminho_baseline(nome), 'w', encoding='utf-8') as saida:
+        json.dump(resultado, saida, ensure_ascii=False, indent=2)
+
+
+def carregar_baseline(nome):
+    caminho = nome if nome.endswith('.json') else caminho_baseline(nome)
+    with open(caminho, encoding='utf-8') as entrada:
+        return json.load(entrada)
+
+
+def comparar(base, atual, tolerancia=10.0):
+    """
+    Compara p95 e vazão por operação
+
+    Returns:
+        list: Regressões acima de `tolerancia` (%), uma mensagem por item
+    """
+    regressoes = []
+    print(f"{'operação':<22}{'p95 base':>10}{'p95 atual':>11}{'Δ%':>8}{'req/s base':>12}{'req/s atual':>13}{'Δ%':>8}")
+    nomes = sorted(set(base['operacoes']) & set(atual['operacoes'])) + ['TOTAL']
+    for nome in nomes:
+        b = base['total'] if nome == 'TOTAL' else base['operacoes'][nome]
+        a = atual['total'] if nome == 'TOTAL' else atual['operacoes'][nome]
+        delta_p95 = (a['p95_ms'] - b['p95_ms']) / b['p95_ms'] * 100 if b['p95_ms'] else 0.0
+        delta_vazao = (a['vazao'] - b['vazao']) / b['vazao'] * 100 if b['vazao'] else 0.0
+        print(f"{nome:<22}{b['p95_ms']:>10.1f}{a['p95_ms']:>11.1f}{delta_p95:>+8.1f}"
+              f"{b['vazao']:>12.1f}{a['vazao']:>13.1f}{delta_vazao:>+8.1f}")
+        if delta_p95 > tolerancia:
+            regressoes.append(f"{nome}: p95 {b['p95_ms']:.1f}ms -> {a['p95_ms']:.1f}ms ({delta_p95:+.1f}%)")
+        if delta_vazao < -tolerancia:
+            regressoes.append(f"{nome}: vazão {b['vazao']:.1f} -> {a['vazao']:.1f} req/s ({delta_vazao:+.1f}%)")
+    if base['configuracao'] != atual['configuracao']:
+        print("Aviso: as execuções usaram configurações diferentes")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga e benchmark da API de estoque")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_popular = subcomandos.add_parser("popular", help="Gera dados de benchmark no banco configurado")
+    p_popular.add_argument("--categorias", type=int, default=20)
+    p_popular.add_argument("--produtos", type=int, default=5000)
+    p_popular.add_argument("--usuarios", type=int, default=50)
+    p_popular.add_argument("--movimentos", type=int, default=200000)
+    p_popular.add_argument("--dias", type=int, default=365, help="Período coberto pelos movimentos")
+    p_popular.add_argument("--semente", type=int, default=42)
+    p_popular.add_argument("--limpar", action="store_true", help="Remove os dados de benchmark antes")
+
+    p_executar = subcomandos.add_parser("executar", help="Dispara carga contra a API")
+    p_executar.add_argument("--url", default="http://localhost:5000")
+    p_executar.add_argument("--mix", choices=sorted(MIXES), default="padrao")
+    p_executar.add_argument("--concorrencia", type=int, default=8)
+    p_executar.add_argument("--duracao", type=float, default=30, help="Segundos medidos")
+    p_executar.add_argument("--aquecimento", type=float, default=5, help="Segundos descartados no início")
+    p_executar.add_argument("--semente", type=int, default=42)
+    p_executar.add_argument("--usuarios", type=int, default=50, help="Usuários criados por `popular`")
+    p_executar.add_argument("--salvar", help="Salva o resultado como linha de base com este nome")
+    p_executar.add_argument("--comparar", help="Compara com a linha de base informada")
+    p_executar.add_argument("--tolerancia", type=float, default=10.0, help="Regressão aceita, em %%")
+
+    p_comparar = subcomandos.add_parser("comparar", help="Compara duas linhas de base salvas")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("atual")
+    p_comparar.add_argument("--tolerancia", type=float, default=10.0, help="Regressão aceita, em %%")
+    p_memoria = subcomandos.add_parser("memoria", help="Mede a memória da listagem de movimentos")
+    p_memoria.add_argument("--linhas", type=int, default=1000000)
+    p_memoria.add_argument("--semente", type=int, default=42)
+    p_memoria.add_argument("--banco", action="store_true",
+                           help="Lê os movimentos do banco configurado em vez de gerá-los")
+    p_memoria.add_argument("--salvar", help="Salva o resultado em benchmarks/<nome>.json")
+    p_preparadas = subcomandos.add_parser("preparadas",
+                                          help="Compara consultas quentes em texto e preparadas no servidor")
+    p_preparadas.add_argument("--iteracoes", type=int, default=5000)
+    p_preparadas.add_argument("--semente", type=int, default=42)
+    p_preparadas.add_argument("--salvar", help="Salva o resultado em benchmarks/<nome>.json")
+    args = parser.parse_args()
+
+    if args.comando == "popular":
+        if args.limpar:
+            limpar_dados()
+        criados = popular(args.categorias, args.produtos, args.usuarios, args.movimentos,
+                          args.dias, args.semente)
+        print("Dados de benchmark gerados: " + ", ".join(f"{v} {k}" for k, v in criados.items()))
+
+    elif args.comando == "executar":
+        resultado = executar(args.url, args.mix, args.concorrencia, args.duracao,
+                             args.aquecimento, args.semente, args.usuarios)
+        imprimir(resultado)
+        if args.salvar:
+            salvar_baseline(args.salvar, resultado)
+            print(f"Linha de base salva em {caminho_baseline(args.salvar)}")
+        if args.comparar:
+            regressoes = comparar(carregar_baseline(args.comparar), resultado, args.tolerancia)
+            for regressao in regressoes:
+                print(f"REGRESSÃO {regressao}")
+            if regressoes:
+                sys.exit(1)
+
+    elif args.comando == "comparar":
+        regressoes = comparar(carregar_baseline(args.base), carregar_baseline(args.atual), args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}")
+        if regressoes:
+            sys.exit(1)
+
+    elif args.comando == "memoria":
+        resultado = medir_memoria(args.linhas, args.semente, args.banco)
+        imprimir_memoria(resultado)
+        if args.salvar:
+            salvar_baseline(args.salvar, resultado)
+            print(f"Resultado salvo em {caminho_baseline(args.salvar)}")
+
+    elif args.comando == "preparadas":
+        resultado = medir_preparadas(args.iteracoes, args.semente)
+        imprimir_preparadas(resultado)
+        if args.salvar:
+            salvar_baseline(args.salvar, resultado)
+            print(f"Resultado salvo em {caminho_baseline(args.salvar)}")
@@ -0,0 +1,341 @@
+# busca.py
+import bisect
+import datetime
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from dotenv import load_dotenv
+
+from database import Database
+from utils import decodificar_cursor
+
+load_dotenv()
+
+# As colunas de models.PRODUTO_COLUNAS: os itens do índice saem como resposta de GET /produtos?q=
+QUERY_PRODUTOS = """
+    SELECT p.id, p.nome, p.descricao, p.preco, p.quantidade, p.quantidade_minima, p.categoria_id,
+           c.nome AS categoria_nome
+    FROM produtos p
+    JOIN categorias c ON p.categoria_id = c.id
+"""
+
+# Peso de um termo por campo: (token igual ao termo, token que começa com o termo)
+PESOS = {
+    'nome': (3.0, 2.0),
+    'descricao': (1.0, 0.5),
+}
+
+
+class ErroIndiceIndisponivel(Exception):
+    """Levantada quando o índice ainda não terminou a carga inicial"""
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Pão de Açúcar' -> 'pao de acucar'"""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    """Quebra um texto em palavras normalizadas"""
+    return re.findall(r'\w+', normalizar(texto or ''))
+
+
+class IndiceProdutos:
+    """
+    Índice invertido em memória sobre nome e descrição dos produtos.
+
+    Cada palavra normalizada aponta para os produtos que a contêm; as palavras
+    ficam também numa lista ordenada, então a busca por prefixo é um bisect.
+    As linhas completas ficam no índice, e a busca não consulta o banco.
+
+    O processo que grava um produto atualiza o índice na hora (Produto.salvar e
+    Produto.excluir). Os demais workers, e as mudanças de estoque feitas por
+    movimentos, são acompanhados pela thread de sincronização: quando a versão
+    de produtos muda, relê as linhas com atualizado_em recente e, se a contagem
+    divergir, remove os produtos excluídos.
+
+    Args:
+        intervalo (float): Segundos entre verificações de mudança no banco
+        margem (float): Segundos relidos antes da última sincronização, para
+            não perder linhas de transações que confirmaram atrasadas
+    """
+
+    def __init__(self, intervalo=5, margem=60):
+        self.intervalo = intervalo
+        self.margem = margem
+        self.carregado = False
+        self._lock = threading.RLock()
+        self._thread = None
+        self._produtos = {}  # id -> linha
+        self._palavras = {}  # id -> {campo: palavras}
+        self._postagens = {campo: {} for campo in PESOS}  # campo -> palavra -> ids
+        self._ordenadas = {campo: [] for campo in PESOS}  # campo -> palavras em ordem
+        self._ordem = {}  # id -> (nome, id), desempate dentro da mesma relevância
+        self._por_categoria = {}  # categoria_id -> ids
+        self._estoque_baixo = set()
+        self._versao = None
+        self._marca = None
+        self._stats = {'buscas': 0, 'tempo_total': 0.0, 'sincronizacoes': 0, 'falhas': 0}
+
+    # ------------------------
+    # MANUTENÇÃO
+    # ------------------------
+    def _indexar(self, linha):
+        id_ = linha['id']
+        self._desindexar(id_)
+        palavras = {
+            campo: set(tokenizar(linha.get(campo)))
+            for campo in PESOS
+        }
+        for campo, conjunto in palavras.items():
+            postagens = self._postagens[campo]
+            for palavra in conjunto:
+                ids = postagens.get(palavra)
+                if ids is None:
+                    ids = postagens[palavra] = set()
+                    bisect.insort(self._ordenadas[campo], palavra)
+                ids.add(id_)
+        self._produtos[id_] = linha
+        self._palavras[id_] = palavras
+        self._ordem[id_] = (linha['nome'] or '', id_)
+        self._por_categoria.setdefault(linha['categoria_id'], set()).add(id_)
+        if linha['quantidade'] < linha['quantidade_minima']:
+            self._estoque_baixo.add(id_)
+
+    def _desindexar(self, id_):
+        palavras = self._palavras.pop(id_, None)
+        linha = self._produtos.pop(id_, None)
+        if not palavras:
+            return
+        del self._ordem[id_]
+        self._por_categoria[linha['categoria_id']].discard(id_)
+        self._estoque_baixo.discard(id_)
+        for campo, conjunto in palavras.items():
+            postagens = self._postagens[campo]
+            for palavra in conjunto:
+                ids = postagens[palavra]
+                ids.discard(id_)
+                if not ids:
+                    del postagens[palavra]
+                    ordenadas = self._ordenadas[campo]
+                    del ordenadas[bisect.bisect_left(ordenadas, palavra)]
+
+    def _estado_banco(self):
+        """Versão de produtos e horário do banco, lidos antes das linhas"""
+        linha = Database.execute_query("""
+            SELECT (SELECT versao FROM versoes_tabelas WHERE tabela = 'produtos') AS versao,
+                   NOW(6) AS agora
+        """, fetch=True)[0]
+        return linha['versao'], linha['agora']
+
+    def carregar(self):
+        """Monta o índice com todos os produtos"""
+        versao, agora = self._estado_banco()
+        linhas = Database.execute_query(QUERY_PRODUTOS, fetch=True)
+        with self._lock:
+            self._produtos.clear()
+            self._palavras.clear()
+            self._ordem.clear()
+            self._por_categoria.clear()
+            self._estoque_baixo.clear()
+            for campo in PESOS:
+                self._postagens[campo].clear()
+                self._ordenadas[campo].clear()
+            for linha in linhas:
+                self._indexar(linha)
+            self._versao, self._marca = versao, agora
+            self.carregado = True
+        return len(linhas)
+
+    def recarregar(self, *ids):
+        """Relê os produtos informados do banco (excluídos saem do índice)"""
+        if not self.carregado or not ids:
+            return
+        ids = [int(id_) for id_ in ids]
+        marcadores = ", ".join(["%s"] * len(ids))
+        linhas = Database.execute_query(QUERY_PRODUTOS + f" WHERE p.id IN ({marcadores})", tuple(ids), fetch=True)
+        with self._lock:
+            encontrados = set()
+            for linha in linhas:
+                self._indexar(linha)
+                encontrados.add(linha['id'])
+            for id_ in ids:
+                if id_ not in encontrados:
+                    self._desindexar(id_)
+
+    def remover(self, *ids):
+        """Retira produtos do índice"""
+        with self._lock:
+            for id_ in ids:
+                self._desindexar(int(id_))
+
+    def sincronizar(self):
+        """Aplica as mudanças feitas no banco por outros processos desde a última sincronização"""
+        versao, agora = self._estado_banco()
+        if versao == self._versao:
+            return
+        desde = self._marca - datetime.timedelta(seconds=self.margem)
+        linhas = Database.execute_query(QUERY_PRODUTOS + " WHERE p.atualizado_em >= %s", (desde,), fetch=True)
+        total = Database.execute_query("SELECT COUNT(*) AS total FROM produtos", fetch=True)[0]['total']
+
+        with self._lock:
+            for linha in linhas:
+                self._indexar(linha)
+            precisa_conferir = total != len(self._produtos)
+
+        if precisa_conferir:
+            # Só remove o que já estava no índice antes da leitura: um produto criado
+            # durante a consulta pode ter sido indexado por recarregar()
+            with self._lock:
+                anteriores = set(self._produtos)
+            existentes = {l['id'] for l in Database.execute_query("SELECT id FROM produtos", fetch=True)}
+            with self._lock:
+                for id_ in anteriores - existentes:
+                    self._desindexar(id_)
+
+        with self._lock:
+            self._versao, self._marca = versao, agora
+            self._stats['sincronizacoes'] += 1
+
+    def iniciar(self):
+        """Carrega o índice e mantém a sincronização em segundo plano"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="indice-produtos", daemon=True)
+                self._thread.start()
+
+    def _executar(self):
+        while True:
+            try:
+                if self.carregado:
+                    self.sincronizar()
+                else:
+                    total = self.carregar()
+                    print(f"Índice de busca carregado: {total} produtos")
+            except Exception as e:
+                self._stats['falhas'] += 1
+                print(f"Erro ao atualizar o índice de busca: {e}")
+            time.sleep(self.intervalo)
+
+    # ------------------------
+    # BUSCA
+    # ------------------------
+    def _niveis_termo(self, termo):
+        """
+        Produtos que casam com um termo, agrupados pelo maior peso obtido
+
+        Returns:
+            list: [(peso, ids)] em ordem decrescente de peso, sem ids repetidos entre grupos
+        """
+        por_peso = {}
+        for campo, (peso_exato, peso_prefixo) in PESOS.items():
+            ordenadas = self._ordenadas[campo]
+            postagens = self._postagens[campo]
+            inicio = bisect.bisect_left(ordenadas, termo)
+            fim = bisect.bisect_left(ordenadas, termo + '\uffff', inicio)
+            for palavra in ordenadas[inicio:fim]:
+                peso = peso_exato if palavra == termo else peso_prefixo
+                por_peso.setdefault(peso, []).append(postagens[palavra])
+
+        niveis = []
+        vistos = set()
+        for peso in sorted(por_peso, reverse=True):
+            ids = set().union(*por_peso[peso]) - vistos
+            if ids:
+                niveis.append((peso, ids))
+                vistos |= ids
+        return niveis
+
+    def buscar(self, texto, categoria_id=None, estoque_baixo=False, limite=20, apos=None):
+        """
+        Busca produtos cujo nome ou descrição contenham todos os termos (ou prefixos deles)
+
+        A ordem é relevância decrescente, depois nome e id. O resultado traz até
+        limite + 1 itens, com o campo `relevancia`, para passar por montar_pagina
+        com as chaves ('relevancia', 'nome', 'id').
+
+        Raises:
+            ErroIndiceIndisponivel: Se o índice ainda não foi carregado
+            ValueError: Se o cursor for inválido
+        """
+        if not self.carregado:
+            raise ErroIndiceIndisponivel("Índice de busca em carga, tente novamente em instantes")
+
+        inicio = time.perf_counter()
+        termos = set(tokenizar(texto))
+        cursor = None
+        if apos:
+            relevancia, nome, id_ = decodificar_cursor(apos, 3)
+            # Mesma normalização de _ordem: produto sem nome ordena como ''
+            cursor = (float(relevancia), (nome or '', int(id_)))
+
+        with self._lock:
+            niveis_por_termo = [self._niveis_termo(termo) for termo in termos]
+            if len(niveis_por_termo) == 1:
+                niveis = niveis_por_termo[0]
+            elif niveis_por_termo:
+                # Vários termos: a relevância é a soma dos pesos, só para quem casa com todos
+                candidatos = set.intersection(*(
+                    set().union(*(ids for _, ids in niveis_termo)) for niveis_termo in niveis_por_termo
+                ))
+                pontos = dict.fromkeys(candidatos, 0.0)
+                for niveis_termo in niveis_por_termo:
+                    for peso, ids in niveis_termo:
+                        for id_ in ids & candidatos:
+                            pontos[id_] += peso
+                agrupados = {}
+                for id_, relevancia in pontos.items():
+                    agrupados.setdefault(relevancia, set()).add(id_)
+                niveis = sorted(agrupados.items(), reverse=True)
+            else:
+                niveis = []
+
+            if categoria_id is not None:
+                da_categoria = self._por_categoria.get(categoria_id, set())
+                niveis = [(relevancia, ids & da_categoria) for relevancia, ids in niveis]
+            if estoque_baixo:
+                niveis = [(relevancia, ids & self._estoque_baixo) for relevancia, ids in niveis]
+
+            # Dentro de cada nível de relevância a ordem é (nome, id)
+            ordem = self._ordem
+            melhores = []
+            for relevancia, ids in niveis:
+                if cursor is not None:
+                    if relevancia > cursor[0]:
+                        continue
+                    if relevancia == cursor[0]:
+                        ids = [id_ for id_ in ids if ordem[id_] > cursor[1]]
+                faltam = limite + 1 - len(melhores)
+                melhores.extend(
+                    (relevancia, id_) for id_ in heapq.nsmallest(faltam, ids, key=ordem.__getitem__)
+                )
+                if len(melhores) > limite:
+                    break
+
+            itens = [dict(self._produtos[id_], relevancia=relevancia) for relevancia, id_ in melhores]
+            self._stats['buscas'] += 1
+            self._stats['tempo_total'] += time.perf_counter() - inicio
+        return itens
+
+    def estatisticas(self):
+        """Retorna tamanho do índice, buscas feitas e tempo médio por busca"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['produtos'] = len(self._produtos)
+            stats['palavras'] = {campo: len(ordenadas) for campo, ordenadas in self._ordenadas.items()}
+            stats['carregado'] = self.carregado
+        stats['tempo_medio'] = stats['tempo_total'] / stats['buscas'] if stats['buscas'] else 0.0
+        return stats
+
+
+indice_produtos = IndiceProdutos(
+    intervalo=float(os.getenv("BUSCA_SINCRONIZAR", 5)),
+    margem=float(os.getenv("BUSCA_MARGEM", 60)),
+)
@@ -0,0 +1,187 @@
+# cache.py
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """
+    Cache em memória com expiração por tempo (TTL) e descarte LRU.
+
+    Args:
+        max_itens (int): Quantidade máxima de entradas mantidas
+        ttl (float): Segundos de validade de cada entrada
+    """
+
+    # Visto por todos os processos? (invalidar num worker não limpa os outros)
+    compartilhado = False
+
+    def __init__(self, max_itens=1024, ttl=60):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def obter(self, chave, padrao=None):
+        """Retorna o valor em cache ou `padrao` se ausente/expirado"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self._stats['misses'] += 1
+                return padrao
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self._stats['misses'] += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self._stats['hits'] += 1
+            return valor
+
+    def definir(self, chave, valor, ttl=None):
+        """Armazena um valor, descartando o menos usado se o cache estiver cheio"""
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._itens[chave] = (expira_em, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidar(self, chave):
+        """Remove uma entrada do cache"""
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        """Retorna contadores de acertos, faltas e descartes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['itens'] = len(self._itens)
+        return stats
+
+    def invalidar_prefixo(self, prefixo):
+        """Remove todas as entradas cuja chave começa com `prefixo`"""
+        with self._lock:
+            for chave in [c for c in self._itens if str(c).startswith(prefixo)]:
+                del self._itens[chave]
+
+
+class CacheCompartilhadoLocal(CacheTTL):
+    """
+    Substituto local do cache compartilhado, para testes e desenvolvimento.
+    Serializa os valores como o backend Redis faria, então quem lê recebe
+    sempre uma cópia, nunca o objeto guardado.
+    """
+
+    compartilhado = True
+
+    def obter(self, chave, padrao=None):
+        bruto = super().obter(chave)
+        return padrao if bruto is None else pickle.loads(bruto)
+
+    def definir(self, chave, valor, ttl=None):
+        super().definir(chave, pickle.dumps(valor), ttl)
+
+
+class CacheRedis:
+    """
+    Cache compartilhado entre workers usando Redis (requer o pacote `redis`).
+
+    Falhas do Redis não derrubam a requisição: uma leitura vira falta, e uma
+    escrita ou invalidação que falhou é só registrada no log (a entrada antiga
+    expira pelo TTL).
+
+    Args:
+        url (str): URL de conexão, ex: redis://localhost:6379/0
+        ttl (float): Segundos de validade de cada entrada
+        prefixo (str): Prefixo das chaves, para não colidir com outros usos do Redis
+    """
+
+    compartilhado = True
+
+    def __init__(self, url, ttl=60, prefixo='estoque:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requer o pacote redis (pip install redis)")
+        self._redis = redis.Redis.from_url(url)
+        self._erros_redis = redis.RedisError
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'erros': 0}
+
+    def _contar(self, evento):
+        with self._lock:
+            self._stats[evento] += 1
+
+    def _falhou(self, operacao, chave, erro):
+        self._contar('erros')
+        print(f"Erro no cache Redis ({operacao} {chave}): {erro}")
+
+    def obter(self, chave, padrao=None):
+        try:
+            bruto = self._redis.get(self.prefixo + str(chave))
+        except self._erros_redis as e:
+            self._falhou('obter', chave, e)
+            bruto = None
+        if bruto is None:
+            self._contar('misses')
+            return padrao
+        self._contar('hits')
+        return pickle.loads(bruto)
+
+    def definir(self, chave, valor, ttl=None):
+        segundos = max(1, int(self.ttl if ttl is None else ttl))
+        try:
+            self._redis.set(self.prefixo + str(chave), pickle.dumps(valor), ex=segundos)
+        except self._erros_redis as e:
+            self._falhou('definir', chave, e)
+
+    def invalidar(self, chave):
+        try:
+            self._redis.delete(self.prefixo + str(chave))
+        except self._erros_redis as e:
+            self._falhou('invalidar', chave, e)
+
+    def invalidar_prefixo(self, prefixo):
+        try:
+            chaves = list(self._redis.scan_iter(match=self.prefixo + prefixo + '*'))
+            if chaves:
+                self._redis.delete(*chaves)
+        except self._erros_redis as e:
+            self._falhou('invalidar_prefixo', prefixo, e)
+
+    def limpar(self):
+        self.invalidar_prefixo('')
+
+    def estatisticas(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+def criar_cache(backend='memoria', max_itens=1024, ttl=60, url=None):
+    """
+    Cria o cache configurado
+
+    Args:
+        backend (str): memoria (LRU no processo), local (substituto do compartilhado) ou redis
+        max_itens (int): Limite de entradas dos backends em memória
+        ttl (float): Segundos de validade de cada entrada
+        url (str): URL do Redis
+    """
+    if backend == 'redis':
+        return CacheRedis(url or 'redis://localhost:6379/0', ttl=ttl)
+    if backend == 'local':
+        return CacheCompartilhadoLocal(max_itens=max_itens, ttl=ttl)
+    if backend == 'memoria':
+        return CacheTTL(max_itens=max_itens, ttl=ttl)
+    raise ValueError(f"Backend de cache desconhecido: {backend}")
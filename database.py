@@ -1,25 +1,710 @@
 # database.py
+import contextvars
+import functools
+import itertools
 import mysql.connector
 import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
 from dotenv import load_dotenv
+from metricas import metricas
 
 load_dotenv()
 
+
+class ErroPoolEsgotado(Exception):
+    """Levantada quando não há conexão disponível dentro do tempo limite"""
+
+
+_TRAVA_LEITURA = re.compile(r"\bFOR\s+(UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def somente_leitura(query):
+    """Indica se a consulta é um SELECT sem travas, que pode ir para uma réplica"""
+    return query.lstrip().upper().startswith("SELECT") and not _TRAVA_LEITURA.search(query)
+
+
+class ConsistenciaLeitura:
+    """
+    Decide se as leituras da requisição atual podem ir para uma réplica.
+
+    Quem acabou de escrever precisa ler o que escreveu: depois de um commit
+    no primário, as leituras da mesma requisição e as do mesmo usuário nos
+    próximos `janela` segundos ficam no primário. A janela cobre o atraso de
+    replicação aceito (ver MYSQL_REPLICA_ATRASO_MAX). O registro é por
+    processo; com vários workers, vale para o worker que recebeu a escrita.
+
+    Fora de uma requisição (scripts, migrações, threads de fundo) nada vai
+    para as réplicas.
+
+    As leituras de uma requisição ficam presas à réplica que atendeu a
+    primeira (ou vão para o primário, se ela sair de uso): assim a versão
+    lida para o ETag (ver VersaoTabela.obter) nunca é mais nova que os dados
+    lidos depois para o corpo da resposta.
+
+    Args:
+        janela (float): Segundos em que um usuário lê do primário após escrever
+    """
+
+    def __init__(self, janela=2.0):
+        self.janela = janela
+        self._sessao = contextvars.ContextVar('sessao_leitura', default=None)
+        self._lock = threading.Lock()
+        self._escritas = {}  # usuário -> momento da última escrita
+
+    def iniciar(self):
+        """Começa a sessão da requisição atual, ainda sem usuário"""
+        self._sessao.set({'usuario': None, 'escreveu': False, 'replica': None})
+
+    def identificar(self, usuario_id):
+        """Associa a sessão atual ao usuário autenticado"""
+        sessao = self._sessao.get()
+        if sessao is not None:
+            sessao['usuario'] = usuario_id
+
+    def encerrar(self):
+        self._sessao.set(None)
+
+    def registrar_escrita(self):
+        """Chamado após cada commit no primário"""
+        sessao = self._sessao.get()
+        if sessao is None:
+            return
+        sessao['escreveu'] = True
+        if sessao['usuario'] is not None:
+            agora = time.monotonic()
+            with self._lock:
+                self._escritas[sessao['usuario']] = agora
+                if len(self._escritas) > 10000:
+                    self._escritas = {u: t for u, t in self._escritas.items() if agora - t < self.janela}
+
+    def replicas_candidatas(self, replicas, proxima):
+        """
+        Réplicas a tentar, em ordem: só a fixada na sessão, se houver (lista
+        vazia se ela não existir mais), senão todas a partir de `proxima` (rodízio)
+        """
+        sessao = self._sessao.get()
+        if sessao is not None and sessao['replica'] is not None:
+            return [replica for replica in replicas if replica.endereco == sessao['replica']]
+        inicio = proxima % len(replicas)
+        return replicas[inicio:] + replicas[:inicio]
+
+    def fixar_replica(self, endereco):
+        """Prende as próximas leituras da sessão à réplica que atendeu esta"""
+        sessao = self._sessao.get()
+        if sessao is not None and sessao['replica'] is None:
+            sessao['replica'] = endereco
+
+    def pode_usar_replica(self):
+        """Indica se a leitura atual pode ir para uma réplica"""
+        sessao = self._sessao.get()
+        if sessao is None or sessao['escreveu']:
+            return False
+        if sessao['usuario'] is None:
+            return True
+        with self._lock:
+            escrita = self._escritas.get(sessao['usuario'])
+        return escrita is None or time.monotonic() - escrita >= self.janela
+
+
+consistencia_leitura = ConsistenciaLeitura(
+    janela=float(os.getenv('MYSQL_LER_PRIMARIO_APOS_ESCRITA', 2)),
+)
+
+
+class CursorInstrumentado:
+    """
+    Envolve um cursor e registra em `metricas` cada SQL executado,
+    com o tempo de execução e leitura e a quantidade de linhas
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._atual = None  # [query, duracao, linhas lidas]
+
+    def concluir(self):
+        """
+        Registra a consulta anterior (após lidas as suas linhas). Cursores que
+        ficam abertos para reuso (ver cursor_preparado) chamam ao fim de cada uso.
+        """
+        if self._atual is not None:
+            query, duracao, linhas = self._atual
+            self._atual = None
+            metricas.registrar_consulta(query, duracao, linhas or self._cursor.rowcount)
+
+    def _executar(self, metodo, query, *args, **kwargs):
+        self.concluir()
+        inicio = time.perf_counter()
+        try:
+            return metodo(query, *args, **kwargs)
+        finally:
+            self._atual = [query, time.perf_counter() - inicio, 0]
+
+    def execute(self, query, *args, **kwargs):
+        return self._executar(self._cursor.execute, query, *args, **kwargs)
+
+    def executemany(self, query, *args, **kwargs):
+        return self._executar(self._cursor.executemany, query, *args, **kwargs)
+
+    def _ler(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        if self._atual is not None:
+            self._atual[1] += time.perf_counter() - inicio
+            if isinstance(resultado, list):
+                self._atual[2] += len(resultado)
+            elif resultado is not None:
+                self._atual[2] += 1
+        return resultado
+
+    def fetchone(self):
+        return self._ler(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._ler(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._ler(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self.concluir()
+        return self._cursor.close()
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+class CursorPreparado(CursorInstrumentado):
+    """
+    Cursor preparado de uma única declaração, reaproveitado enquanto a conexão existir.
+
+    O conector só reusa a declaração já preparada quando recebe o mesmo objeto
+    str da preparação (compara com `is`); consultas montadas a cada chamada
+    (ex: f-strings) seriam preparadas de novo. Por isso execute() troca um
+    texto igual pelo objeto guardado.
+    """
+
+    def __init__(self, cursor, query):
+        super().__init__(cursor)
+        self.query = query
+
+    def execute(self, query, *args, **kwargs):
+        if query is not self.query and query == self.query:
+            query = self.query
+        return super().execute(query, *args, **kwargs)
+
+
+class ConexaoPool:
+    """
+    Envolve uma conexão do pool. Repassa tudo para a conexão real,
+    mas close() devolve a conexão ao pool em vez de fechá-la.
+    """
+
+    def __init__(self, pool, conexao):
+        self._pool = pool
+        self._conexao = conexao
+        self._devolvida = False
+
+    def close(self):
+        if not self._devolvida:
+            self._devolvida = True
+            self._pool.devolver(self._conexao)
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self._conexao.cursor(*args, **kwargs))
+
+    def commit(self):
+        self._conexao.commit()
+        if not self._pool.replica:
+            consistencia_leitura.registrar_escrita()
+
+    def cursor_preparado(self, query):
+        """
+        Cursor com `query` preparada no servidor, reaproveitado entre as retiradas
+        desta conexão (ver PoolConexoes.cursor_preparado). Não deve ser fechado.
+        """
+        return self._pool.cursor_preparado(self._conexao, query)
+
+    def esquecer_preparado(self, query):
+        """Descarta o cursor preparado de `query` (ex: após um erro na execução)"""
+        self._pool.esquecer_preparado(self._conexao, query)
+
+    def descartar(self):
+        """Fecha a conexão real em vez de devolvê-la (ex: resultado não lido)"""
+        if not self._devolvida:
+            self._devolvida = True
+            self._pool.descartar(self._conexao)
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PoolConexoes:
+    """
+    Pool de conexões MySQL com limite de tamanho, overflow, verificação
+    de conexão na retirada e reciclagem de conexões ociosas.
+
+    Args:
+        criar_conexao (callable): Função que abre uma nova conexão
+        tamanho (int): Conexões mantidas abertas no pool
+        overflow (int): Conexões extras permitidas em pico (fechadas ao devolver)
+        timeout (float): Segundos de espera por uma conexão livre
+        reciclar_apos (float): Segundos ociosos após os quais a conexão é reaberta
+        verificar (bool): Faz ping na conexão antes de entregá-la
+        max_preparadas (int): Declarações preparadas mantidas por conexão (0 desativa)
+        replica (bool): Pool de uma réplica de leitura (commits não contam como escrita)
+    """
+
+    def __init__(self, criar_conexao, tamanho=5, overflow=10, timeout=30,
+                 reciclar_apos=300, verificar=True, max_preparadas=64, replica=False):
+        self._criar_conexao = criar_conexao
+        self.tamanho = tamanho
+        self.overflow = overflow
+        self.timeout = timeout
+        self.reciclar_apos = reciclar_apos
+        self.verificar = verificar
+        self.max_preparadas = max_preparadas
+        self.replica = replica
+
+        self._ociosas = deque()  # (conexao, momento_devolucao)
+        self._preparadas = {}  # conexao -> OrderedDict(query -> cursor preparado), em ordem de uso
+        self._abertas = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'retiradas': 0,
+            'esperas': 0,
+            'tempo_espera_total': 0.0,
+            'criadas': 0,
+            'recicladas': 0,
+            'descartadas': 0,
+            'timeouts': 0,
+            'preparadas_criadas': 0,
+            'preparadas_reutilizadas': 0,
+        }
+
+    def _conexao_valida(self, conexao, momento_devolucao):
+        """Verifica se uma conexão ociosa ainda pode ser reutilizada"""
+        if self.reciclar_apos and time.monotonic() - momento_devolucao > self.reciclar_apos:
+            return 'recicladas'
+        if self.verificar:
+            try:
+                conexao.ping(reconnect=False)
+            except Exception:
+                return 'descartadas'
+        return None
+
+    def _fechar(self, conexao):
+        # As declarações preparadas morrem junto com a conexão no servidor
+        with self._cond:
+            self._preparadas.pop(conexao, None)
+        try:
+            conexao.close()
+        except Exception:
+            pass
+
+    def cursor_preparado(self, conexao, query):
+        """
+        Retorna o cursor preparado (linhas como dicionários) de `query` nesta conexão
+
+        O MySQL prepara a declaração na primeira execução do cursor; as seguintes
+        só enviam os parâmetros. Cada conexão mantém até `max_preparadas`
+        declarações, descartando a usada há mais tempo.
+        """
+        with self._cond:
+            declaracoes = self._preparadas.setdefault(conexao, OrderedDict())
+            cursor = declaracoes.get(query)
+            if cursor is not None:
+                declaracoes.move_to_end(query)
+                self._stats['preparadas_reutilizadas'] += 1
+                return cursor
+            self._stats['preparadas_criadas'] += 1
+            excedente = None
+            if len(declaracoes) >= self.max_preparadas:
+                _, excedente = declaracoes.popitem(last=False)
+
+        if excedente is not None:
+            try:
+                excedente.close()
+            except Exception:
+                pass
+        cursor = CursorPreparado(conexao.cursor(prepared=True, dictionary=True), query)
+        with self._cond:
+            declaracoes[query] = cursor
+        return cursor
+
+    def esquecer_preparado(self, conexao, query):
+        """Remove o cursor preparado de `query`, fechando-o"""
+        with self._cond:
+            cursor = self._preparadas.get(conexao, {}).pop(query, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def retirar(self):
+        """Retira uma conexão do pool, abrindo uma nova se necessário"""
+        inicio = None
+        limite = self.tamanho + self.overflow
+
+        while True:
+            ociosa = None
+            with self._cond:
+                while True:
+                    if self._ociosas:
+                        ociosa = self._ociosas.pop()
+                        break
+
+                    if self._abertas < limite:
+                        # Reserva a vaga antes de abrir a conexão fora do lock
+                        self._abertas += 1
+                        break
+
+                    if inicio is None:
+                        inicio = time.monotonic()
+                        self._stats['esperas'] += 1
+                    restante = self.timeout - (time.monotonic() - inicio)
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        self._stats['tempo_espera_total'] += time.monotonic() - inicio
+                        raise ErroPoolEsgotado(
+                            f"Nenhuma conexão disponível após {self.timeout}s"
+                        )
+                    self._cond.wait(restante)
+
+            if ociosa is None:
+                break
+
+            # O ping é feito fora do lock para não bloquear outras threads
+            conexao, momento = ociosa
+            motivo = self._conexao_valida(conexao, momento)
+            if motivo is None:
+                with self._cond:
+                    self._registrar_retirada(inicio)
+                return ConexaoPool(self, conexao)
+
+            self._fechar(conexao)
+            with self._cond:
+                self._abertas -= 1
+                self._stats[motivo] += 1
+                self._cond.notify()
+
+        try:
+            conexao = self._criar_conexao()
+        except Exception:
+            with self._cond:
+                self._abertas -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats['criadas'] += 1
+            self._registrar_retirada(inicio)
+        return ConexaoPool(self, conexao)
+
+    def _registrar_retirada(self, inicio):
+        self._stats['retiradas'] += 1
+        if inicio is not None:
+            self._stats['tempo_espera_total'] += time.monotonic() - inicio
+
+    def devolver(self, conexao):
+        """Devolve uma conexão ao pool (ou a fecha, se for de overflow)"""
+        try:
+            # Descarta qualquer transação que o chamador tenha deixado aberta
+            if conexao.in_transaction:
+                conexao.rollback()
+        except Exception:
+            self.descartar(conexao)
+            return
+
+        with self._cond:
+            if len(self._ociosas) < self.tamanho:
+                self._ociosas.append((conexao, time.monotonic()))
+                conexao = None
+            else:
+                self._abertas -= 1
+            self._cond.notify()
+
+        if conexao is not None:
+            self._fechar(conexao)
+
+    def descartar(self, conexao):
+        """Fecha uma conexão retirada e libera sua vaga no pool"""
+        self._fechar(conexao)
+        with self._cond:
+            self._abertas -= 1
+            self._stats['descartadas'] += 1
+            self._cond.notify()
+
+    def fechar_todas(self):
+        """Fecha todas as conexões ociosas do pool"""
+        with self._cond:
+            ociosas = list(self._ociosas)
+            self._ociosas.clear()
+            self._abertas -= len(ociosas)
+        for conexao, _ in ociosas:
+            self._fechar(conexao)
+
+    def estatisticas(self):
+        """Retorna um dicionário com as estatísticas de uso do pool"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['abertas'] = self._abertas
+            stats['ociosas'] = len(self._ociosas)
+            stats['em_uso'] = self._abertas - len(self._ociosas)
+            stats['tamanho'] = self.tamanho
+            stats['overflow'] = self.overflow
+            stats['preparadas'] = sum(len(d) for d in self._preparadas.values())
+        return stats
+
+
+def enderecos_replicas():
+    """Lê MYSQL_REPLICAS: 'host:porta' separados por vírgula (porta padrão: MYSQLPORT)"""
+    enderecos = []
+    for item in os.getenv('MYSQL_REPLICAS', '').split(','):
+        if item.strip():
+            host, _, porta = item.strip().partition(':')
+            enderecos.append((host, int(porta or os.getenv('MYSQLPORT', 3306))))
+    return enderecos
+
+
+class Replica:
+    """
+    Uma réplica de leitura e o seu estado: fica fora da rotação por
+    `pausa` segundos após uma falha de conexão, ou enquanto o atraso de
+    replicação (medido a cada `verificar_a_cada` segundos) passar de `atraso_max`
+    ou não puder ser medido (replicação parada, servidor que não é réplica,
+    falta de privilégio). Com atraso_max=0 o atraso não é verificado.
+
+    As regras ficam em disponivel/deve_medir/registrar_atraso/registrar_falha,
+    sem E/S, para que DatabaseAsync use o mesmo estado sobre os seus pools.
+    """
+
+    def __init__(self, host, porta, pool, atraso_max=2.0, verificar_a_cada=5.0, pausa=10.0):
+        self.endereco = f"{host}:{porta}"
+        self.pool = pool
+        self.atraso_max = atraso_max
+        self.verificar_a_cada = verificar_a_cada
+        self.pausa = pausa
+        self.atraso = None
+        self._fora_ate = 0.0
+        self._verificada_em = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'leituras': 0, 'falhas': 0, 'atrasada': 0}
+
+    @staticmethod
+    def atraso_do_status(status):
+        """Segundos de atraso numa linha de SHOW REPLICA STATUS (None se a replicação não roda)"""
+        if not status:
+            return None
+        return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+    def _medir_atraso(self, conexao):
+        cursor = conexao.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            status = cursor.fetchone()
+        finally:
+            cursor.close()
+        return Replica.atraso_do_status(status)
+
+    def disponivel(self, agora):
+        """Indica se a réplica está na rotação"""
+        return agora >= self._fora_ate
+
+    def deve_medir(self, agora):
+        """Indica se é hora de medir o atraso; marca a medição como feita"""
+        with self._lock:
+            if not self.atraso_max or agora - self._verificada_em < self.verificar_a_cada:
+                return False
+            self._verificada_em = agora
+            return True
+
+    def registrar_atraso(self, agora, atraso):
+        """Guarda o atraso medido; retorna False (e tira a réplica da rotação) se não servir"""
+        self.atraso = atraso
+        if atraso is None or atraso > self.atraso_max:
+            # Sem atraso conhecido não há como garantir a janela de consistência
+            self._afastar(agora, 'atrasada', None, ate=agora + self.verificar_a_cada)
+            return False
+        return True
+
+    def registrar_falha(self, agora, erro):
+        """Tira a réplica da rotação por `pausa` segundos após uma falha de conexão"""
+        self._afastar(agora, 'falhas', f"Réplica {self.endereco} indisponível: {erro}")
+
+    def registrar_leitura(self):
+        with self._lock:
+            self._stats['leituras'] += 1
+
+    def retirar(self):
+        """Retorna uma conexão desta réplica, ou None se ela não deve ser usada agora"""
+        agora = time.monotonic()
+        if not self.disponivel(agora):
+            return None
+        try:
+            conexao = self.pool.retirar()
+        except Exception as e:
+            self.registrar_falha(agora, e)
+            return None
+
+        if self.deve_medir(agora):
+            try:
+                atraso = self._medir_atraso(conexao)
+            except Exception as e:
+                # Sem privilégio para SHOW REPLICA STATUS, por exemplo (ver MYSQL_REPLICA_ATRASO_MAX=0)
+                print(f"Não foi possível medir o atraso da réplica {self.endereco}: {e}")
+                atraso = None
+            if not self.registrar_atraso(agora, atraso):
+                conexao.close()
+                return None
+
+        self.registrar_leitura()
+        return conexao
+
+    def _afastar(self, agora, motivo, mensagem, ate=None):
+        with self._lock:
+            self._stats[motivo] += 1
+            self._fora_ate = ate or agora + self.pausa
+        if mensagem:
+            print(mensagem)
+
+    def estatisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['atraso'] = self.atraso
+        stats['disponivel'] = self.disponivel(time.monotonic())
+        stats['pool'] = self._estatisticas_pool()
+        return stats
+
+    def _estatisticas_pool(self):
+        return self.pool.estatisticas()
+
+
 class Database:
+    _pool = None
+    _pool_lock = threading.Lock()
+    _replicas = None
+    _proxima_replica = itertools.count()
+
     @staticmethod
-    def get_connection():
+    def criar_conexao(host=None, porta=None):
+        """Abre uma nova conexão direta com o MySQL (sem pool); por padrão, com o primário"""
         return mysql.connector.connect(
-            host=os.getenv('MYSQLHOST'),
-            port=int(os.getenv('MYSQLPORT')),
+            host=host or os.getenv('MYSQLHOST'),
+            port=porta or int(os.getenv('MYSQLPORT')),
             user=os.getenv('MYSQLUSER'),
             password=os.getenv('MYSQLPASSWORD'),
             database=os.getenv('MYSQLDATABASE'),
         )
-    
+
+    @staticmethod
+    def _criar_pool(criar_conexao, replica=False):
+        return PoolConexoes(
+            criar_conexao,
+            tamanho=int(os.getenv('MYSQL_POOL_SIZE', 5)),
+            overflow=int(os.getenv('MYSQL_POOL_OVERFLOW', 10)),
+            timeout=float(os.getenv('MYSQL_POOL_TIMEOUT', 30)),
+            reciclar_apos=float(os.getenv('MYSQL_POOL_RECYCLE', 300)),
+            verificar=os.getenv('MYSQL_POOL_PRE_PING', '1') != '0',
+            max_preparadas=int(os.getenv('MYSQL_PREPARADAS_MAX', 64)),
+            replica=replica,
+        )
+
     @staticmethod
-    def execute_query(query, params=None, fetch=False):
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
+    def get_pool():
+        """Retorna o pool de conexões do primário, criando-o na primeira chamada"""
+        if Database._pool is None:
+            with Database._pool_lock:
+                if Database._pool is None:
+                    Database._pool = Database._criar_pool(Database.criar_conexao)
+        return Database._pool
+
+    @staticmethod
+    def get_replicas():
+        """Retorna as réplicas de MYSQL_REPLICAS (lista vazia se não houver)"""
+        if Database._replicas is None:
+            with Database._pool_lock:
+                if Database._replicas is None:
+                    Database._replicas = [
+                        Replica(
+                            host, porta,
+                            Database._criar_pool(functools.partial(Database.criar_conexao, host, porta), replica=True),
+                            atraso_max=float(os.getenv('MYSQL_REPLICA_ATRASO_MAX', consistencia_leitura.janela)),
+                            verificar_a_cada=float(os.getenv('MYSQL_REPLICA_VERIFICAR', 5)),
+                        )
+                        for host, porta in enderecos_replicas()
+                    ]
+        return Database._replicas
+
+    @staticmethod
+    def _conexao_replica():
+        """
+        Conexão com a réplica da sessão ou com a próxima disponível (rodízio),
+        ou None se nenhuma puder atender (ver ConsistenciaLeitura.replicas_candidatas)
+        """
+        replicas = Database.get_replicas()
+        for replica in consistencia_leitura.replicas_candidatas(replicas, next(Database._proxima_replica)):
+            conexao = replica.retirar()
+            if conexao is not None:
+                consistencia_leitura.fixar_replica(replica.endereco)
+                return conexao
+        return None
+
+    @staticmethod
+    def get_connection(leitura=False):
+        """
+        Retira uma conexão do pool; close() a devolve ao pool
+
+        Com leitura=True a conexão pode vir de uma réplica, se houver réplicas
+        e a sessão atual puder usá-las (ver ConsistenciaLeitura). Só para
+        leituras: escritas e transações ficam sempre no primário.
+        """
+        inicio = time.perf_counter()
+        try:
+            if leitura and Database.get_replicas() and consistencia_leitura.pode_usar_replica():
+                conexao = Database._conexao_replica()
+                if conexao is not None:
+                    return conexao
+            return Database.get_pool().retirar()
+        finally:
+            metricas.registrar_espera(time.perf_counter() - inicio)
+
+    @staticmethod
+    def estatisticas_pool():
+        """Retorna as estatísticas do pool de conexões"""
+        return Database.get_pool().estatisticas()
+
+    @staticmethod
+    def estatisticas_replicas():
+        """Retorna o estado e as estatísticas de cada réplica"""
+        return {replica.endereco: replica.estatisticas() for replica in Database.get_replicas()}
+
+    @staticmethod
+    def execute_query(query, params=None, fetch=False, tuplas=False, primario=False):
+        """
+        Executa uma consulta; com fetch=True retorna as linhas, senão o lastrowid
+
+        As linhas vêm como dicionários. Com tuplas=True vêm como as tuplas do
+        próprio cursor, na ordem do SELECT, o que economiza memória em
+        resultados grandes (os nomes das colunas ficam a cargo do chamador).
+        Com primario=True a leitura não vai para uma réplica (ex: para preencher
+        um cache compartilhado, que não pode guardar um valor atrasado).
+        """
+        conn = Database.get_connection(leitura=fetch and not primario and somente_leitura(query))
+        cursor = conn.cursor(dictionary=not tuplas)
         result = None
         
         try:
@@ -39,4 +724,76 @@ class Database:
             cursor.close()
             conn.close()
             
-        return result
\ No newline at end of file
+        return result
+
+    @staticmethod
+    def executar_preparada(query, params=None, fetch=False, primario=False):
+        """
+        Mesmo contrato de execute_query (linhas como dicionários, primario), com a
+        declaração preparada no servidor uma vez por conexão do pool e reaproveitada
+        depois. Para as consultas de texto fixo mais executadas; com
+        MYSQL_PREPARADAS_MAX=0 equivale a execute_query.
+        """
+        if not Database.get_pool().max_preparadas:
+            return Database.execute_query(query, params, fetch, primario=primario)
+
+        conn = Database.get_connection(leitura=fetch and not primario and somente_leitura(query))
+        try:
+            cursor = conn.cursor_preparado(query)
+            try:
+                cursor.execute(query, params or ())
+                if fetch:
+                    result = cursor.fetchall()
+                else:
+                    conn.commit()
+                    result = cursor.lastrowid
+                cursor.concluir()
+            except Exception:
+                # O cursor pode ter ficado com resultado pendente: prepara de novo na próxima vez
+                conn.esquecer_preparado(query)
+                raise
+        except Exception as e:
+            conn.rollback()
+            print(f"Erro no banco de dados: {e}")
+            raise
+        finally:
+            conn.close()
+
+        return result
+
+    @staticmethod
+    def stream_query(query, params=None, lote=1000, tuplas=False):
+        """
+        Executa uma consulta com cursor não bufferizado e entrega as linhas aos poucos
+
+        Args:
+            query (str): Consulta SQL
+            params (tuple): Parâmetros da consulta
+            lote (int): Linhas lidas do servidor por vez
+            tuplas (bool): Entrega tuplas na ordem do SELECT em vez de dicionários
+
+        Yields:
+            dict ou tuple: Uma linha do resultado por vez
+        """
+        conn = Database.get_connection(leitura=somente_leitura(query))
+        cursor = conn.cursor(dictionary=not tuplas, buffered=False)
+        concluido = False
+
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                linhas = cursor.fetchmany(lote)
+                if not linhas:
+                    break
+                yield from linhas
+            concluido = True
+        except Exception as e:
+            print(f"Erro no banco de dados: {e}")
+            raise
+        finally:
+            if concluido:
+                cursor.close()
+                conn.close()
+            else:
+                # Ainda há linhas pendentes no socket: a conexão não pode voltar ao pool
+                conn.descartar()
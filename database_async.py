@@ -0,0 +1,188 @@
+# database_async.py
+import asyncio
+import itertools
+import os
+import time
+
+import aiomysql
+from dotenv import load_dotenv
+from database import Replica, consistencia_leitura, enderecos_replicas, somente_leitura
+from metricas import metricas
+
+load_dotenv()
+
+
+class ReplicaAsync(Replica):
+    """
+    Réplica de leitura do modo assíncrono, com as mesmas regras de Replica
+    (pausa após falha, atraso medido e limitado). O pool do aiomysql é criado
+    na primeira leitura e, se a réplica estiver fora do ar, de novo após a pausa.
+    """
+
+    def __init__(self, host, porta, **kwargs):
+        super().__init__(host, porta, None, **kwargs)
+        self.host = host
+        self.porta = porta
+
+    async def _medir_atraso_async(self):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute("SHOW REPLICA STATUS")
+                return Replica.atraso_do_status(await cursor.fetchone())
+
+    async def obter_pool(self):
+        """Retorna o pool desta réplica, ou None se ela não deve ser usada agora"""
+        agora = time.monotonic()
+        if not self.disponivel(agora):
+            return None
+        if self.pool is None:
+            try:
+                self.pool = await DatabaseAsync._criar_pool(self.host, self.porta)
+            except Exception as e:
+                self.registrar_falha(agora, e)
+                return None
+
+        if self.deve_medir(agora):
+            try:
+                atraso = await self._medir_atraso_async()
+            except aiomysql.OperationalError as e:
+                self.registrar_falha(agora, e)
+                return None
+            except Exception as e:
+                print(f"Não foi possível medir o atraso da réplica {self.endereco}: {e}")
+                atraso = None
+            if not self.registrar_atraso(agora, atraso):
+                return None
+
+        self.registrar_leitura()
+        return self.pool
+
+    def _estatisticas_pool(self):
+        if self.pool is None:
+            return None
+        return {'tamanho': self.pool.size, 'livres': self.pool.freesize}
+
+
+class DatabaseAsync:
+    """
+    Acesso assíncrono ao MySQL para o modo ASGI (app_async.py).
+    Usa as mesmas variáveis MYSQL* e MYSQL_POOL_* do Database síncrono e as
+    mesmas réplicas de MYSQL_REPLICAS, com a mesma regra de consistência
+    (database.consistencia_leitura) e as mesmas regras de atraso e pausa
+    (ReplicaAsync). Uma réplica que falha cede a leitura ao primário.
+    """
+
+    _pool = None
+    _replicas = None
+    _pool_lock = None
+    _proxima_replica = itertools.count()
+
+    @staticmethod
+    async def _criar_pool(host, porta):
+        tamanho = int(os.getenv('MYSQL_POOL_SIZE', 5))
+        overflow = int(os.getenv('MYSQL_POOL_OVERFLOW', 10))
+        return await aiomysql.create_pool(
+            host=host,
+            port=porta,
+            user=os.getenv('MYSQLUSER'),
+            password=os.getenv('MYSQLPASSWORD'),
+            db=os.getenv('MYSQLDATABASE'),
+            minsize=tamanho,
+            maxsize=tamanho + overflow,
+            pool_recycle=int(float(os.getenv('MYSQL_POOL_RECYCLE', 300))),
+            autocommit=True,
+        )
+
+    @staticmethod
+    async def get_pool():
+        """Retorna o pool assíncrono do primário, criando-o na primeira chamada"""
+        if DatabaseAsync._pool is None:
+            if DatabaseAsync._pool_lock is None:
+                DatabaseAsync._pool_lock = asyncio.Lock()
+            async with DatabaseAsync._pool_lock:
+                if DatabaseAsync._pool is None:
+                    DatabaseAsync._pool = await DatabaseAsync._criar_pool(
+                        os.getenv('MYSQLHOST'), int(os.getenv('MYSQLPORT'))
+                    )
+        return DatabaseAsync._pool
+
+    @staticmethod
+    def get_replicas():
+        """Retorna as réplicas de MYSQL_REPLICAS (lista vazia se não houver)"""
+        if DatabaseAsync._replicas is None:
+            DatabaseAsync._replicas = [
+                ReplicaAsync(
+                    host, porta,
+                    atraso_max=float(os.getenv('MYSQL_REPLICA_ATRASO_MAX', consistencia_leitura.janela)),
+                    verificar_a_cada=float(os.getenv('MYSQL_REPLICA_VERIFICAR', 5)),
+                )
+                for host, porta in enderecos_replicas()
+            ]
+        return DatabaseAsync._replicas
+
+    @staticmethod
+    async def _ler_de_replica(query, params, tuplas):
+        """
+        Lê da réplica da sessão ou da próxima disponível (rodízio); retorna None
+        se nenhuma puder atender (ver ConsistenciaLeitura.replicas_candidatas)
+        """
+        replicas = DatabaseAsync.get_replicas()
+        for replica in consistencia_leitura.replicas_candidatas(replicas, next(DatabaseAsync._proxima_replica)):
+            pool = await replica.obter_pool()
+            if pool is None:
+                continue
+            try:
+                result = await DatabaseAsync._executar(pool, query, params, True, tuplas)
+                consistencia_leitura.fixar_replica(replica.endereco)
+                return result
+            except aiomysql.OperationalError as e:
+                replica.registrar_falha(time.monotonic(), e)
+            except Exception as e:
+                print(f"Erro na réplica {replica.endereco}, lendo do primário: {e}")
+                return None
+        return None
+
+    @staticmethod
+    async def _executar(pool, query, params, fetch, tuplas):
+        inicio = time.perf_counter()
+        async with pool.acquire() as conn:
+            metricas.registrar_espera(time.perf_counter() - inicio)
+            async with conn.cursor(aiomysql.Cursor if tuplas else aiomysql.DictCursor) as cursor:
+                inicio = time.perf_counter()
+                await cursor.execute(query, params or ())
+                if fetch:
+                    result = await cursor.fetchall()
+                    metricas.registrar_consulta(query, time.perf_counter() - inicio, len(result))
+                    return result
+                metricas.registrar_consulta(query, time.perf_counter() - inicio, cursor.rowcount)
+                return cursor.lastrowid
+
+    @staticmethod
+    async def execute_query(query, params=None, fetch=False, tuplas=False, primario=False):
+        """Mesmo contrato de Database.execute_query, inclusive tuplas=True, primario e o uso de réplicas"""
+        try:
+            if (fetch and not primario and somente_leitura(query)
+                    and DatabaseAsync.get_replicas() and consistencia_leitura.pode_usar_replica()):
+                result = await DatabaseAsync._ler_de_replica(query, params, tuplas)
+                if result is not None:
+                    return result
+
+            pool = await DatabaseAsync.get_pool()
+            result = await DatabaseAsync._executar(pool, query, params, fetch, tuplas)
+            if not fetch:
+                consistencia_leitura.registrar_escrita()
+            return result
+        except Exception as e:
+            print(f"Erro no banco de dados: {e}")
+            raise
+
+    @staticmethod
+    async def fechar():
+        """Fecha os pools e aguarda o encerramento das conexões"""
+        replicas = [replica.pool for replica in DatabaseAsync._replicas or []]
+        for pool in [DatabaseAsync._pool] + replicas:
+            if pool is not None:
+                pool.close()
+                await pool.wait_closed()
+        DatabaseAsync._pool = None
+        DatabaseAsync._replicas = None
@@ -0,0 +1,266 @@
+# historico.py
+"""
+Estoque de cada produto numa data passada.
+
+Snapshots periódicos (python historico.py snapshot, agendado diariamente)
+guardam a quantidade de todos os produtos e o último movimento já refletido
+nela. Para uma data D, parte-se do snapshot mais recente anterior ao fim de D
+e reaplicam-se, em ordem de id, os movimentos posteriores a ele até D.
+Movimentos de meses já arquivados (ver arquivo.py) vêm dos segmentos em disco.
+
+Alterações de quantidade feitas fora de movimentos (ex: PUT /produtos) só
+entram no histórico a partir do snapshot seguinte.
+"""
+import argparse
+import csv
+import datetime
+import sys
+
+import numpy as np
+
+from arquivo import arquivo_movimentos
+from database import Database
+from models import Movimento
+
+ENTRADA, SAIDA, AJUSTE = 0, 1, 2
+
+# Os tipos vêm codificados do banco, então cada linha chega como uma tupla de inteiros
+QUERY_MOVIMENTOS = """
+    SELECT id, produto_id,
+           CASE tipo_movimento WHEN 'entrada' THEN 0 WHEN 'saida' THEN 1 ELSE 2 END,
+           quantidade
+    FROM movimentos_estoque
+    WHERE id > %s AND data_movimento < %s{filtro}
+    ORDER BY id
+"""
+
+
+def criar_snapshot(tamanho_lote=5000):
+    """
+    Grava a quantidade atual de todos os produtos
+
+    A leitura de produtos é feita com bloqueio compartilhado: espera os movimentos
+    em andamento (que travam o produto com FOR UPDATE) terminarem e segura os
+    novos até o commit, então ultimo_movimento_id corresponde exatamente às
+    quantidades gravadas.
+
+    Returns:
+        dict: {'id', 'criado_em', 'ultimo_movimento_id', 'produtos'}
+    """
+    conn = Database.get_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.start_transaction()
+        cursor.execute("SELECT id, quantidade FROM produtos LOCK IN SHARE MODE")
+        produtos = cursor.fetchall()
+        cursor.execute("SELECT COALESCE(MAX(id), 0), NOW() FROM movimentos_estoque")
+        ultimo_movimento_id, criado_em = cursor.fetchone()
+
+        cursor.execute(
+            "INSERT INTO estoque_snapshots (criado_em, ultimo_movimento_id) VALUES (%s, %s)",
+            (criado_em, ultimo_movimento_id)
+        )
+        snapshot_id = cursor.lastrowid
+        for inicio in range(0, len(produtos), tamanho_lote):
+            cursor.executemany(
+                "INSERT INTO estoque_snapshot_itens (snapshot_id, produto_id, quantidade) VALUES (%s, %s, %s)",
+                [(snapshot_id, produto_id, quantidade)
+                 for produto_id, quantidade in produtos[inicio:inicio + tamanho_lote]]
+            )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao criar snapshot de estoque: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        'id': snapshot_id,
+        'criado_em': criado_em,
+        'ultimo_movimento_id': ultimo_movimento_id,
+        'produtos': len(produtos),
+    }
+
+
+def remover_snapshots_antigos(manter_dias):
+    """
+    Remove snapshots com mais de `manter_dias` dias, preservando o último de cada mês
+
+    Returns:
+        int: Quantidade de snapshots removidos
+    """
+    snapshots = Database.execute_query(
+        "SELECT id, criado_em FROM estoque_snapshots ORDER BY criado_em", fetch=True
+    )
+    limite = datetime.datetime.now() - datetime.timedelta(days=manter_dias)
+    ultimo_do_mes = {}
+    for s in snapshots:
+        ultimo_do_mes[(s['criado_em'].year, s['criado_em'].month)] = s['id']
+    preservados = set(ultimo_do_mes.values())
+
+    removidos = 0
+    for s in snapshots:
+        if s['criado_em'] < limite and s['id'] not in preservados:
+            Database.execute_query("DELETE FROM estoque_snapshot_itens WHERE snapshot_id = %s", (s['id'],))
+            Database.execute_query("DELETE FROM estoque_snapshots WHERE id = %s", (s['id'],))
+            removidos += 1
+    return removidos
+
+
+def reproduzir(ids_base, quantidades_base, produtos, tipos, quantidades):
+    """
+    Aplica movimentos sobre um estado inicial, de forma vetorizada
+
+    Entradas somam, saídas subtraem e um ajuste define o valor absoluto: o
+    resultado de cada produto é o seu último ajuste (ou a quantidade inicial,
+    se não houve ajuste) mais o saldo dos movimentos posteriores a ele.
+
+    Args:
+        ids_base, quantidades_base (np.ndarray): Estado inicial por produto, ordenado por id
+        produtos, tipos, quantidades (np.ndarray): Movimentos em ordem de aplicação
+
+    Returns:
+        tuple: (ids ordenados, quantidades resultantes) como np.ndarray de int64
+    """
+    ids = ids_base.astype(np.int64)
+    indices = np.searchsorted(ids, produtos)
+    encontrado = indices < len(ids)
+    encontrado[encontrado] = ids[indices[encontrado]] == produtos[encontrado]
+
+    if encontrado.all():
+        resultado = quantidades_base.astype(np.int64)
+    else:
+        # Produtos sem linha no snapshot (criados depois dele) entram com zero
+        ids = np.union1d(ids, produtos[~encontrado])
+        indices = np.searchsorted(ids, produtos)
+        resultado = np.zeros(len(ids), dtype=np.int64)
+        resultado[np.searchsorted(ids, ids_base)] = quantidades_base
+    if len(produtos) == 0:
+        return ids, resultado
+
+    posicoes = np.arange(len(produtos))
+    eh_ajuste = tipos == AJUSTE
+
+    ultimo_ajuste = np.full(len(ids), -1, dtype=np.int64)
+    np.maximum.at(ultimo_ajuste, indices[eh_ajuste], posicoes[eh_ajuste])
+    com_ajuste = ultimo_ajuste >= 0
+    resultado[com_ajuste] = quantidades[ultimo_ajuste[com_ajuste]]
+
+    delta = np.where(tipos == ENTRADA, quantidades, np.where(tipos == SAIDA, -quantidades, 0))
+    depois_do_ajuste = posicoes > ultimo_ajuste[indices]
+    saldo = np.bincount(indices[depois_do_ajuste], weights=delta[depois_do_ajuste], minlength=len(ids))
+    return ids, resultado + saldo.astype(np.int64)
+
+
+def _matriz(linhas, colunas):
+    """Converte as tuplas do cursor numa matriz de int64"""
+    if not linhas:
+        return np.empty((0, colunas), dtype=np.int64)
+    return np.array(linhas, dtype=np.int64)
+
+
+def estoque_em(data, produto_id=None):
+    """
+    Calcula o estoque de todos os produtos (ou de um) ao fim de `data`
+
+    Args:
+        data (str): 'YYYY-MM-DD' (fim do dia) ou data com hora (momento exato)
+        produto_id (int): Restringe o cálculo a um produto
+
+    Returns:
+        dict: {'data', 'snapshot', 'movimentos_reproduzidos', 'produtos': [{'produto_id', 'quantidade'}]}
+
+    Raises:
+        ValueError: Se a data for inválida
+    """
+    _, fim = Movimento._intervalo_datas(ate=data)
+    if fim is None:
+        raise ValueError("Informe a data")
+
+    filtro = " AND produto_id = %s" if produto_id is not None else ""
+    extra = (produto_id,) if produto_id is not None else ()
+
+    conn = Database.get_connection(leitura=True)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT id, criado_em, ultimo_movimento_id
+            FROM estoque_snapshots
+            WHERE criado_em < %s
+            ORDER BY criado_em DESC
+            LIMIT 1
+        """, (fim,))
+        snapshot = cursor.fetchone()
+
+        if snapshot:
+            snapshot_id, criado_em, ultimo_movimento_id = snapshot
+            cursor.execute(
+                "SELECT produto_id, quantidade FROM estoque_snapshot_itens WHERE snapshot_id = %s"
+                + filtro + " ORDER BY produto_id",
+                (snapshot_id,) + extra
+            )
+            base = _matriz(cursor.fetchall(), 2)
+        else:
+            ultimo_movimento_id = 0
+            base = _matriz([], 2)
+
+        cursor.execute(QUERY_MOVIMENTOS.format(filtro=filtro), (ultimo_movimento_id, fim) + extra)
+        movimentos = _matriz(cursor.fetchall(), 4)
+    finally:
+        cursor.close()
+        conn.close()
+
+    arquivados = arquivo_movimentos.movimentos_para_reproducao(ultimo_movimento_id, fim, produto_id)
+    if len(arquivados):
+        movimentos = np.concatenate([arquivados, movimentos])
+        movimentos = movimentos[np.argsort(movimentos[:, 0], kind='stable')]
+
+    ids, quantidades = reproduzir(base[:, 0], base[:, 1], movimentos[:, 1], movimentos[:, 2], movimentos[:, 3])
+    return {
+        'data': data,
+        'snapshot': {'id': snapshot_id, 'criado_em': criado_em} if snapshot else None,
+        'movimentos_reproduzidos': len(movimentos),
+        'produtos': [
+            {'produto_id': i, 'quantidade': q}
+            for i, q in zip(ids.tolist(), quantidades.tolist())
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshots e histórico de estoque")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    subcomandos.add_parser("snapshot", help="Grava a quantidade atual de todos os produtos")
+
+    consulta = subcomandos.add_parser("estoque-em", help="Exporta em CSV o estoque ao fim de uma data")
+    consulta.add_argument("--data", required=True, help="YYYY-MM-DD ou data com hora")
+    consulta.add_argument("--produto", type=int, help="Apenas este produto")
+    consulta.add_argument("--saida", help="Arquivo CSV de saída (padrão: saída padrão)")
+
+    limpeza = subcomandos.add_parser("limpar", help="Remove snapshots antigos, mantendo o último de cada mês")
+    limpeza.add_argument("--manter-dias", type=int, default=90)
+    args = parser.parse_args()
+
+    if args.comando == "snapshot":
+        snapshot = criar_snapshot()
+        print(f"Snapshot {snapshot['id']} gravado: {snapshot['produtos']} produtos "
+              f"até o movimento {snapshot['ultimo_movimento_id']}")
+
+    elif args.comando == "estoque-em":
+        resultado = estoque_em(args.data, args.produto)
+        saida = open(args.saida, 'w', encoding='utf-8', newline='') if args.saida else sys.stdout
+        try:
+            escritor = csv.DictWriter(saida, fieldnames=['produto_id', 'quantidade'])
+            escritor.writeheader()
+            escritor.writerows(resultado['produtos'])
+        finally:
+            if args.saida:
+                saida.close()
+
+    elif args.comando == "limpar":
+        removidos = remover_snapshots_antigos(args.manter_dias)
+        print(f"{removidos} snapshots removidos")
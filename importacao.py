@@ -0,0 +1,220 @@
+# importacao.py
+import argparse
+import csv
+import io
+import json
+import sys
+
+from database import Database
+from models import Produto
+from utils import validar_campos_obrigatorios, validar_preco, validar_quantidade
+
+CAMPOS_OBRIGATORIOS = ["sku", "nome", "preco", "categoria_id"]
+
+# Em produtos já existentes a quantidade não é alterada: o estoque só muda por movimentos
+QUERY_UPSERT = """
+    INSERT INTO produtos (sku, nome, descricao, preco, quantidade, quantidade_minima, categoria_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        nome = VALUES(nome),
+        descricao = VALUES(descricao),
+        preco = VALUES(preco),
+        quantidade_minima = VALUES(quantidade_minima),
+        categoria_id = VALUES(categoria_id)
+"""
+
+
+class LinhaInvalida:
+    """Linha que não pôde ser lida; vira um erro da linha em vez de interromper a importação"""
+
+    def __init__(self, erro):
+        self.erro = erro
+
+
+def ler_linhas(arquivo, formato):
+    """
+    Lê um arquivo de produtos linha a linha
+
+    Args:
+        arquivo: Arquivo aberto em modo texto
+        formato (str): csv, ndjson ou json (lista de objetos, carregada inteira)
+
+    Yields:
+        dict: Dados de um produto (LinhaInvalida se uma linha NDJSON não for JSON válido)
+    """
+    if formato == 'csv':
+        yield from csv.DictReader(arquivo)
+    elif formato == 'ndjson':
+        for linha in arquivo:
+            if linha.strip():
+                try:
+                    yield json.loads(linha)
+                except json.JSONDecodeError as e:
+                    yield LinhaInvalida(f"JSON inválido: {e.msg} (coluna {e.colno})")
+    elif formato == 'json':
+        dados = json.load(arquivo)
+        if not isinstance(dados, list):
+            raise ValueError("O JSON deve conter uma lista de produtos")
+        yield from dados
+    else:
+        raise ValueError("Formato inválido, use csv, ndjson ou json")
+
+
+def validar_linha(dados, categorias):
+    """
+    Valida e normaliza uma linha da importação
+
+    Returns:
+        tuple: (parâmetros do upsert ou None, mensagem de erro ou None)
+    """
+    if isinstance(dados, LinhaInvalida):
+        return None, dados.erro
+    if not isinstance(dados, dict):
+        return None, "Linha deve ser um objeto"
+
+    valido, msg = validar_campos_obrigatorios(dados, CAMPOS_OBRIGATORIOS)
+    if not valido:
+        return None, msg
+
+    if not validar_preco(dados['preco']):
+        return None, "Preço inválido"
+
+    # Só o campo ausente (ou vazio no CSV) recebe o padrão: 0 é um valor válido
+    quantidade = dados.get('quantidade')
+    if quantidade in (None, ''):
+        quantidade = 0
+    quantidade_minima = dados.get('quantidade_minima')
+    if quantidade_minima in (None, ''):
+        quantidade_minima = 5
+    if not validar_quantidade(quantidade) or not validar_quantidade(quantidade_minima):
+        return None, "Quantidade inválida"
+
+    try:
+        categoria_id = int(dados['categoria_id'])
+    except (TypeError, ValueError):
+        return None, "categoria_id inválido"
+    if categoria_id not in categorias:
+        return None, "Categoria não encontrada"
+
+    return (
+        str(dados['sku']).strip(),
+        dados['nome'],
+        dados.get('descricao'),
+        float(dados['preco']),
+        int(quantidade),
+        int(quantidade_minima),
+        categoria_id,
+    ), None
+
+
+def _gravar_lote(conn, cursor, lote, erros):
+    """Grava um lote com um único executemany; se falhar, isola as linhas com erro"""
+    try:
+        cursor.executemany(QUERY_UPSERT, [params for _, params in lote])
+        conn.commit()
+        return len(lote)
+    except Exception:
+        conn.rollback()
+
+    gravadas = 0
+    for numero, params in lote:
+        try:
+            cursor.execute(QUERY_UPSERT, params)
+            conn.commit()
+            gravadas += 1
+        except Exception as e:
+            conn.rollback()
+            erros.append({'linha': numero, 'erro': str(e)})
+    return gravadas
+
+
+def importar_produtos(linhas, tamanho_lote=1000, progresso=None):
+    """
+    Importa produtos em lotes com INSERT ... ON DUPLICATE KEY UPDATE pelo sku
+
+    Args:
+        linhas (iterable): Dicionários com os dados dos produtos
+        tamanho_lote (int): Linhas gravadas por commit
+        progresso (callable): Chamada após cada lote com (processadas, gravadas, erros)
+
+    Returns:
+        dict: {'processadas': int, 'gravadas': int, 'erros': [{'linha', 'erro'}]}
+    """
+    categorias = {c['id'] for c in Database.execute_query("SELECT id FROM categorias", fetch=True)}
+
+    conn = Database.get_connection()
+    cursor = conn.cursor()
+    erros = []
+    processadas = 0
+    gravadas = 0
+    lote = []
+
+    try:
+        for numero, dados in enumerate(linhas, 1):
+            processadas += 1
+            params, erro = validar_linha(dados, categorias)
+            if erro:
+                erros.append({'linha': numero, 'erro': erro})
+                continue
+
+            lote.append((numero, params))
+            if len(lote) >= tamanho_lote:
+                gravadas += _gravar_lote(conn, cursor, lote, erros)
+                lote = []
+                if progresso:
+                    progresso(processadas, gravadas, len(erros))
+
+        if lote:
+            gravadas += _gravar_lote(conn, cursor, lote, erros)
+            if progresso:
+                progresso(processadas, gravadas, len(erros))
+    finally:
+        cursor.close()
+        conn.close()
+        if gravadas:
+            # O upsert é pelo sku, então não sabemos quais ids mudaram
+            Produto.invalidar_cache()
+
+    return {'processadas': processadas, 'gravadas': gravadas, 'erros': erros}
+
+
+def detectar_formato(nome_arquivo):
+    """Deduz o formato pela extensão do arquivo"""
+    extensao = nome_arquivo.rsplit('.', 1)[-1].lower() if '.' in nome_arquivo else ''
+    return {'csv': 'csv', 'ndjson': 'ndjson', 'jsonl': 'ndjson', 'json': 'json'}.get(extensao)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa produtos em massa (CSV, NDJSON ou JSON)")
+    parser.add_argument("arquivo", help="Caminho do arquivo ou - para ler da entrada padrão")
+    parser.add_argument("--formato", choices=["csv", "ndjson", "json"])
+    parser.add_argument("--lote", type=int, default=1000, help="Linhas por commit")
+    parser.add_argument("--relatorio", help="Grava os erros por linha neste arquivo JSON")
+    args = parser.parse_args()
+
+    formato = args.formato or detectar_formato(args.arquivo)
+    if not formato:
+        parser.error("Não foi possível deduzir o formato; use --formato")
+
+    def mostrar_progresso(processadas, gravadas, erros):
+        print(f"{processadas} linhas processadas, {gravadas} gravadas, {erros} com erro", file=sys.stderr)
+
+    if args.arquivo == '-':
+        arquivo = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    else:
+        arquivo = open(args.arquivo, encoding='utf-8', newline='')
+
+    with arquivo:
+        resultado = importar_produtos(
+            ler_linhas(arquivo, formato), tamanho_lote=args.lote, progresso=mostrar_progresso
+        )
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as saida:
+            json.dump(resultado['erros'], saida, ensure_ascii=False, indent=2)
+
+    print(f"Importação concluída: {resultado['gravadas']} de {resultado['processadas']} linhas gravadas")
+    for erro in resultado['erros'][:20]:
+        print(f"  linha {erro['linha']}: {erro['erro']}")
+    if len(resultado['erros']) > 20:
+        print(f"  ... e mais {len(resultado['erros']) - 20} erros")
@@ -0,0 +1,225 @@
+# metricas.py
+import contextvars
+import functools
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Limites (em segundos) dos histogramas de latência
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Limites da quantidade de consultas SQL por requisição
+LIMITES_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+_requisicao_atual = contextvars.ContextVar('requisicao_atual', default=None)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalizar_sql(query):
+    """
+    Reduz uma consulta à sua forma canônica, sem literais e sem variação de
+    espaços, para agrupar execuções da mesma declaração
+
+    Ex: "SELECT * FROM produtos WHERE id IN (%s, %s)" -> "SELECT * FROM produtos WHERE id IN (?)"
+    """
+    if isinstance(query, (bytes, bytearray)):
+        query = query.decode('utf-8', 'replace')
+    sql = re.sub(r"'(?:[^'\\]|\\.|'')*'", "?", query)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = sql.replace("%s", "?")
+    sql = re.sub(r"\s+", " ", sql).strip()
+    sql = re.sub(r"\bIN \(\?(?:, ?\?)*\)", "IN (?)", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"(VALUES \([^)]*\))(?:, ?\([^)]*\))+", r"\1", sql, flags=re.IGNORECASE)
+    return sql
+
+
+def _log(evento, **dados):
+    """Imprime um evento como uma linha JSON"""
+    print(json.dumps({'evento': evento, **dados}, ensure_ascii=False, default=str))
+
+
+class Histograma:
+    """Histograma cumulativo no formato do Prometheus"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class RequisicaoSQL:
+    """Totais de SQL acumulados durante uma requisição"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_espera = 0.0
+        self.linhas = 0
+        self.por_declaracao = {}  # sql normalizado -> execuções
+        self.n_mais_1 = []
+
+    def server_timing(self, duracao):
+        """Valor do cabeçalho Server-Timing com os tempos em milissegundos"""
+        return (
+            f'db;dur={self.tempo_sql * 1000:.2f};desc="{self.consultas} consultas", '
+            f'pool;dur={self.tempo_espera * 1000:.2f}, '
+            f'total;dur={duracao * 1000:.2f}'
+        )
+
+
+class Metricas:
+    """
+    Instrumentação das consultas SQL e das requisições HTTP.
+
+    Cada consulta alimenta o histograma da sua declaração normalizada e os
+    totais da requisição em andamento (guardados num ContextVar, então cada
+    thread ou task vê apenas a sua). As métricas são por processo: com vários
+    workers do gunicorn, cada um expõe as suas em /metrics.
+
+    Args:
+        lenta_ms (float): Consultas acima deste tempo são registradas no log
+        n_mais_1 (int): Execuções da mesma declaração numa requisição a partir das quais se avisa de N+1
+        max_declaracoes (int): Declarações distintas com série própria; as demais vão para "outras"
+        log_requisicoes (bool): Registra os totais de cada requisição no log
+    """
+
+    def __init__(self, lenta_ms=200, n_mais_1=10, max_declaracoes=200, log_requisicoes=True):
+        self.lenta = lenta_ms / 1000
+        self.n_mais_1 = n_mais_1
+        self.max_declaracoes = max_declaracoes
+        self.log_requisicoes = log_requisicoes
+        self._lock = threading.Lock()
+        self._series = {}  # nome -> {rotulos: Histograma}
+        self._limites = {
+            'http_requisicao_segundos': LIMITES_LATENCIA,
+            'sql_consulta_segundos': LIMITES_LATENCIA,
+            'sql_espera_conexao_segundos': LIMITES_LATENCIA,
+            'sql_consultas_por_requisicao': LIMITES_CONSULTAS,
+        }
+
+    def _observar(self, nome, rotulos, valor):
+        with self._lock:
+            series = self._series.setdefault(nome, {})
+            histograma = series.get(rotulos)
+            if histograma is None:
+                histograma = series[rotulos] = Histograma(self._limites[nome])
+            histograma.observar(valor)
+
+    def iniciar_requisicao(self):
+        """Começa a acumular os totais de SQL da requisição atual"""
+        _requisicao_atual.set(RequisicaoSQL())
+
+    def registrar_espera(self, segundos):
+        """Registra o tempo gasto para obter uma conexão do pool"""
+        self._observar('sql_espera_conexao_segundos', (), segundos)
+        requisicao = _requisicao_atual.get()
+        if requisicao is not None:
+            requisicao.tempo_espera += segundos
+
+    def registrar_consulta(self, query, duracao, linhas):
+        """Registra uma execução de SQL (duração em segundos, linhas lidas ou afetadas)"""
+        sql = normalizar_sql(query)
+        with self._lock:
+            conhecidas = self._series.get('sql_consulta_segundos', {})
+            rotulo = sql if (sql,) in conhecidas or len(conhecidas) < self.max_declaracoes else 'outras'
+        self._observar('sql_consulta_segundos', (rotulo,), duracao)
+
+        requisicao = _requisicao_atual.get()
+        if requisicao is not None:
+            requisicao.consultas += 1
+            requisicao.tempo_sql += duracao
+            requisicao.linhas += max(linhas, 0)
+            execucoes = requisicao.por_declaracao.get(sql, 0) + 1
+            requisicao.por_declaracao[sql] = execucoes
+            if execucoes == self.n_mais_1:
+                requisicao.n_mais_1.append(sql)
+                _log('possivel_n_mais_1', sql=sql, execucoes=execucoes)
+
+        if duracao >= self.lenta:
+            _log('consulta_lenta', sql=sql, duracao_ms=round(duracao * 1000, 2), linhas=linhas)
+
+    def finalizar_requisicao(self, metodo, rota, status):
+        """
+        Encerra a requisição atual, alimentando os histogramas da rota
+
+        Returns:
+            tuple: (RequisicaoSQL, duração em segundos) ou (None, None) se não havia requisição
+        """
+        requisicao = _requisicao_atual.get()
+        if requisicao is None:
+            return None, None
+        _requisicao_atual.set(None)
+
+        duracao = time.perf_counter() - requisicao.inicio
+        self._observar('http_requisicao_segundos', (metodo, rota, str(status)), duracao)
+        self._observar('sql_consultas_por_requisicao', (metodo, rota), requisicao.consultas)
+
+        if self.log_requisicoes:
+            _log(
+                'requisicao',
+                metodo=metodo,
+                rota=rota,
+                status=status,
+                duracao_ms=round(duracao * 1000, 2),
+                consultas=requisicao.consultas,
+                sql_ms=round(requisicao.tempo_sql * 1000, 2),
+                espera_conexao_ms=round(requisicao.tempo_espera * 1000, 2),
+                linhas=requisicao.linhas,
+                n_mais_1=requisicao.n_mais_1,
+            )
+        return requisicao, duracao
+
+    def exportar(self):
+        """Exporta os histogramas no formato de texto do Prometheus"""
+        nomes_rotulos = {
+            'http_requisicao_segundos': ('metodo', 'rota', 'status'),
+            'sql_consulta_segundos': ('sql',),
+            'sql_espera_conexao_segundos': (),
+            'sql_consultas_por_requisicao': ('metodo', 'rota'),
+        }
+
+        def formatar(rotulos):
+            if not rotulos:
+                return ''
+            pares = []
+            for chave, valor in rotulos:
+                valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                pares.append(f'{chave}="{valor}"')
+            return '{' + ','.join(pares) + '}'
+
+        linhas = []
+        with self._lock:
+            for nome, series in self._series.items():
+                metrica = f"estoque_{nome}"
+                linhas.append(f"# TYPE {metrica} histogram")
+                for valores, histograma in series.items():
+                    rotulos = list(zip(nomes_rotulos[nome], valores))
+                    acumulado = 0
+                    for limite, contagem in zip(histograma.limites, histograma.contagens):
+                        acumulado += contagem
+                        linhas.append(f"{metrica}_bucket{formatar(rotulos + [('le', limite)])} {acumulado}")
+                    linhas.append(f"{metrica}_bucket{formatar(rotulos + [('le', '+Inf')])} {histograma.total}")
+                    linhas.append(f"{metrica}_sum{formatar(rotulos)} {histograma.soma}")
+                    linhas.append(f"{metrica}_count{formatar(rotulos)} {histograma.total}")
+        return "\n".join(linhas) + "\n"
+
+
+metricas = Metricas(
+    lenta_ms=float(os.getenv("SQL_LENTA_MS", 200)),
+    n_mais_1=int(os.getenv("SQL_N_MAIS_1", 10)),
+    max_declaracoes=int(os.getenv("SQL_MAX_DECLARACOES", 200)),
+    log_requisicoes=os.getenv("LOG_REQUISICOES", "1") == "1",
+)
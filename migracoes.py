@@ -0,0 +1,323 @@
+# migracoes.py
+import sys
+
+from database import Database
+
+def _remover_chaves_estrangeiras_movimentos(cursor):
+    """Tabelas particionadas do InnoDB não aceitam chaves estrangeiras"""
+    cursor.execute("""
+        SELECT CONSTRAINT_NAME
+        FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'movimentos_estoque'
+    """)
+    for (nome,) in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE movimentos_estoque DROP FOREIGN KEY `{nome}`")
+
+
+def _particionar_movimentos(cursor):
+    """
+    Uma partição por mês, do movimento mais antigo até alguns meses à frente
+
+    A coluna de partição precisa estar em toda chave única, e RANGE COLUMNS
+    não aceita TIMESTAMP: tipo da coluna, chave primária e partições mudam
+    num único ALTER, que reconstrói a tabela uma vez só.
+    """
+    from arquivo import ARQUIVO_MESES_FUTUROS, definicao_particoes, somar_meses
+
+    cursor.execute("SELECT MIN(data_movimento), CURRENT_DATE FROM movimentos_estoque")
+    primeiro, hoje = cursor.fetchone()
+    particoes = definicao_particoes(primeiro.date() if primeiro else hoje, somar_meses(hoje, ARQUIVO_MESES_FUTUROS))
+    cursor.execute(
+        "ALTER TABLE movimentos_estoque"
+        " MODIFY data_movimento DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+        " DROP PRIMARY KEY, ADD PRIMARY KEY (id, data_movimento)"
+        " PARTITION BY RANGE COLUMNS (data_movimento) (" + ", ".join(particoes) + ")"
+    )
+
+
+# Migrações de schema, aplicadas em ordem e registradas em schema_migracoes.
+# Cada comando é um SQL ou uma função que recebe o cursor.
+# Nunca altere uma migração já publicada: acrescente uma nova ao final.
+MIGRACOES = [
+    (
+        "001_produtos_estoque_baixo",
+        [
+            # Coluna calculada pelo próprio MySQL em qualquer escrita de produtos,
+            # indexada para que a lista de estoque baixo não varra a tabela inteira
+            """
+            ALTER TABLE produtos
+            ADD COLUMN estoque_baixo TINYINT(1)
+                GENERATED ALWAYS AS (quantidade < quantidade_minima) STORED
+            """,
+            "CREATE INDEX idx_produtos_estoque_baixo ON produtos (estoque_baixo)",
+        ],
+    ),
+    (
+        "002_produtos_sku",
+        [
+            # Código do fornecedor, chave do upsert da importação em massa
+            "ALTER TABLE produtos ADD COLUMN sku VARCHAR(64) NULL",
+            "CREATE UNIQUE INDEX uq_produtos_sku ON produtos (sku)",
+        ],
+    ),
+    (
+        "003_versoes_tabelas",
+        [
+            # Contador de alterações por tabela, base dos ETags das listagens
+            """
+            CREATE TABLE versoes_tabelas (
+                tabela VARCHAR(64) PRIMARY KEY,
+                versao BIGINT UNSIGNED NOT NULL DEFAULT 0
+            )
+            """,
+            "INSERT INTO versoes_tabelas (tabela) VALUES ('produtos'), ('categorias')",
+        ],
+    ),
+    (
+        "004_indices_movimentos",
+        [
+            # Um índice por combinação de filtros de Movimento.listar_com_filtros.
+            # O InnoDB acrescenta o id ao fim de cada índice secundário, então
+            # todos também atendem ao ORDER BY data_movimento DESC, id DESC.
+            "CREATE INDEX idx_movimentos_data ON movimentos_estoque (data_movimento)",
+            "CREATE INDEX idx_movimentos_tipo_data ON movimentos_estoque (tipo_movimento, data_movimento)",
+            "CREATE INDEX idx_movimentos_produto_data ON movimentos_estoque (produto_id, data_movimento)",
+            # Filtro por categoria: produtos da categoria -> movimentos por produto_id
+            "CREATE INDEX idx_produtos_categoria_nome ON produtos (categoria_id, nome)",
+            # Paginação de GET /produtos por (nome, id)
+            "CREATE INDEX idx_produtos_nome ON produtos (nome)",
+        ],
+    ),
+    (
+        "005_movimentos_resumo_diario",
+        [
+            # Totais diários por produto e tipo, mantidos por Movimento.salvar
+            """
+            CREATE TABLE movimentos_resumo_diario (
+                dia DATE NOT NULL,
+                produto_id INT NOT NULL,
+                tipo_movimento VARCHAR(20) NOT NULL,
+                movimentos INT UNSIGNED NOT NULL DEFAULT 0,
+                quantidade_total BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, produto_id, tipo_movimento),
+                INDEX idx_resumo_produto_dia (produto_id, dia)
+            )
+            """,
+        ],
+    ),
+    (
+        "006_estoque_snapshots",
+        [
+            # Quantidade de cada produto num momento, ponto de partida de historico.estoque_em
+            """
+            CREATE TABLE estoque_snapshots (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                criado_em DATETIME NOT NULL,
+                ultimo_movimento_id INT NOT NULL DEFAULT 0,
+                INDEX idx_snapshots_criado_em (criado_em)
+            )
+            """,
+            """
+            CREATE TABLE estoque_snapshot_itens (
+                snapshot_id INT NOT NULL,
+                produto_id INT NOT NULL,
+                quantidade INT NOT NULL,
+                PRIMARY KEY (snapshot_id, produto_id)
+            )
+            """,
+        ],
+    ),
+    (
+        "007_produtos_atualizado_em",
+        [
+            # Permite ao índice de busca de cada worker reler só os produtos alterados
+            """
+            ALTER TABLE produtos
+            ADD COLUMN atualizado_em TIMESTAMP(6) NOT NULL
+                DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+            """,
+            "CREATE INDEX idx_produtos_atualizado_em ON produtos (atualizado_em)",
+        ],
+    ),
+    (
+        "008_particionar_movimentos",
+        [
+            # Partição mensal por data_movimento: meses antigos saem da tabela
+            # com DROP PARTITION e vão para o arquivo em disco (arquivo.py).
+            _remover_chaves_estrangeiras_movimentos,
+            _particionar_movimentos,
+            # Sem as chaves estrangeiras, produtos e usuários com movimentos no
+            # MySQL continuam protegidos contra exclusão pelos gatilhos abaixo
+            # (Produto.excluir também confere o resumo diário e o arquivo)
+            """
+            CREATE TRIGGER trg_produtos_excluir_com_movimentos
+            BEFORE DELETE ON produtos FOR EACH ROW
+            BEGIN
+                IF EXISTS (SELECT 1 FROM movimentos_estoque WHERE produto_id = OLD.id) THEN
+                    SIGNAL SQLSTATE '45000'
+                        SET MESSAGE_TEXT = 'Produto possui movimentos e não pode ser excluído';
+                END IF;
+            END
+            """,
+            """
+            CREATE TRIGGER trg_usuarios_excluir_com_movimentos
+            BEFORE DELETE ON usuarios FOR EACH ROW
+            BEGIN
+                IF EXISTS (SELECT 1 FROM movimentos_estoque WHERE usuario_id = OLD.id) THEN
+                    SIGNAL SQLSTATE '45000'
+                        SET MESSAGE_TEXT = 'Usuário possui movimentos e não pode ser excluído';
+                END IF;
+            END
+            """,
+        ],
+    ),
+    (
+        "009_reposicao_sugerida",
+        [
+            # Resultado de reposicao.py calcular: parâmetros do cálculo e sugestão por produto
+            """
+            CREATE TABLE reposicao_calculos (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                calculado_em DATETIME NOT NULL,
+                janela_dias INT NOT NULL,
+                prazo_dias DECIMAL(6,2) NOT NULL,
+                nivel_servico DECIMAL(5,4) NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE reposicao_sugerida (
+                calculo_id INT NOT NULL,
+                produto_id INT NOT NULL,
+                demanda_media DOUBLE NOT NULL,
+                demanda_desvio DOUBLE NOT NULL,
+                dias_com_saida INT NOT NULL,
+                estoque_seguranca INT NOT NULL,
+                ponto_reposicao INT NOT NULL,
+                PRIMARY KEY (calculo_id, produto_id)
+            )
+            """,
+        ],
+    ),
+]
+
+# Filtros de Movimento.consulta_com_filtros e os índices que o plano deve usar
+# em cada tabela. Rode com dados em volume realista: em tabelas pequenas o
+# otimizador pode preferir varrer a tabela.
+PLANOS_ESPERADOS = [
+    (
+        {'tipo_movimento': 'saida', 'de': '2024-01-01', 'ate': '2024-01-31'},
+        {'m': {'idx_movimentos_tipo_data'}},
+    ),
+    (
+        {'produto_id': 1, 'de': '2024-01-01', 'ate': '2024-01-31'},
+        {'m': {'idx_movimentos_produto_data'}},
+    ),
+    (
+        {'data': '2024-01-15'},
+        {'m': {'idx_movimentos_data', 'idx_movimentos_tipo_data', 'idx_movimentos_produto_data'}},
+    ),
+    (
+        {'categoria_id': 1, 'de': '2024-01-01', 'ate': '2024-01-31'},
+        {'p': {'idx_produtos_categoria_nome'}, 'm': {'idx_movimentos_produto_data'}},
+    ),
+]
+
+
+def migracoes_aplicadas(cursor):
+    """Retorna o conjunto de migrações já aplicadas no banco"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migracoes (
+            nome VARCHAR(100) PRIMARY KEY,
+            aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT nome FROM schema_migracoes")
+    return {linha[0] for linha in cursor.fetchall()}
+
+
+def aplicar_migracoes():
+    """
+    Aplica as migrações pendentes
+
+    Returns:
+        list: Nomes das migrações aplicadas nesta execução
+    """
+    conn = Database.get_connection()
+    cursor = conn.cursor()
+    aplicadas = []
+
+    try:
+        ja_aplicadas = migracoes_aplicadas(cursor)
+        for nome, comandos in MIGRACOES:
+            if nome in ja_aplicadas:
+                continue
+            # DDL no MySQL faz commit implícito: cada comando é aplicado na hora
+            for comando in comandos:
+                if callable(comando):
+                    comando(cursor)
+                else:
+                    cursor.execute(comando)
+            cursor.execute("INSERT INTO schema_migracoes (nome) VALUES (%s)", (nome,))
+            conn.commit()
+            aplicadas.append(nome)
+            print(f"Migração aplicada: {nome}")
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao aplicar migrações: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    return aplicadas
+
+
+def conferir_plano(filtros, esperados):
+    """
+    Executa EXPLAIN na consulta de Movimento.consulta_com_filtros(**filtros)
+
+    Returns:
+        list: Mensagens descrevendo cada tabela cujo plano difere do esperado
+    """
+    from models import Movimento
+
+    query, params = Movimento.consulta_com_filtros(**filtros)
+    plano = Database.execute_query("EXPLAIN " + query, params, fetch=True)
+    por_tabela = {linha['table']: linha for linha in plano}
+
+    falhas = []
+    for tabela, indices in esperados.items():
+        linha = por_tabela.get(tabela)
+        if linha is None:
+            falhas.append(f"{filtros}: tabela {tabela} ausente do plano")
+        elif linha['type'] == 'ALL' or linha['key'] not in indices:
+            falhas.append(
+                f"{filtros}: {tabela} usou type={linha['type']} key={linha['key']}, "
+                f"esperado um de {sorted(indices)}"
+            )
+    return falhas
+
+
+def verificar_planos():
+    """
+    Executa EXPLAIN nas consultas de PLANOS_ESPERADOS e confere os índices usados
+
+    Returns:
+        list: Mensagens descrevendo cada plano diferente do esperado
+    """
+    falhas = []
+    for filtros, esperados in PLANOS_ESPERADOS:
+        falhas.extend(conferir_plano(filtros, esperados))
+    return falhas
+
+
+if __name__ == "__main__":
+    if "--verificar-planos" in sys.argv:
+        falhas = verificar_planos()
+        for falha in falhas:
+            print(falha)
+        if falhas:
+            sys.exit(1)
+        print("Todos os planos usam os índices esperados")
+    elif not aplicar_migracoes():
+        print("Nenhuma migração pendente")
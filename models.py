@@ -1,9 +1,173 @@
 # models.py
-from database import Database
-import bcrypt
+from database import Database, consistencia_leitura
+from cache import CacheTTL, criar_cache
+from agrupamento import AgrupadorEscritas
+from arquivo import arquivo_movimentos
+from busca import indice_produtos
+from utils import codificar_cursor, decodificar_cursor, projetar_campos, validar_quantidade
+from senhas import servico_senhas
 import datetime
+import itertools
+import os
+
+# Cache dos usuários autenticados, usado por token_requerido
+cache_usuarios = CacheTTL(
+    max_itens=int(os.getenv('USUARIO_CACHE_MAX', 1024)),
+    ttl=float(os.getenv('USUARIO_CACHE_TTL', 60)),
+)
+
+# Cache de leitura de categorias e detalhe de produto, invalidado nas escritas.
+# A invalidação só alcança os outros workers com CACHE_BACKEND=redis; com o
+# backend padrão (memoria) o detalhe de produto não é guardado (ver Produto.obter_por_id)
+cache_modelos = criar_cache(
+    backend=os.getenv('CACHE_BACKEND', 'memoria'),
+    max_itens=int(os.getenv('CACHE_MAX', 10000)),
+    ttl=float(os.getenv('CACHE_TTL', 300)),
+    url=os.getenv('CACHE_URL'),
+)
+
+TIPOS_MOVIMENTO = ('entrada', 'saida', 'ajuste')
+
+
+def _produtos_agrupados(valor):
+    """Lê MOVIMENTO_AGRUPAR_PRODUTOS: ids separados por vírgula, ou * para todos"""
+    if valor.strip() == '*':
+        return None
+    return {int(p) for p in valor.split(',') if p.strip()}
+
+# Movimentos concorrentes dos produtos mais disputados (ex: em promoção) são
+# gravados juntos, com um único UPDATE do estoque por grupo (ver Movimento.salvar).
+# Só há grupo com mais de um item quando o processo atende requisições em threads
+# (ex: gunicorn --threads N); com workers sync cada movimento espera a janela sozinho.
+agrupador_movimentos = AgrupadorEscritas(
+    gravar_lote=lambda movimentos: Movimento.salvar_agrupados(movimentos),
+    gravar_um=lambda movimento: movimento._salvar_direto(),
+    janela=float(os.getenv('MOVIMENTO_AGRUPAR_JANELA_MS', 5)) / 1000,
+    chaves=_produtos_agrupados(os.getenv('MOVIMENTO_AGRUPAR_PRODUTOS', '')),
+    max_lote=int(os.getenv('MOVIMENTO_AGRUPAR_MAX_LOTE', 200)),
+)
+
+
+class VersaoTabela:
+    """Contadores de alteração por tabela (ver migracoes.py), usados nos ETags"""
+
+    @staticmethod
+    def incrementar(*tabelas):
+        """Incrementa a versão das tabelas; chamado após o commit de cada escrita"""
+        marcadores = ", ".join(["%s"] * len(tabelas))
+        query = f"UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela IN ({marcadores})"
+        try:
+            Database.executar_preparada(query, tabelas)
+        except Exception as e:
+            # A escrita principal já foi confirmada; no pior caso o ETag fica desatualizado
+            print(f"Erro ao incrementar versão de {tabelas}: {e}")
+
+    @staticmethod
+    def consulta(*tabelas):
+        """Retorna (query, params) da leitura das versões; usada também por app_async"""
+        marcadores = ", ".join(["%s"] * len(tabelas))
+        return f"SELECT tabela, versao FROM versoes_tabelas WHERE tabela IN ({marcadores})", tabelas
+
+    @staticmethod
+    def de_linhas(linhas, tabelas):
+        """{tabela: versao} das linhas de consulta(), ou None se alguma tabela não tiver contador"""
+        versoes = {v['tabela']: v['versao'] for v in linhas}
+        if len(versoes) < len(tabelas):
+            return None
+        return versoes
+
+    @staticmethod
+    def obter(*tabelas):
+        """
+        Retorna {tabela: versao}, ou None se alguma tabela não tiver contador
+
+        Lida de onde vêm os dados da resposta e antes deles: a requisição fica
+        presa a uma réplica (ver ConsistenciaLeitura), então o ETag pode ser mais
+        antigo que o corpo, nunca mais novo.
+        """
+        query, params = VersaoTabela.consulta(*tabelas)
+        return VersaoTabela.de_linhas(Database.executar_preparada(query, params, fetch=True), tabelas)
+
+# Colunas que podem ser pedidas via `fields=` nas listagens
+PRODUTO_COLUNAS = {
+    'id': 'p.id',
+    'nome': 'p.nome',
+    'descricao': 'p.descricao',
+    'preco': 'p.preco',
+    'quantidade': 'p.quantidade',
+    'quantidade_minima': 'p.quantidade_minima',
+    'categoria_id': 'p.categoria_id',
+    'categoria_nome': 'c.nome',
+}
+
+# Colunas de movimentos_estoque, na ordem de m.*
+COLUNAS_TABELA_MOVIMENTO = (
+    'id', 'produto_id', 'usuario_id', 'tipo_movimento', 'quantidade', 'observacao', 'data_movimento',
+)
+
+MOVIMENTO_COLUNAS = {
+    'id': 'm.id',
+    'produto_id': 'm.produto_id',
+    'usuario_id': 'm.usuario_id',
+    'tipo_movimento': 'm.tipo_movimento',
+    'quantidade': 'm.quantidade',
+    'observacao': 'm.observacao',
+    'data_movimento': 'm.data_movimento',
+    'usuario_nome': 'u.nome',
+    'produto_nome': 'p.nome',
+    'categoria_id': 'p.categoria_id',
+}
+
+def _colunas_select(mapa, campos, chaves):
+    """
+    Monta a lista de colunas do SELECT para os campos pedidos
+
+    Args:
+        mapa (dict): Campo -> expressão SQL
+        campos (list): Campos pedidos pelo cliente
+        chaves (tuple): Campos de ordenação, sempre selecionados para gerar o cursor
+
+    Raises:
+        ValueError: Se algum campo não existir
+    """
+    invalidos = [campo for campo in campos if campo not in mapa]
+    if invalidos:
+        raise ValueError(f"Campos inválidos: {', '.join(invalidos)}")
+    selecionados = list(dict.fromkeys(list(campos) + list(chaves)))
+    return ', '.join(f"{mapa[campo]} AS {campo}" for campo in selecionados)
+
+# Colunas de produto das respostas sem fields=: as de PRODUTO_COLUNAS. Nada de
+# p.*, que levaria ao JSON as colunas internas (estoque_baixo, sku, atualizado_em)
+COLUNAS_PRODUTO = _colunas_select(PRODUTO_COLUNAS, PRODUTO_COLUNAS, ())
+
+def montar_pagina(itens, limite, chaves, campos=None):
+    """Recorta o resultado (buscado com limite + 1) e gera o next_cursor"""
+    proximo = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        ultimo = itens[-1]
+        proximo = codificar_cursor([ultimo[chave] for chave in chaves])
+    return {'itens': projetar_campos(itens, campos), 'next_cursor': proximo}
+
+class Modelo:
+    """
+    Base dos modelos: os atributos ficam em __slots__, sem um __dict__ por
+    instância, e para_dict() substitui vars() na serialização
+    """
+    __slots__ = ()
+
+    def para_dict(self):
+        """Retorna os atributos do modelo como dicionário"""
+        return {nome: getattr(self, nome) for nome in self.__slots__}
+
+
+# Consultas de texto fixo compartilhadas com app_async (e preparadas no servidor)
+QUERY_USUARIO_POR_ID = "SELECT * FROM usuarios WHERE id = %s"
+
+
+class Usuario(Modelo):
+    __slots__ = ('id', 'nome', 'email', 'senha', 'nivel_acesso')
 
-class Usuario:
     def __init__(self, id=None, nome=None, email=None, senha=None, nivel_acesso='usuario'):
         self.id = id
         self.nome = nome
@@ -12,11 +176,24 @@ class Usuario:
         self.nivel_acesso = nivel_acesso
     
     def salvar(self):
-        """Cria ou atualiza um usuário no banco de dados"""
-        # Criptografar a senha
-        senha_hash = bcrypt.hashpw(self.senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """
+        Cria ou atualiza um usuário no banco de dados
+
+        Na atualização, a senha só é recalculada se `senha` tiver sido definida;
+        com senha None o hash atual é mantido.
+        """
+        # Criptografar a senha (o bcrypt é caro, então só quando ela mudou)
+        senha_hash = servico_senhas.gerar_hash(self.senha) if self.senha is not None else None
         
-        if self.id:
+        if self.id and senha_hash is None:
+            # Atualizar usuário existente sem mexer na senha
+            query = """
+                UPDATE usuarios 
+                SET nome = %s, email = %s, nivel_acesso = %s 
+                WHERE id = %s
+            """
+            params = (self.nome, self.email, self.nivel_acesso, self.id)
+        elif self.id:
             # Atualizar usuário existente
             query = """
                 UPDATE usuarios 
@@ -32,7 +209,10 @@ class Usuario:
             """
             params = (self.nome, self.email, senha_hash, self.nivel_acesso)
         
-        return Database.execute_query(query, params)
+        resultado = Database.execute_query(query, params)
+        if self.id:
+            cache_usuarios.invalidar(self.id)
+        return resultado
     
     @staticmethod
     def autenticar(email, senha):
@@ -42,7 +222,10 @@ class Usuario:
         
         if result and len(result) > 0:
             usuario = result[0]
-            if bcrypt.checkpw(senha.encode('utf-8'), usuario['senha'].encode('utf-8')):
+            if servico_senhas.verificar(senha, usuario['senha']):
+                if servico_senhas.precisa_rehash(usuario['senha']):
+                    # O custo configurado mudou: aproveita a senha em claro para atualizar o hash
+                    Usuario.atualizar_hash(usuario['id'], senha)
                 return Usuario(
                     id=usuario['id'],
                     nome=usuario['nome'],
@@ -51,18 +234,48 @@ class Usuario:
                 )
         return None
     
+    @staticmethod
+    def atualizar_hash(id, senha):
+        """Regrava o hash da senha com o custo atual do bcrypt"""
+        try:
+            senha_hash = servico_senhas.gerar_hash(senha)
+            Database.execute_query("UPDATE usuarios SET senha = %s WHERE id = %s", (senha_hash, id))
+            servico_senhas.registrar_rehash()
+        except Exception as e:
+            # O login já foi validado; a troca do hash fica para o próximo
+            print(f"Erro ao atualizar hash da senha do usuário {id}: {e}")
+    
     @staticmethod
     def obter_por_id(id):
         """Retorna um usuário pelo ID"""
-        query = "SELECT * FROM usuarios WHERE id = %s"
-        result = Database.execute_query(query, (id,), fetch=True)
+        result = Database.executar_preparada(QUERY_USUARIO_POR_ID, (id,), fetch=True)
         if result and len(result) > 0:
-            u = result[0]
-            return Usuario(id=u['id'], nome=u['nome'], email=u['email'], nivel_acesso=u['nivel_acesso'])
+            return Usuario.de_linha(result[0])
         return None
 
+    @staticmethod
+    def de_linha(u):
+        """Monta o usuário (sem a senha) a partir de uma linha de usuarios"""
+        return Usuario(id=u['id'], nome=u['nome'], email=u['email'], nivel_acesso=u['nivel_acesso'])
+
+    @staticmethod
+    def obter_por_id_em_cache(id):
+        """Retorna um usuário pelo ID, consultando o banco apenas se não estiver em cache"""
+        usuario = cache_usuarios.obter(id)
+        if usuario is None:
+            usuario = Usuario.obter_por_id(id)
+            if usuario:
+                cache_usuarios.definir(id, usuario)
+        return usuario
+
+
+QUERY_CATEGORIAS = "SELECT * FROM categorias ORDER BY nome"
+QUERY_CATEGORIA_POR_ID = "SELECT * FROM categorias WHERE id = %s"
+
+
+class Categoria(Modelo):
+    __slots__ = ('id', 'nome', 'descricao')
 
-class Categoria:
     def __init__(self, id=None, nome=None, descricao=None):
         self.id = id
         self.nome = nome
@@ -86,32 +299,67 @@ class Categoria:
             """
             params = (self.nome, self.descricao)
         
-        return Database.execute_query(query, params)
+        resultado = Database.execute_query(query, params)
+        Categoria.invalidar_cache(self.id)
+        return resultado
+
+    @staticmethod
+    def invalidar_cache(id=None):
+        """Remove do cache a lista de categorias e, se informado, o detalhe da categoria"""
+        cache_modelos.invalidar('categorias:lista')
+        if id:
+            cache_modelos.invalidar(f'categoria:{int(id)}')
+        # A listagem de produtos inclui o nome da categoria
+        VersaoTabela.incrementar('categorias', 'produtos')
     
     @staticmethod
     def listar():
         """Retorna todas as categorias"""
-        query = "SELECT * FROM categorias ORDER BY nome"
-        return Database.execute_query(query, fetch=True)
+        categorias = cache_modelos.obter('categorias:lista')
+        if categorias is None:
+            # O cache é compartilhado: uma réplica atrasada o deixaria desatualizado até o TTL
+            categorias = Database.execute_query(QUERY_CATEGORIAS, fetch=True, primario=True)
+            cache_modelos.definir('categorias:lista', categorias)
+        return categorias
     
     @staticmethod
     def obter_por_id(id):
         """Retorna uma categoria pelo ID"""
-        query = "SELECT * FROM categorias WHERE id = %s"
-        result = Database.execute_query(query, (id,), fetch=True)
-        if result and len(result) > 0:
+        chave = f'categoria:{int(id)}'
+        c = cache_modelos.obter(chave)
+        if c is None:
+            result = Database.executar_preparada(QUERY_CATEGORIA_POR_ID, (id,), fetch=True, primario=True)
+            if not result:
+                return None
             c = result[0]
-            return Categoria(id=c['id'], nome=c['nome'], descricao=c['descricao'])
-        return None
+            cache_modelos.definir(chave, c)
+        return Categoria.de_linha(c)
+
+    @staticmethod
+    def de_linha(c):
+        """Monta a categoria a partir de uma linha de categorias"""
+        return Categoria(id=c['id'], nome=c['nome'], descricao=c['descricao'])
     
     @staticmethod
     def excluir(id):
         """Exclui uma categoria pelo ID"""
         query = "DELETE FROM categorias WHERE id = %s"
-        return Database.execute_query(query, (id,))
+        resultado = Database.execute_query(query, (id,))
+        Categoria.invalidar_cache(id)
+        return resultado
+
+
+QUERY_PRODUTO_POR_ID = f"""
+    SELECT {COLUNAS_PRODUTO}
+    FROM produtos p
+    JOIN categorias c ON p.categoria_id = c.id
+    WHERE p.id = %s
+"""
+
 
+class Produto(Modelo):
+    __slots__ = ('id', 'nome', 'descricao', 'preco', 'quantidade', 'quantidade_minima', 'categoria_id')
 
-class Produto:
     def __init__(self, id=None, nome=None, descricao=None, preco=0, quantidade=0, 
                  quantidade_minima=5, categoria_id=None):
         self.id = id
@@ -144,61 +392,223 @@ class Produto:
             params = (self.nome, self.descricao, self.preco, self.quantidade,
                      self.quantidade_minima, self.categoria_id)
         
-        return Database.execute_query(query, params)
+        resultado = Database.execute_query(query, params)
+        Produto.invalidar_cache(self.id or resultado)
+        try:
+            indice_produtos.recarregar(self.id or resultado)
+        except Exception as e:
+            # O produto já foi gravado; a próxima sincronização do índice o alcança
+            print(f"Erro ao atualizar o índice de busca do produto {self.id or resultado}: {e}")
+        return resultado
+
+    @staticmethod
+    def invalidar_cache(*ids):
+        """Remove do cache o detalhe dos produtos informados, ou de todos se nenhum for"""
+        if ids:
+            for id in ids:
+                cache_modelos.invalidar(f'produto:{int(id)}')
+        else:
+            cache_modelos.invalidar_prefixo('produto:')
+        VersaoTabela.incrementar('produtos')
     
     @staticmethod
-    def listar():
-        """Retorna todos os produtos"""
-        query = """
-            SELECT p.*, c.nome as categoria_nome
+    def consulta_listagem(campos=None):
+        """
+        Retorna (query, params) de todos os produtos em ordem de nome (listar e app_async)
+
+        Raises:
+            ValueError: Se algum campo pedido não existir
+        """
+        colunas = _colunas_select(PRODUTO_COLUNAS, campos, ()) if campos else COLUNAS_PRODUTO
+        query = f"""
+            SELECT {colunas}
             FROM produtos p
             JOIN categorias c ON p.categoria_id = c.id
             ORDER BY p.nome
         """
-        return Database.execute_query(query, fetch=True)
-    
+        return query, ()
+
     @staticmethod
-    def obter_por_id(id):
-        """Retorna um produto pelo ID"""
-        query = """
-            SELECT p.*, c.nome as categoria_nome
+    def listar(campos=None):
+        """Retorna todos os produtos, só com os campos pedidos (todos se vazio)"""
+        query, params = Produto.consulta_listagem(campos)
+        return Database.execute_query(query, params, fetch=True)
+
+    @staticmethod
+    def consulta_paginada(limite, apos=None, campos=None):
+        """
+        Retorna (query, params) de uma página de produtos ordenada por (nome, id).
+        A consulta busca limite + 1 linhas; o resultado deve passar por montar_pagina.
+
+        Args:
+            limite (int): Quantidade máxima de produtos na página
+            apos (str): Cursor retornado na página anterior
+            campos (list): Campos a retornar (todos se vazio)
+        """
+        if campos:
+            colunas = _colunas_select(PRODUTO_COLUNAS, campos, ('nome', 'id'))
+        else:
+            colunas = COLUNAS_PRODUTO
+
+        query = f"""
+            SELECT {colunas}
             FROM produtos p
             JOIN categorias c ON p.categoria_id = c.id
-            WHERE p.id = %s
         """
-        result = Database.execute_query(query, (id,), fetch=True)
-        if result and len(result) > 0:
-            p = result[0]
-            return Produto(
-                id=p['id'], 
-                nome=p['nome'], 
-                descricao=p['descricao'],
-                preco=p['preco'],
-                quantidade=p['quantidade'],
-                quantidade_minima=p['quantidade_minima'],
-                categoria_id=p['categoria_id']
-            )
+        params = []
+
+        if apos:
+            nome, id_ = decodificar_cursor(apos, 2)
+            query += " WHERE (p.nome > %s OR (p.nome = %s AND p.id > %s))"
+            params.extend([nome, nome, id_])
+
+        query += " ORDER BY p.nome, p.id LIMIT %s"
+        params.append(limite + 1)
+
+        return query, tuple(params)
+
+    @staticmethod
+    def listar_paginado(limite, apos=None, campos=None):
+        """
+        Retorna uma página de produtos ordenada por (nome, id)
+
+        Args:
+            limite (int): Quantidade máxima de produtos na página
+            apos (str): Cursor retornado na página anterior
+            campos (list): Campos a retornar (todos se vazio)
+
+        Returns:
+            dict: {'itens': [...], 'next_cursor': str ou None}
+        """
+        query, params = Produto.consulta_paginada(limite, apos, campos)
+        itens = Database.execute_query(query, params, fetch=True)
+        return montar_pagina(itens, limite, ('nome', 'id'), campos)
+    
+    @staticmethod
+    def obter_por_id(id):
+        """
+        Retorna um produto pelo ID
+
+        O detalhe inclui a quantidade, que muda a cada movimento; por isso só
+        fica em cache com um backend compartilhado (CACHE_BACKEND=redis). Num
+        cache por processo, a invalidação feita pelo worker que recebeu a
+        escrita não chegaria aos outros, que serviriam estoque antigo até o TTL.
+        """
+        if not cache_modelos.compartilhado:
+            result = Database.executar_preparada(QUERY_PRODUTO_POR_ID, (id,), fetch=True)
+            return Produto.de_linha(result[0]) if result else None
+
+        chave = f'produto:{int(id)}'
+        p = cache_modelos.obter(chave)
+        if p is None:
+            # Preenche o cache compartilhado: lê do primário, nunca de uma réplica atrasada
+            result = Database.executar_preparada(QUERY_PRODUTO_POR_ID, (id,), fetch=True, primario=True)
+            if result and len(result) > 0:
+                p = result[0]
+                cache_modelos.definir(chave, p)
+        if p:
+            return Produto.de_linha(p)
         return None
+
+    @staticmethod
+    def de_linha(p):
+        """Monta o produto a partir de uma linha de produtos"""
+        return Produto(
+            id=p['id'], 
+            nome=p['nome'], 
+            descricao=p['descricao'],
+            preco=p['preco'],
+            quantidade=p['quantidade'],
+            quantidade_minima=p['quantidade_minima'],
+            categoria_id=p['categoria_id']
+        )
     
     @staticmethod
     def excluir(id):
-        """Exclui um produto pelo ID"""
-        query = "DELETE FROM produtos WHERE id = %s"
-        return Database.execute_query(query, (id,))
+        """
+        Exclui um produto pelo ID
+
+        movimentos_estoque é particionada e não tem chave estrangeira: a exclusão
+        é recusada aqui se o produto tiver movimentos, no MySQL ou no arquivo.
+
+        Raises:
+            ValueError: Se o produto tiver movimentos
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            # A trava na linha do produto impede um movimento concorrente (ver _salvar_direto)
+            cursor.execute("SELECT id FROM produtos WHERE id = %s FOR UPDATE", (id,))
+            cursor.fetchall()
+            cursor.execute("""
+                SELECT EXISTS (SELECT 1 FROM movimentos_estoque WHERE produto_id = %s)
+                    OR EXISTS (SELECT 1 FROM movimentos_resumo_diario WHERE produto_id = %s)
+            """, (id, id))
+            (possui_movimentos,) = cursor.fetchone()
+            if possui_movimentos or arquivo_movimentos.possui_movimentos(int(id)):
+                raise ValueError("Produto possui movimentos e não pode ser excluído")
+            cursor.execute("DELETE FROM produtos WHERE id = %s", (id,))
+            resultado = cursor.lastrowid
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Erro ao excluir produto: {e}")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        Produto.invalidar_cache(id)
+        indice_produtos.remover(id)
+        return resultado
     
     @staticmethod
     def produtos_com_estoque_baixo():
         """Retorna produtos com estoque abaixo do mínimo"""
-        query = """
-            SELECT p.*, c.nome as categoria_nome
+        # estoque_baixo é uma coluna gerada e indexada (ver migracoes.py)
+        query = f"""
+            SELECT {COLUNAS_PRODUTO}
             FROM produtos p
             JOIN categorias c ON p.categoria_id = c.id
-            WHERE p.quantidade < p.quantidade_minima
+            WHERE p.estoque_baixo = 1
+            ORDER BY p.nome
         """
         return Database.execute_query(query, fetch=True)
 
+    @staticmethod
+    def com_estoque_baixo_por_ids(ids):
+        """Retorna, dentre os produtos informados, os que estão abaixo do mínimo"""
+        if not ids:
+            return []
+        marcadores = ", ".join(["%s"] * len(ids))
+        query = f"""
+            SELECT {COLUNAS_PRODUTO}
+            FROM produtos p
+            JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.id IN ({marcadores}) AND p.estoque_baixo = 1
+        """
+        return Database.execute_query(query, tuple(ids), fetch=True)
+
+
+# Declarações de Movimento._salvar_direto, preparadas uma vez por conexão
+QUERY_PRODUTO_PARA_MOVIMENTO = "SELECT quantidade, quantidade_minima FROM produtos WHERE id = %s FOR UPDATE"
+QUERY_INSERIR_MOVIMENTO = """
+    INSERT INTO movimentos_estoque
+    (produto_id, usuario_id, tipo_movimento, quantidade, observacao)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+QUERIES_ATUALIZAR_ESTOQUE = {
+    'entrada': "UPDATE produtos SET quantidade = quantidade + %s WHERE id = %s",
+    'saida': "UPDATE produtos SET quantidade = quantidade - %s WHERE id = %s",
+    'ajuste': "UPDATE produtos SET quantidade = %s WHERE id = %s",
+}
+
+
+class Movimento(Modelo):
+    __slots__ = ('id', 'produto_id', 'usuario_id', 'tipo_movimento', 'quantidade', 'observacao',
+                 'cruzou_estoque_minimo')
 
-class Movimento:
     def __init__(self, id=None, produto_id=None, usuario_id=None, 
                  tipo_movimento=None, quantidade=0, observacao=None):
         self.id = id
@@ -207,54 +617,80 @@ class Movimento:
         self.tipo_movimento = tipo_movimento
         self.quantidade = quantidade
         self.observacao = observacao
+        self.cruzou_estoque_minimo = False
+
+    @staticmethod
+    def quantidade_apos(quantidade_atual, tipo_movimento, quantidade):
+        """Calcula o estoque resultante de um movimento (ajuste define o valor absoluto)"""
+        if tipo_movimento == 'entrada':
+            return quantidade_atual + int(quantidade)
+        if tipo_movimento == 'saida':
+            return quantidade_atual - int(quantidade)
+        return int(quantidade)
     
     def salvar(self):
         """Registra um movimento de estoque e atualiza o produto"""
+        if agrupador_movimentos.ativo_para(int(self.produto_id)):
+            movimento_id = agrupador_movimentos.gravar(int(self.produto_id), self)
+            # O commit pode ter sido feito pela thread líder do grupo, na sessão de
+            # leitura de outra requisição: registra a escrita também nesta
+            consistencia_leitura.registrar_escrita()
+            return movimento_id
+        return self._salvar_direto()
+
+    def _salvar_direto(self):
+        """Registra o movimento na sua própria transação"""
         conn = Database.get_connection()
         cursor = conn.cursor(dictionary=True)
+        # As três declarações fixas rodam a cada movimento: ficam preparadas na conexão
+        preparadas = Database.get_pool().max_preparadas
+        preparar = conn.cursor_preparado if preparadas else (lambda query: cursor)
+        query = QUERIES_ATUALIZAR_ESTOQUE.get(self.tipo_movimento, QUERIES_ATUALIZAR_ESTOQUE['ajuste'])
         
         try:
             # Inicia uma transação
             conn.start_transaction()
+
+            # 1. Trava a linha do produto e lê o estoque antes do movimento
+            selecao = preparar(QUERY_PRODUTO_PARA_MOVIMENTO)
+            selecao.execute(QUERY_PRODUTO_PARA_MOVIMENTO, (self.produto_id,))
+            linhas = selecao.fetchall()
+            if not linhas:
+                # Sem chave estrangeira na tabela particionada: a checagem é feita aqui
+                raise ValueError("Produto não encontrado")
+            atual = linhas[0]
             
-            # 1. Registra o movimento
-            query = """
-                INSERT INTO movimentos_estoque 
-                (produto_id, usuario_id, tipo_movimento, quantidade, observacao)
-                VALUES (%s, %s, %s, %s, %s)
-            """
+            # 2. Registra o movimento
             params = (self.produto_id, self.usuario_id, self.tipo_movimento, 
                      self.quantidade, self.observacao)
+            insercao = preparar(QUERY_INSERIR_MOVIMENTO)
+            insercao.execute(QUERY_INSERIR_MOVIMENTO, params)
+            movimento_id = insercao.lastrowid
             
-            cursor.execute(query, params)
-            
-            # 2. Atualiza o estoque do produto
-            if self.tipo_movimento == 'entrada':
-                query = """
-                    UPDATE produtos
-                    SET quantidade = quantidade + %s
-                    WHERE id = %s
-                """
-            elif self.tipo_movimento == 'saida':
-                query = """
-                    UPDATE produtos
-                    SET quantidade = quantidade - %s
-                    WHERE id = %s
-                """
-            else:  # ajuste
-                query = """
-                    UPDATE produtos
-                    SET quantidade = %s
-                    WHERE id = %s
-                """
-            
-            cursor.execute(query, (self.quantidade, self.produto_id))
+            # 3. Atualiza o estoque do produto
+            atualizacao = preparar(query)
+            atualizacao.execute(query, (self.quantidade, self.produto_id))
+            for usado in (selecao, insercao, atualizacao):
+                usado.concluir()
+
+            # 4. Atualiza o resumo diário na mesma transação
+            ResumoMovimento.registrar(cursor, [(self.produto_id, self.tipo_movimento, self.quantidade)])
+
+            # 5. Só sinaliza alerta quando este movimento faz o produto cruzar o mínimo
+            antes = atual['quantidade']
+            depois = Movimento.quantidade_apos(antes, self.tipo_movimento, self.quantidade)
+            minimo = atual['quantidade_minima']
+            self.cruzou_estoque_minimo = antes >= minimo and depois < minimo
             
             # Confirma a transação
             conn.commit()
-            return cursor.lastrowid
             
         except Exception as e:
+            if preparadas:
+                # Como em executar_preparada: um cursor pode ter ficado com resultado
+                # pendente, então as declarações são preparadas de novo na próxima vez
+                for usada in (QUERY_PRODUTO_PARA_MOVIMENTO, QUERY_INSERIR_MOVIMENTO, query):
+                    conn.esquecer_preparado(usada)
             conn.rollback()
             print(f"Erro ao registrar movimento: {e}")
             raise
@@ -262,6 +698,229 @@ class Movimento:
             cursor.close()
             conn.close()
 
+        # Fora da transação: o movimento já está gravado e não pode virar erro aqui
+        Produto.invalidar_cache(self.produto_id)
+        return movimento_id
+
+    @staticmethod
+    def salvar_agrupados(movimentos):
+        """
+        Registra movimentos de um mesmo produto numa única transação
+
+        Usado por agrupador_movimentos: uma trava da linha do produto, um INSERT
+        multi-linha e um único UPDATE com o estoque final, em vez de uma transação
+        por movimento. Cada movimento recebe o seu cruzou_estoque_minimo como se
+        tivesse sido gravado sozinho, na ordem da lista.
+
+        Returns:
+            list: Ids dos movimentos, na ordem recebida
+        """
+        produto_id = int(movimentos[0].produto_id)
+        conn = Database.get_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        try:
+            conn.start_transaction()
+
+            cursor.execute(
+                "SELECT quantidade, quantidade_minima FROM produtos WHERE id = %s FOR UPDATE",
+                (produto_id,)
+            )
+            atual = cursor.fetchone()
+            if not atual:
+                raise ValueError("Produto não encontrado")
+
+            cursor.executemany("""
+                INSERT INTO movimentos_estoque
+                (produto_id, usuario_id, tipo_movimento, quantidade, observacao)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [
+                (produto_id, m.usuario_id, m.tipo_movimento, m.quantidade, m.observacao)
+                for m in movimentos
+            ])
+            ids = Movimento._ids_inseridos(cursor, len(movimentos))
+
+            minimo = atual['quantidade_minima']
+            saldo = atual['quantidade']
+            for m in movimentos:
+                depois = Movimento.quantidade_apos(saldo, m.tipo_movimento, m.quantidade)
+                m.cruzou_estoque_minimo = saldo >= minimo and depois < minimo
+                saldo = depois
+
+            # A linha está travada, então o valor final pode ser gravado direto
+            if saldo != atual['quantidade']:
+                cursor.execute("UPDATE produtos SET quantidade = %s WHERE id = %s", (saldo, produto_id))
+
+            ResumoMovimento.registrar(cursor, [
+                (produto_id, m.tipo_movimento, int(m.quantidade)) for m in movimentos
+            ])
+
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Erro ao registrar movimentos agrupados: {e}")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        # Uma falha aqui não pode chegar ao agrupador, que regravaria o grupo já confirmado
+        try:
+            Produto.invalidar_cache(produto_id)
+        except Exception as e:
+            print(f"Erro ao invalidar cache do produto {produto_id}: {e}")
+
+        return ids
+
+    @staticmethod
+    def _ids_inseridos(cursor, quantidade):
+        """
+        Ids das linhas do último INSERT multi-linha do cursor, na ordem da inserção
+
+        Um INSERT com número de linhas conhecido reserva os valores de uma vez,
+        a partir de lastrowid e espaçados por auto_increment_increment (maior que
+        1 em topologias com vários primários, por exemplo).
+        """
+        primeiro_id = cursor.lastrowid
+        cursor.execute("SELECT @@SESSION.auto_increment_increment AS passo")
+        passo = cursor.fetchone()['passo']
+        return [primeiro_id + i * passo for i in range(quantidade)]
+
+    @staticmethod
+    def salvar_lote(movimentos, usuario_id, atomico=True):
+        """
+        Registra vários movimentos numa única transação
+
+        Os produtos envolvidos são travados em ordem de id (evitando deadlock entre
+        lotes concorrentes), os movimentos são inseridos com um único executemany e
+        o estoque de cada produto recebe um único UPDATE com o saldo agregado.
+
+        Args:
+            movimentos (list): Dicionários com produto_id, tipo_movimento, quantidade e observacao
+            usuario_id (int): Usuário que registra o lote
+            atomico (bool): Se True, qualquer item inválido cancela o lote inteiro;
+                se False, os itens inválidos são ignorados e os demais gravados
+
+        Returns:
+            dict: {'confirmado': bool, 'resultados': [...], 'alertas': [produto_id, ...]}
+        """
+        resultados = [{'indice': i, 'status': 'ok'} for i in range(len(movimentos))]
+
+        def falhar(indice, mensagem):
+            resultados[indice] = {'indice': indice, 'status': 'erro', 'erro': mensagem}
+
+        def cancelar():
+            for resultado in resultados:
+                if resultado['status'] == 'ok':
+                    resultado['status'] = 'cancelado'
+            return {'confirmado': False, 'resultados': resultados, 'alertas': []}
+
+        validos = []
+        for i, dados in enumerate(movimentos):
+            if not isinstance(dados, dict):
+                falhar(i, "Movimento deve ser um objeto")
+            elif not dados.get('produto_id'):
+                falhar(i, "Campo obrigatório não preenchido: produto_id")
+            elif dados.get('tipo_movimento') not in TIPOS_MOVIMENTO:
+                falhar(i, "tipo_movimento deve ser entrada, saida ou ajuste")
+            elif not validar_quantidade(dados.get('quantidade')):
+                falhar(i, "Quantidade inválida")
+            else:
+                validos.append(i)
+
+        if not validos or (atomico and len(validos) < len(movimentos)):
+            return cancelar()
+
+        conn = Database.get_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        try:
+            conn.start_transaction()
+
+            # 1. Trava todos os produtos do lote, sempre na mesma ordem
+            ids = sorted({int(movimentos[i]['produto_id']) for i in validos})
+            marcadores = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"""
+                SELECT id, quantidade, quantidade_minima
+                FROM produtos
+                WHERE id IN ({marcadores})
+                ORDER BY id
+                FOR UPDATE
+            """, tuple(ids))
+            estoque = {p['id']: p for p in cursor.fetchall()}
+
+            # 2. Aplica os movimentos em memória, na ordem em que chegaram
+            saldo = {id_: p['quantidade'] for id_, p in estoque.items()}
+            gravar = []
+            for i in validos:
+                dados = movimentos[i]
+                produto_id = int(dados['produto_id'])
+                if produto_id not in estoque:
+                    falhar(i, "Produto não encontrado")
+                    continue
+                saldo[produto_id] = Movimento.quantidade_apos(
+                    saldo[produto_id], dados['tipo_movimento'], dados['quantidade']
+                )
+                gravar.append(i)
+
+            if not gravar or (atomico and len(gravar) < len(validos)):
+                conn.rollback()
+                return cancelar()
+
+            # 3. Insere todos os movimentos num único INSERT multi-linha
+            cursor.executemany("""
+                INSERT INTO movimentos_estoque
+                (produto_id, usuario_id, tipo_movimento, quantidade, observacao)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [
+                (int(movimentos[i]['produto_id']), usuario_id, movimentos[i]['tipo_movimento'],
+                 int(movimentos[i]['quantidade']), movimentos[i].get('observacao'))
+                for i in gravar
+            ])
+            inseridos = Movimento._ids_inseridos(cursor, len(gravar))
+
+            # 4. Um UPDATE por produto com a variação agregada, em ordem de id
+            variacoes = [
+                (saldo[id_] - estoque[id_]['quantidade'], id_)
+                for id_ in ids
+                if id_ in estoque and saldo[id_] != estoque[id_]['quantidade']
+            ]
+            if variacoes:
+                cursor.executemany(
+                    "UPDATE produtos SET quantidade = quantidade + %s WHERE id = %s",
+                    variacoes
+                )
+
+            # 5. Resumo diário, também na mesma transação
+            ResumoMovimento.registrar(cursor, [
+                (int(movimentos[i]['produto_id']), movimentos[i]['tipo_movimento'],
+                 int(movimentos[i]['quantidade']))
+                for i in gravar
+            ])
+
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Erro ao registrar lote de movimentos: {e}")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        # Fora da transação: o lote já está gravado e não pode virar erro aqui
+        if variacoes:
+            Produto.invalidar_cache(*[id_ for _, id_ in variacoes])
+
+        for i, id_ in zip(gravar, inseridos):
+            resultados[i]['id'] = id_
+            resultados[i]['produto_id'] = int(movimentos[i]['produto_id'])
+
+        alertas = [
+            id_ for id_, p in estoque.items()
+            if p['quantidade'] >= p['quantidade_minima'] > saldo[id_]
+        ]
+        return {'confirmado': True, 'resultados': resultados, 'alertas': alertas}
+
     @staticmethod
     def listar_todos():
         query = """
@@ -271,46 +930,468 @@ class Movimento:
             LEFT JOIN produtos p ON m.produto_id = p.id
             ORDER BY m.data_movimento DESC
         """
-        return Database.execute_query(query, fetch=True)
+        movimentos = Database.execute_query(query, fetch=True)
+        colunas = COLUNAS_TABELA_MOVIMENTO + ('usuario_nome', 'produto_nome')
+        movimentos.extend(dict(zip(colunas, linha)) for linha in Movimento.listar_arquivados(colunas))
+        return movimentos
 
     @staticmethod
-    def listar_com_filtros(tipo_movimento=None, categoria_id=None, data=None):
-        query = """
-            SELECT m.*, u.nome as usuario_nome, p.nome as produto_nome, p.categoria_id
-            FROM movimentos_estoque m
-            LEFT JOIN usuarios u ON m.usuario_id = u.id
-            LEFT JOIN produtos p ON m.produto_id = p.id
-            WHERE 1=1
+    def _intervalo_datas(data=None, de=None, ate=None):
+        """
+        Converte os filtros de data em um intervalo semiaberto [inicio, fim)
+
+        Datas sem hora ('YYYY-MM-DD') cobrem o dia inteiro; em `ate` isso quer dizer
+        até o fim do dia. Datas com hora são usadas como limite exato.
+
+        Raises:
+            ValueError: Se alguma data estiver em formato inválido
         """
+        def converter(valor, campo):
+            try:
+                if len(valor) == 10:
+                    return datetime.datetime.combine(datetime.date.fromisoformat(valor), datetime.time()), True
+                return datetime.datetime.fromisoformat(valor), False
+            except (TypeError, ValueError):
+                raise ValueError(f"Data inválida em {campo}: {valor}")
+
+        inicio = fim = None
+        if data:
+            inicio, _ = converter(data, 'data')
+            fim = inicio + datetime.timedelta(days=1)
+        if de:
+            valor, _ = converter(de, 'de')
+            inicio = max(inicio, valor) if inicio else valor
+        if ate:
+            valor, dia_inteiro = converter(ate, 'ate')
+            if dia_inteiro:
+                valor += datetime.timedelta(days=1)
+            fim = min(fim, valor) if fim else valor
+        return inicio, fim
+
+    @staticmethod
+    def _filtros(tipo_movimento=None, categoria_id=None, data=None, produto_id=None,
+                 de=None, ate=None):
+        """Monta as condições WHERE comuns às listagens de movimentos"""
+        condicoes = []
         params = []
 
+        if produto_id:
+            condicoes.append("m.produto_id = %s")
+            params.append(produto_id)
+
         if tipo_movimento:
-            query += " AND m.tipo_movimento = %s"
+            condicoes.append("m.tipo_movimento = %s")
             params.append(tipo_movimento)
 
         if categoria_id:
-            query += " AND p.categoria_id = %s"
+            condicoes.append("p.categoria_id = %s")
             params.append(categoria_id)
 
-        if data:
-            # Aqui usamos DATE(m.data_movimento) para comparar só a parte da data, ignorando hora
-            query += " AND DATE(m.data_movimento) = %s"
-            params.append(data)  # Espera string no formato 'YYYY-MM-DD'
+        # Compara a coluna crua com um intervalo para que os índices em
+        # data_movimento possam ser usados (DATE(m.data_movimento) não permite)
+        inicio, fim = Movimento._intervalo_datas(data, de, ate)
+        if inicio:
+            condicoes.append("m.data_movimento >= %s")
+            params.append(inicio)
+        if fim:
+            condicoes.append("m.data_movimento < %s")
+            params.append(fim)
 
-        query += " ORDER BY m.data_movimento DESC"
+        return condicoes, params
 
-        return Database.execute_query(query, tuple(params), fetch=True)
+    @staticmethod
+    def consulta_com_filtros(tipo_movimento=None, categoria_id=None, data=None, de=None, ate=None,
+                             produto_id=None, campos=None):
+        """
+        Retorna (query, params) da listagem filtrada de movimentos
 
+        As colunas saem na ordem de Movimento.colunas(campos), o que permite
+        ler o resultado como tuplas (ver listar_tuplas).
+        """
+        colunas = _colunas_select(MOVIMENTO_COLUNAS, Movimento.colunas(campos), ())
+        query = f"""
+            SELECT {colunas}
+            FROM movimentos_estoque m
+            LEFT JOIN usuarios u ON m.usuario_id = u.id
+            LEFT JOIN produtos p ON m.produto_id = p.id
+        """
+        condicoes, params = Movimento._filtros(tipo_movimento, categoria_id, data, produto_id, de, ate)
+        if condicoes:
+            query += " WHERE " + " AND ".join(condicoes)
+
+        query += " ORDER BY m.data_movimento DESC, m.id DESC"
+        return query, tuple(params)
 
-    
     @staticmethod
-    def listar_por_produto(produto_id):
-        """Retorna todos os movimentos de um produto"""
-        query = """
-            SELECT m.*, u.nome as usuario_nome
+    def colunas(campos=None):
+        """Nomes das colunas da listagem filtrada, na ordem do SELECT"""
+        return tuple(campos) if campos else tuple(MOVIMENTO_COLUNAS)
+
+    @staticmethod
+    def listar_arquivados(colunas, tipo_movimento=None, categoria_id=None, data=None, de=None, ate=None,
+                          produto_id=None, apos=None, limite=None):
+        """
+        Movimentos dos meses já arquivados em disco (ver arquivo.py), com os mesmos filtros
+
+        Os meses arquivados são sempre anteriores aos que estão no MySQL, então
+        as listagens em ordem de data decrescente só acrescentam estas linhas
+        ao final das suas.
+
+        Returns:
+            iterator: Tuplas na ordem de `colunas`
+
+        Raises:
+            ValueError: Se alguma data ou o cursor forem inválidos
+        """
+        inicio, fim = Movimento._intervalo_datas(data, de, ate)
+        if apos:
+            data_movimento, id_ = decodificar_cursor(apos, 2)
+            try:
+                apos = (datetime.datetime.fromisoformat(data_movimento), int(id_))
+            except (TypeError, ValueError):
+                raise ValueError("Cursor inválido")
+        return arquivo_movimentos.consultar(
+            colunas, tipo_movimento, categoria_id, produto_id, inicio, fim, apos, limite
+        )
+
+    @staticmethod
+    def listar_com_filtros(tipo_movimento=None, categoria_id=None, data=None, de=None, ate=None):
+        query, params = Movimento.consulta_com_filtros(tipo_movimento, categoria_id, data, de, ate)
+        movimentos = Database.execute_query(query, params, fetch=True)
+        colunas = Movimento.colunas()
+        movimentos.extend(
+            dict(zip(colunas, linha))
+            for linha in Movimento.listar_arquivados(colunas, tipo_movimento, categoria_id, data, de, ate)
+        )
+        return movimentos
+
+    @staticmethod
+    def listar_tuplas(tipo_movimento=None, categoria_id=None, data=None, de=None, ate=None, campos=None):
+        """
+        Mesma listagem de listar_com_filtros, com cada movimento como uma tupla
+
+        Para listagens grandes: as tuplas do cursor são usadas como estão, sem
+        um dicionário por linha.
+
+        Returns:
+            tuple: (colunas, lista de tuplas na ordem das colunas)
+        """
+        query, params = Movimento.consulta_com_filtros(
+            tipo_movimento, categoria_id, data, de, ate, campos=campos
+        )
+        colunas = Movimento.colunas(campos)
+        linhas = Database.execute_query(query, params, fetch=True, tuplas=True)
+        linhas.extend(Movimento.listar_arquivados(colunas, tipo_movimento, categoria_id, data, de, ate))
+        return colunas, linhas
+
+    @staticmethod
+    def exportar_com_filtros(tipo_movimento=None, categoria_id=None, data=None, de=None, ate=None):
+        """
+        Itera sobre os movimentos filtrados sem carregar o resultado inteiro em memória
+
+        Returns:
+            tuple: (colunas, iterador de tuplas na ordem das colunas)
+        """
+        query, params = Movimento.consulta_com_filtros(tipo_movimento, categoria_id, data, de, ate)
+        colunas = Movimento.colunas()
+        return colunas, itertools.chain(
+            Database.stream_query(query, params, tuplas=True),
+            Movimento.listar_arquivados(colunas, tipo_movimento, categoria_id, data, de, ate),
+        )
+
+    @staticmethod
+    def consulta_paginada(limite, apos=None, campos=None, tipo_movimento=None,
+                          categoria_id=None, data=None, produto_id=None, de=None, ate=None):
+        """
+        Retorna (query, params) de uma página de movimentos ordenada por
+        (data_movimento, id) decrescente. A consulta busca limite + 1 linhas;
+        o resultado deve passar por montar_pagina.
+
+        Args:
+            limite (int): Quantidade máxima de movimentos na página
+            apos (str): Cursor retornado na página anterior
+            campos (list): Campos a retornar (todos se vazio)
+            tipo_movimento, categoria_id, data, produto_id, de, ate: Mesmos filtros de listar_com_filtros
+        """
+        chaves = ('data_movimento', 'id')
+        if campos:
+            colunas = _colunas_select(MOVIMENTO_COLUNAS, campos, chaves)
+            usa_usuario = 'usuario_nome' in campos
+            usa_produto = bool(categoria_id) or any(
+                campo in campos for campo in ('produto_nome', 'categoria_id')
+            )
+        else:
+            colunas = "m.*, u.nome as usuario_nome, p.nome as produto_nome, p.categoria_id"
+            usa_usuario = usa_produto = True
+
+        # Os LEFT JOINs só entram quando algum campo ou filtro precisa deles
+        query = f"SELECT {colunas} FROM movimentos_estoque m"
+        if usa_usuario:
+            query += " LEFT JOIN usuarios u ON m.usuario_id = u.id"
+        if usa_produto:
+            query += " LEFT JOIN produtos p ON m.produto_id = p.id"
+
+        condicoes, params = Movimento._filtros(tipo_movimento, categoria_id, data, produto_id, de, ate)
+
+        if apos:
+            data_movimento, id_ = decodificar_cursor(apos, 2)
+            condicoes.append(
+                "(m.data_movimento < %s OR (m.data_movimento = %s AND m.id < %s))"
+            )
+            params.extend([data_movimento, data_movimento, id_])
+
+        if condicoes:
+            query += " WHERE " + " AND ".join(condicoes)
+
+        query += " ORDER BY m.data_movimento DESC, m.id DESC LIMIT %s"
+        params.append(limite + 1)
+
+        return query, tuple(params)
+
+    @staticmethod
+    def listar_paginado(limite, apos=None, campos=None, tipo_movimento=None,
+                        categoria_id=None, data=None, produto_id=None, de=None, ate=None):
+        """
+        Retorna uma página de movimentos ordenada por (data_movimento, id) decrescente
+
+        Args:
+            limite (int): Quantidade máxima de movimentos na página
+            apos (str): Cursor retornado na página anterior
+            campos (list): Campos a retornar (todos se vazio)
+            tipo_movimento, categoria_id, data, produto_id, de, ate: Mesmos filtros de listar_com_filtros
+
+        Returns:
+            dict: {'itens': [...], 'next_cursor': str ou None}
+        """
+        query, params = Movimento.consulta_paginada(
+            limite, apos, campos, tipo_movimento, categoria_id, data, produto_id, de, ate
+        )
+        itens = Database.execute_query(query, params, fetch=True)
+        itens = Movimento.completar_com_arquivo(
+            itens, limite, apos, campos, tipo_movimento, categoria_id, data, produto_id, de, ate
+        )
+        return montar_pagina(itens, limite, ('data_movimento', 'id'), campos)
+
+    @staticmethod
+    def completar_com_arquivo(itens, limite, apos=None, campos=None, tipo_movimento=None,
+                              categoria_id=None, data=None, produto_id=None, de=None, ate=None):
+        """
+        Completa com os meses arquivados uma página de consulta_paginada que veio incompleta
+
+        Returns:
+            list: `itens` seguidos dos movimentos arquivados, até limite + 1
+        """
+        faltam = limite + 1 - len(itens)
+        if faltam <= 0:
+            return itens
+        if campos:
+            colunas = tuple(dict.fromkeys(list(campos) + ['data_movimento', 'id']))
+        else:
+            colunas = tuple(MOVIMENTO_COLUNAS)
+        arquivados = Movimento.listar_arquivados(
+            colunas, tipo_movimento, categoria_id, data, de, ate, produto_id, apos, faltam
+        )
+        return list(itens) + [dict(zip(colunas, linha)) for linha in arquivados]
+
+    @staticmethod
+    def consulta_por_produto(produto_id, campos=None):
+        """
+        Retorna (query, params) dos movimentos de um produto no MySQL (listar_por_produto e app_async)
+
+        Raises:
+            ValueError: Se algum campo pedido não existir
+        """
+        if campos:
+            colunas = _colunas_select(MOVIMENTO_COLUNAS, campos, ())
+            usa_produto = any(campo in campos for campo in ('produto_nome', 'categoria_id'))
+        else:
+            colunas = "m.*, u.nome as usuario_nome"
+            usa_produto = False
+        query = f"""
+            SELECT {colunas}
             FROM movimentos_estoque m
             LEFT JOIN usuarios u ON m.usuario_id = u.id
-            WHERE m.produto_id = %s
-            ORDER BY m.data_movimento DESC
         """
-        return Database.execute_query(query, (produto_id,), fetch=True)
\ No newline at end of file
+        if usa_produto:
+            query += " LEFT JOIN produtos p ON m.produto_id = p.id"
+        query += " WHERE m.produto_id = %s ORDER BY m.data_movimento DESC"
+        return query, (produto_id,)
+
+    @staticmethod
+    def incluir_arquivados_do_produto(movimentos, produto_id, campos=None):
+        """Acrescenta a `movimentos` (de consulta_por_produto) os movimentos arquivados do produto"""
+        colunas = tuple(dict.fromkeys(campos)) if campos else COLUNAS_TABELA_MOVIMENTO + ('usuario_nome',)
+        movimentos = list(movimentos)
+        movimentos.extend(
+            dict(zip(colunas, linha)) for linha in Movimento.listar_arquivados(colunas, produto_id=produto_id)
+        )
+        return movimentos
+
+    @staticmethod
+    def listar_por_produto(produto_id, campos=None):
+        """Retorna todos os movimentos de um produto, só com os campos pedidos (todos se vazio)"""
+        query, params = Movimento.consulta_por_produto(produto_id, campos)
+        movimentos = Database.execute_query(query, params, fetch=True)
+        return Movimento.incluir_arquivados_do_produto(movimentos, produto_id, campos)
+
+
+class ResumoMovimento:
+    """Totais diários de movimentos por produto e tipo (tabela movimentos_resumo_diario)"""
+
+    # Dimensões aceitas em `agrupar` -> colunas do SELECT/GROUP BY
+    DIMENSOES = {
+        'dia': ['r.dia'],
+        'produto': ['r.produto_id', 'p.nome'],
+        'categoria': ['p.categoria_id', 'c.nome'],
+        'tipo': ['r.tipo_movimento'],
+    }
+    ALIASES = {'p.nome': 'produto_nome', 'c.nome': 'categoria_nome'}
+
+    @staticmethod
+    def registrar(cursor, movimentos):
+        """
+        Soma movimentos ao resumo do dia, usando o cursor da transação do chamador
+
+        Args:
+            cursor: Cursor com a transação em andamento
+            movimentos (list): Tuplas (produto_id, tipo_movimento, quantidade)
+        """
+        agregados = {}
+        for produto_id, tipo_movimento, quantidade in movimentos:
+            chave = (int(produto_id), tipo_movimento)
+            contagem, total = agregados.get(chave, (0, 0))
+            agregados[chave] = (contagem + 1, total + int(quantidade))
+
+        # Ordenado por chave para que lotes concorrentes travem as linhas na mesma ordem
+        cursor.executemany("""
+            INSERT INTO movimentos_resumo_diario
+            (dia, produto_id, tipo_movimento, movimentos, quantidade_total)
+            VALUES (CURRENT_DATE, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                movimentos = movimentos + VALUES(movimentos),
+                quantidade_total = quantidade_total + VALUES(quantidade_total)
+        """, [
+            (produto_id, tipo_movimento, contagem, total)
+            for (produto_id, tipo_movimento), (contagem, total) in sorted(agregados.items())
+        ])
+
+    @staticmethod
+    def totais(de=None, ate=None, agrupar=('dia',), produto_id=None, categoria_id=None):
+        """
+        Retorna totais agrupados a partir do resumo diário
+
+        Args:
+            de (str): Primeiro dia (YYYY-MM-DD), inclusive
+            ate (str): Último dia (YYYY-MM-DD), inclusive
+            agrupar (list): Dimensões entre dia, produto, categoria e tipo
+            produto_id, categoria_id: Filtros opcionais
+
+        Returns:
+            list: Um dicionário por grupo com movimentos, entradas, saidas e ajustes.
+            Em ajustes a quantidade é o valor definido, não uma variação.
+        """
+        invalidas = [d for d in agrupar if d not in ResumoMovimento.DIMENSOES]
+        if invalidas:
+            raise ValueError(f"Agrupamentos inválidos: {', '.join(invalidas)}")
+
+        colunas = []
+        for dimensao in agrupar:
+            colunas.extend(ResumoMovimento.DIMENSOES[dimensao])
+
+        selecao = [f"{c} AS {ResumoMovimento.ALIASES.get(c, c.split('.')[1])}" for c in colunas]
+        selecao += [
+            "SUM(r.movimentos) AS movimentos",
+            "SUM(CASE WHEN r.tipo_movimento = 'entrada' THEN r.quantidade_total ELSE 0 END) AS entradas",
+            "SUM(CASE WHEN r.tipo_movimento = 'saida' THEN r.quantidade_total ELSE 0 END) AS saidas",
+            "SUM(CASE WHEN r.tipo_movimento = 'ajuste' THEN r.quantidade_total ELSE 0 END) AS ajustes",
+        ]
+        query = f"SELECT {', '.join(selecao)} FROM movimentos_resumo_diario r"
+        if 'produto' in agrupar or 'categoria' in agrupar or categoria_id:
+            query += " JOIN produtos p ON r.produto_id = p.id"
+        if 'categoria' in agrupar:
+            query += " JOIN categorias c ON p.categoria_id = c.id"
+
+        condicoes = []
+        params = []
+        if de:
+            condicoes.append("r.dia >= %s")
+            params.append(datetime.date.fromisoformat(de))
+        if ate:
+            condicoes.append("r.dia <= %s")
+            params.append(datetime.date.fromisoformat(ate))
+        if produto_id:
+            condicoes.append("r.produto_id = %s")
+            params.append(produto_id)
+        if categoria_id:
+            condicoes.append("p.categoria_id = %s")
+            params.append(categoria_id)
+        if condicoes:
+            query += " WHERE " + " AND ".join(condicoes)
+
+        if colunas:
+            query += " GROUP BY " + ", ".join(colunas) + " ORDER BY " + ", ".join(colunas)
+
+        return Database.execute_query(query, tuple(params), fetch=True)
+
+    @staticmethod
+    def reconstruir(de=None, ate=None):
+        """
+        Recalcula o resumo a partir de movimentos_estoque
+
+        Os meses já arquivados em disco não estão mais em movimentos_estoque:
+        o intervalo começa, no mínimo, no primeiro mês ainda no MySQL, para não
+        apagar o resumo deles.
+
+        Args:
+            de (str): Primeiro dia a recalcular (YYYY-MM-DD); todo o histórico se omitido
+            ate (str): Último dia a recalcular (YYYY-MM-DD), inclusive
+
+        Returns:
+            int: Linhas gravadas no resumo
+        """
+        condicoes_resumo = []
+        condicoes_mov = []
+        params = []
+        inicio = datetime.date.fromisoformat(de) if de else None
+        limite_quente = arquivo_movimentos.limite_quente()
+        if limite_quente and (inicio is None or inicio < limite_quente.date()):
+            inicio = limite_quente.date()
+        if inicio:
+            condicoes_resumo.append("dia >= %s")
+            condicoes_mov.append("data_movimento >= %s")
+            params.append(inicio)
+        if ate:
+            fim = datetime.date.fromisoformat(ate) + datetime.timedelta(days=1)
+            if inicio and fim <= inicio:
+                return 0
+            condicoes_resumo.append("dia < %s")
+            condicoes_mov.append("data_movimento < %s")
+            params.append(fim)
+
+        where_resumo = (" WHERE " + " AND ".join(condicoes_resumo)) if condicoes_resumo else ""
+        where_mov = (" WHERE " + " AND ".join(condicoes_mov)) if condicoes_mov else ""
+
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            conn.start_transaction()
+            cursor.execute("DELETE FROM movimentos_resumo_diario" + where_resumo, tuple(params))
+            cursor.execute(f"""
+                INSERT INTO movimentos_resumo_diario
+                (dia, produto_id, tipo_movimento, movimentos, quantidade_total)
+                SELECT DATE(data_movimento), produto_id, tipo_movimento, COUNT(*), SUM(quantidade)
+                FROM movimentos_estoque
+                {where_mov}
+                GROUP BY DATE(data_movimento), produto_id, tipo_movimento
+            """, tuple(params))
+            gravadas = cursor.rowcount
+            conn.commit()
+            return gravadas
+        except Exception as e:
+            conn.rollback()
+            print(f"Erro ao reconstruir resumo de movimentos: {e}")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
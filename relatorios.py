@@ -0,0 +1,20 @@
+# relatorios.py
+import argparse
+
+from models import ResumoMovimento
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manutenção do resumo diário de movimentos")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    reconstruir = subcomandos.add_parser(
+        "reconstruir", help="Recalcula o resumo a partir de movimentos_estoque"
+    )
+    reconstruir.add_argument("--de", help="Primeiro dia (YYYY-MM-DD); todo o histórico se omitido")
+    reconstruir.add_argument("--ate", help="Último dia (YYYY-MM-DD), inclusive")
+    args = parser.parse_args()
+
+    if args.comando == "reconstruir":
+        gravadas = ResumoMovimento.reconstruir(de=args.de, ate=args.ate)
+        print(f"Resumo reconstruído: {gravadas} linhas gravadas")
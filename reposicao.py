@@ -0,0 +1,323 @@
+# reposicao.py
+"""
+Ponto de reposição sugerido a partir do histórico de saídas.
+
+python reposicao.py calcular (agendado diariamente) lê as saídas dos últimos
+REPOSICAO_JANELA_DIAS dias completos, soma por produto e dia e calcula, para
+todos os produtos de uma vez:
+
+- demanda_media: saída média por dia, contando os dias sem saída
+- demanda_desvio: desvio padrão da saída diária
+- estoque_seguranca = z * demanda_desvio * raiz(prazo), com z do nível de serviço
+- ponto_reposicao = teto(demanda_media * prazo + estoque_seguranca)
+
+O resultado fica em reposicao_calculos/reposicao_sugerida e é exposto em
+GET /produtos/reposicao. Com --aplicar (ou POST /produtos/reposicao/aplicar),
+quantidade_minima passa a ser o ponto de reposição sugerido, o que alimenta
+a lista de estoque baixo e os alertas. Produtos com menos de
+REPOSICAO_MIN_DIAS_COM_SAIDA dias com saída na janela (ex: recém-cadastrados,
+que teriam ponto 0) ficam de fora da aplicação, a menos que o mínimo seja 0.
+"""
+import argparse
+import datetime
+import itertools
+import math
+import os
+import time
+from statistics import NormalDist
+
+import numpy as np
+from dotenv import load_dotenv
+
+from arquivo import arquivo_movimentos
+from database import Database
+from models import Produto, montar_pagina
+from utils import decodificar_cursor
+
+load_dotenv()
+
+REPOSICAO_JANELA_DIAS = int(os.getenv("REPOSICAO_JANELA_DIAS", 90))
+REPOSICAO_PRAZO_DIAS = float(os.getenv("REPOSICAO_PRAZO_DIAS", 7))
+REPOSICAO_NIVEL_SERVICO = float(os.getenv("REPOSICAO_NIVEL_SERVICO", 0.95))
+REPOSICAO_MIN_DIAS_COM_SAIDA = int(os.getenv("REPOSICAO_MIN_DIAS_COM_SAIDA", 1))
+
+# Saídas já somadas por produto e dia pelo MySQL: uma linha por (produto, dia) com saída
+QUERY_SAIDAS_POR_DIA = """
+    SELECT produto_id, DATEDIFF(data_movimento, %s) AS dia, SUM(quantidade)
+    FROM movimentos_estoque
+    WHERE tipo_movimento = 'saida' AND data_movimento >= %s AND data_movimento < %s
+    GROUP BY produto_id, dia
+"""
+
+
+def _matriz(linhas, colunas):
+    """Converte as tuplas do cursor numa matriz de int64 (sem um objeto numpy por linha)"""
+    valores = itertools.chain.from_iterable(linhas)
+    return np.fromiter(valores, dtype=np.int64, count=len(linhas) * colunas).reshape(-1, colunas)
+
+
+def carregar_saidas(inicio, janela_dias):
+    """
+    Saídas de [inicio, inicio + janela_dias) como vetores por (produto, dia)
+
+    Os meses arquivados (ver arquivo.py) vêm das colunas em disco, com o dia
+    calculado sobre a data; os dias repetidos entre as duas fontes são somados
+    no cálculo.
+
+    Returns:
+        tuple: (produto_id, dia desde `inicio`, quantidade) como np.ndarray de int64
+    """
+    fim = inicio + datetime.timedelta(days=janela_dias)
+    linhas = Database.execute_query(QUERY_SAIDAS_POR_DIA, (inicio, inicio, fim), fetch=True, tuplas=True)
+    quentes = _matriz(linhas, 3)
+
+    produtos, datas, quantidades = arquivo_movimentos.movimentos_do_tipo('saida', inicio, fim)
+    dias = (datas - np.datetime64(inicio, 's')) // np.timedelta64(1, 'D')
+    return (
+        np.concatenate([quentes[:, 0], produtos]),
+        np.concatenate([quentes[:, 1], dias.astype(np.int64)]),
+        np.concatenate([quentes[:, 2], quantidades]),
+    )
+
+
+def calcular_pontos(ids, produtos, dias, quantidades, janela_dias, prazo_dias, nivel_servico):
+    """
+    Demanda diária e ponto de reposição de cada produto, de forma vetorizada
+
+    Args:
+        ids (np.ndarray): Ids dos produtos, ordenados
+        produtos, dias, quantidades (np.ndarray): Saídas por produto e dia (dias
+            podem se repetir; entradas fora da janela ou de produtos
+            desconhecidos são ignoradas)
+        janela_dias (int): Dias da janela, inclusive os sem saída
+        prazo_dias (float): Prazo de reposição em dias
+        nivel_servico (float): Probabilidade de não faltar estoque durante o prazo
+
+    Returns:
+        dict: Um np.ndarray por coluna, alinhado com `ids`
+    """
+    n = len(ids)
+    # Posição de cada id numa tabela direta: um acesso por saída em vez de uma busca binária
+    posicao = np.full(int(ids[-1]) + 1 if n else 1, -1, dtype=np.int64)
+    posicao[ids] = np.arange(n)
+    validos = (produtos >= 0) & (produtos < len(posicao)) & (dias >= 0) & (dias < janela_dias)
+    indices = np.full(len(produtos), -1, dtype=np.int64)
+    indices[validos] = posicao[produtos[validos]]
+    validos &= indices >= 0
+    indices, dias, quantidades = indices[validos], dias[validos], quantidades[validos]
+
+    # Uma posição por (produto, dia): soma as partes do mesmo dia antes de elevar ao quadrado
+    chaves, posicoes = np.unique(indices * janela_dias + dias, return_inverse=True)
+    por_dia = np.bincount(posicoes, weights=quantidades)
+    produto_do_dia = chaves // janela_dias
+
+    soma = np.bincount(produto_do_dia, weights=por_dia, minlength=n)
+    soma_quadrados = np.bincount(produto_do_dia, weights=por_dia * por_dia, minlength=n)
+    dias_com_saida = np.bincount(produto_do_dia, minlength=n)
+
+    media = soma / janela_dias
+    desvio = np.sqrt(np.maximum(soma_quadrados / janela_dias - media * media, 0.0))
+    z = max(NormalDist().inv_cdf(nivel_servico), 0.0)
+    seguranca = z * desvio * math.sqrt(prazo_dias)
+    return {
+        'demanda_media': media,
+        'demanda_desvio': desvio,
+        'dias_com_saida': dias_com_saida,
+        'estoque_seguranca': np.ceil(seguranca).astype(np.int64),
+        'ponto_reposicao': np.ceil(media * prazo_dias + seguranca).astype(np.int64),
+    }
+
+
+def calcular(janela_dias=REPOSICAO_JANELA_DIAS, prazo_dias=REPOSICAO_PRAZO_DIAS,
+             nivel_servico=REPOSICAO_NIVEL_SERVICO, tamanho_lote=5000):
+    """
+    Calcula e grava o ponto de reposição sugerido de todos os produtos
+
+    Returns:
+        dict: {'id', 'calculado_em', 'produtos', 'saidas', 'tempo_calculo'}
+
+    Raises:
+        ValueError: Se algum parâmetro for inválido
+    """
+    if janela_dias < 1 or prazo_dias <= 0 or not 0 < nivel_servico < 1:
+        raise ValueError("Use janela >= 1 dia, prazo > 0 e nível de serviço entre 0 e 1")
+
+    calculado_em = datetime.datetime.now().replace(microsecond=0)
+    # Só dias completos: a janela termina no início de hoje
+    inicio = datetime.datetime.combine(calculado_em.date(), datetime.time()) - datetime.timedelta(days=janela_dias)
+
+    ids = _matriz(Database.execute_query("SELECT id FROM produtos ORDER BY id", fetch=True, tuplas=True), 1)[:, 0]
+    produtos, dias, quantidades = carregar_saidas(inicio, janela_dias)
+
+    comeco = time.perf_counter()
+    pontos = calcular_pontos(ids, produtos, dias, quantidades, janela_dias, prazo_dias, nivel_servico)
+    tempo_calculo = time.perf_counter() - comeco
+
+    conn = Database.get_connection()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute("""
+            INSERT INTO reposicao_calculos (calculado_em, janela_dias, prazo_dias, nivel_servico)
+            VALUES (%s, %s, %s, %s)
+        """, (calculado_em, janela_dias, prazo_dias, nivel_servico))
+        calculo_id = cursor.lastrowid
+
+        linhas = list(zip(
+            ids.tolist(), pontos['demanda_media'].tolist(), pontos['demanda_desvio'].tolist(),
+            pontos['dias_com_saida'].tolist(), pontos['estoque_seguranca'].tolist(),
+            pontos['ponto_reposicao'].tolist(),
+        ))
+        for i in range(0, len(linhas), tamanho_lote):
+            cursor.executemany("""
+                INSERT INTO reposicao_sugerida
+                (calculo_id, produto_id, demanda_media, demanda_desvio, dias_com_saida,
+                 estoque_seguranca, ponto_reposicao)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [(calculo_id,) + linha for linha in linhas[i:i + tamanho_lote]])
+
+        # Só o último cálculo é consultado e aplicado
+        cursor.execute("DELETE FROM reposicao_sugerida WHERE calculo_id < %s", (calculo_id,))
+        cursor.execute("DELETE FROM reposicao_calculos WHERE id < %s", (calculo_id,))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao gravar pontos de reposição: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        'id': calculo_id,
+        'calculado_em': calculado_em,
+        'produtos': len(ids),
+        'saidas': int(quantidades.sum()),
+        'tempo_calculo': tempo_calculo,
+    }
+
+
+def ultimo_calculo():
+    """Parâmetros do cálculo mais recente, ou None se nunca houve cálculo"""
+    calculos = Database.execute_query(
+        "SELECT * FROM reposicao_calculos ORDER BY id DESC LIMIT 1", fetch=True
+    )
+    return calculos[0] if calculos else None
+
+
+def listar_sugestoes(limite=None, apos=None, divergentes=False):
+    """
+    Sugestões do último cálculo, com o estoque e o mínimo atuais de cada produto
+
+    Args:
+        limite (int): Tamanho da página em ordem de produto_id (todas se None)
+        apos (str): Cursor retornado na página anterior
+        divergentes (bool): Só produtos cujo mínimo difere do sugerido
+
+    Returns:
+        dict: {'calculo', 'itens', 'next_cursor'}
+    """
+    calculo = ultimo_calculo()
+    if calculo is None:
+        return {'calculo': None, 'itens': [], 'next_cursor': None}
+
+    query = """
+        SELECT r.produto_id, p.nome, p.quantidade, p.quantidade_minima,
+               r.demanda_media, r.demanda_desvio, r.dias_com_saida,
+               r.estoque_seguranca, r.ponto_reposicao
+        FROM reposicao_sugerida r
+        JOIN produtos p ON p.id = r.produto_id
+        WHERE r.calculo_id = %s
+    """
+    params = [calculo['id']]
+    if divergentes:
+        query += " AND p.quantidade_minima <> r.ponto_reposicao"
+    if apos:
+        (produto_id,) = decodificar_cursor(apos, 1)
+        query += " AND r.produto_id > %s"
+        params.append(produto_id)
+    query += " ORDER BY r.produto_id"
+    if limite is not None:
+        query += " LIMIT %s"
+        params.append(limite + 1)
+
+    itens = Database.execute_query(query, tuple(params), fetch=True)
+    if limite is None:
+        return {'calculo': calculo, 'itens': itens, 'next_cursor': None}
+    return dict(montar_pagina(itens, limite, ('produto_id',)), calculo=calculo)
+
+
+def aplicar_sugestoes(produto_ids=None, min_dias_com_saida=REPOSICAO_MIN_DIAS_COM_SAIDA):
+    """
+    Grava o ponto de reposição do último cálculo como quantidade_minima, num único UPDATE
+
+    Args:
+        produto_ids (list): Restringe a estes produtos (todos se None)
+        min_dias_com_saida (int): Histórico mínimo para aplicar a sugestão; produtos
+            com menos dias com saída mantêm o mínimo atual (0 aplica a todos)
+
+    Returns:
+        int: Produtos cujo mínimo mudou
+    """
+    if produto_ids is not None and not produto_ids:
+        return 0
+    calculo = ultimo_calculo()
+    if calculo is None:
+        raise ValueError("Nenhum cálculo de reposição disponível: rode python reposicao.py calcular")
+
+    query = """
+        UPDATE produtos p
+        JOIN reposicao_sugerida r ON r.produto_id = p.id
+        SET p.quantidade_minima = r.ponto_reposicao
+        WHERE r.calculo_id = %s AND p.quantidade_minima <> r.ponto_reposicao
+          AND r.dias_com_saida >= %s
+    """
+    params = [calculo['id'], max(int(min_dias_com_saida), 0)]
+    if produto_ids:
+        ids = [int(id_) for id_ in produto_ids]
+        query += f" AND p.id IN ({', '.join(['%s'] * len(ids))})"
+        params.extend(ids)
+
+    conn = Database.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, tuple(params))
+        atualizados = cursor.rowcount
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao aplicar pontos de reposição: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    if atualizados:
+        Produto.invalidar_cache(*(produto_ids or ()))
+    return atualizados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ponto de reposição sugerido por produto")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    calculo = subcomandos.add_parser("calcular", help="Calcula e grava as sugestões de todos os produtos")
+    calculo.add_argument("--janela", type=int, default=REPOSICAO_JANELA_DIAS, help="Dias de histórico")
+    calculo.add_argument("--prazo", type=float, default=REPOSICAO_PRAZO_DIAS, help="Prazo de reposição em dias")
+    calculo.add_argument("--nivel-servico", type=float, default=REPOSICAO_NIVEL_SERVICO)
+    calculo.add_argument("--aplicar", action="store_true",
+                         help="Grava o ponto sugerido como quantidade_minima de cada produto")
+
+    aplicacao = subcomandos.add_parser("aplicar", help="Aplica as sugestões do último cálculo em quantidade_minima")
+    for subcomando in (calculo, aplicacao):
+        subcomando.add_argument("--min-dias", type=int, default=REPOSICAO_MIN_DIAS_COM_SAIDA,
+                                help="Dias com saída exigidos para aplicar (0 aplica a todos)")
+    args = parser.parse_args()
+
+    if args.comando == "calcular":
+        resultado = calcular(args.janela, args.prazo, args.nivel_servico)
+        print(f"Cálculo {resultado['id']}: {resultado['produtos']} produtos, "
+              f"{resultado['saidas']} unidades de saída em {args.janela} dias "
+              f"({resultado['tempo_calculo'] * 1000:.0f} ms de cálculo)")
+    if args.comando == "aplicar" or getattr(args, 'aplicar', False):
+        print(f"{aplicar_sugestoes(min_dias_com_saida=args.min_dias)} produtos com quantidade_minima atualizada")
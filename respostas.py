@@ -0,0 +1,224 @@
+# respostas.py
+"""
+Serialização JSON e compressão das respostas, comuns a app.py e app_async.py.
+
+- ProvedorJSONRapido: provedor JSON do Flask/Quart sobre o orjson, com o
+  mesmo formato do provedor padrão (datas no formato HTTP, Decimal como
+  string); datas em ISO 8601 só com JSON_DATAS=iso.
+- Compressão gzip/brotli negociada pelo Accept-Encoding, aplicada às
+  respostas de texto acima de COMPRESSAO_MIN_BYTES (e a todas as respostas
+  em streaming, cujo tamanho não se conhece de antemão).
+"""
+import datetime
+import decimal
+import os
+import uuid
+import zlib
+
+from dotenv import load_dotenv
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+load_dotenv()
+
+COMPRESSAO_ATIVA = os.getenv("COMPRESSAO", "1") == "1"
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", 1024))
+COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", 6))
+COMPRESSAO_NIVEL_BROTLI = int(os.getenv("COMPRESSAO_NIVEL_BROTLI", 4))
+
+# Tipos que compensam comprimir (imagens e afins já vêm comprimidos)
+TIPOS_COMPRIMIVEIS = {
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html',
+}
+
+
+# ------------------------
+# JSON
+# ------------------------
+def _padrao_orjson(obj):
+    """Tipos que o orjson não serializa sozinho (e datas, fora do modo ISO)"""
+    if isinstance(obj, datetime.date):
+        # Como no provedor padrão do Flask: "Wed, 01 May 2024 13:45:00 GMT"
+        return http_date(obj)
+    if isinstance(obj, datetime.time):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        # Como no provedor padrão: string, para não perder precisão em preços
+        return str(obj)
+    if isinstance(obj, (uuid.UUID, bytes)):
+        return obj.hex() if isinstance(obj, bytes) else str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+class ProvedorJSONRapido(JSONProvider):
+    """
+    Provedor JSON sobre o orjson
+
+    Por padrão gera o mesmo JSON do provedor do Flask: chaves em ordem
+    alfabética, datas no formato HTTP (ex: "Wed, 01 May 2024 13:45:00 GMT")
+    e Decimal como string. Com
+    datas_iso=True as datas saem em ISO 8601 (ex: "2024-05-01T13:45:00"),
+    serializadas pelo próprio orjson. A resposta é montada direto dos bytes
+    do orjson, sem passar por str.
+    """
+
+    mimetype = 'application/json'
+
+    def __init__(self, app, datas_iso=False):
+        super().__init__(app)
+        self.opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        if not datas_iso:
+            self.opcoes |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_padrao_orjson, option=self.opcoes).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        corpo = orjson.dumps(obj, default=_padrao_orjson, option=self.opcoes)
+        return self._app.response_class(corpo, mimetype=self.mimetype)
+
+
+def configurar_json(app):
+    """
+    Instala o provedor JSON escolhido em JSON_PROVEDOR: 'rapido' (orjson, padrão)
+    ou 'padrao' (o do Flask). Os dois geram datas no formato HTTP; JSON_DATAS=iso
+    troca para ISO 8601 no provedor rápido (muda o contrato da API para os clientes)
+    """
+    provedor = os.getenv("JSON_PROVEDOR", "rapido")
+    if provedor == "rapido" and orjson is None:
+        print("JSON_PROVEDOR=rapido requer o pacote orjson (pip install orjson); usando o provedor padrão")
+        provedor = "padrao"
+    if provedor == "rapido":
+        app.json = ProvedorJSONRapido(app, datas_iso=os.getenv("JSON_DATAS", "http") == "iso")
+    else:
+        app.json = DefaultJSONProvider(app)
+
+
+# ------------------------
+# COMPRESSÃO
+# ------------------------
+class Compressor:
+    """Interface única sobre zlib (gzip) e brotli para comprimir em partes"""
+
+    def __init__(self, codificacao):
+        self.codificacao = codificacao
+        if codificacao == 'br':
+            self._compressor = brotli.Compressor(quality=COMPRESSAO_NIVEL_BROTLI)
+            self._comprimir = self._compressor.process
+            self._finalizar = self._compressor.finish
+        else:
+            # wbits=31: formato gzip (cabeçalho e CRC), não zlib puro
+            self._compressor = zlib.compressobj(COMPRESSAO_NIVEL_GZIP, zlib.DEFLATED, 31)
+            self._comprimir = self._compressor.compress
+            self._finalizar = self._compressor.flush
+
+    def comprimir(self, dados):
+        if isinstance(dados, str):
+            dados = dados.encode('utf-8')
+        return self._comprimir(dados)
+
+    def finalizar(self):
+        return self._finalizar()
+
+    def tudo(self, dados):
+        return self.comprimir(dados) + self.finalizar()
+
+
+def codificacao_aceita(request):
+    """Escolhe br ou gzip conforme o Accept-Encoding do cliente (None se nenhum)"""
+    opcoes = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(opcoes)
+
+
+def _comprimivel(resposta):
+    """Indica se a resposta é candidata a compressão e marca o Vary"""
+    if not COMPRESSAO_ATIVA or resposta.status_code < 200 or resposta.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in resposta.headers or resposta.mimetype not in TIPOS_COMPRIMIVEIS:
+        return False
+    # A representação depende do Accept-Encoding, mesmo quando não comprimida
+    resposta.vary.add('Accept-Encoding')
+    return True
+
+
+def _comprimir_partes(partes, compressor, original):
+    try:
+        for parte in partes:
+            dados = compressor.comprimir(parte)
+            if dados:
+                yield dados
+        yield compressor.finalizar()
+    finally:
+        # Repassa o encerramento (ex: cliente desconectou) ao corpo original, e não
+        # só ao iter_encoded que o envolve, para liberar a conexão do banco na hora
+        if hasattr(original, 'close'):
+            original.close()
+
+
+def comprimir_resposta(resposta, request):
+    """Comprime uma resposta do Flask (after_request), inclusive em streaming"""
+    if not _comprimivel(resposta):
+        return resposta
+    codificacao = codificacao_aceita(request)
+    if codificacao is None:
+        return resposta
+
+    if resposta.is_streamed:
+        resposta.response = _comprimir_partes(resposta.iter_encoded(), Compressor(codificacao), resposta.response)
+        resposta.headers.pop('Content-Length', None)
+    else:
+        dados = resposta.get_data()
+        if len(dados) < COMPRESSAO_MIN_BYTES:
+            return resposta
+        resposta.set_data(Compressor(codificacao).tudo(dados))
+    resposta.headers['Content-Encoding'] = codificacao
+    return resposta
+
+
+async def _comprimir_partes_async(corpo, compressor):
+    async with corpo as partes:
+        async for parte in partes:
+            dados = compressor.comprimir(parte)
+            if dados:
+                yield dados
+    yield compressor.finalizar()
+
+
+async def comprimir_resposta_async(resposta, request):
+    """Mesma compressão de comprimir_resposta, para respostas do Quart"""
+    from quart.wrappers.response import DataBody, IterableBody
+
+    if not _comprimivel(resposta):
+        return resposta
+    codificacao = codificacao_aceita(request)
+    if codificacao is None:
+        return resposta
+
+    if isinstance(resposta.response, DataBody):
+        dados = await resposta.get_data()
+        if len(dados) < COMPRESSAO_MIN_BYTES:
+            return resposta
+        resposta.set_data(Compressor(codificacao).tudo(dados))
+    elif isinstance(resposta.response, IterableBody):
+        resposta.response = IterableBody(_comprimir_partes_async(resposta.response, Compressor(codificacao)))
+        resposta.headers.pop('Content-Length', None)
+    else:
+        return resposta
+    resposta.headers['Content-Encoding'] = codificacao
+    return resposta
@@ -0,0 +1,101 @@
+# senhas.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class ErroSobrecarga(Exception):
+    """Levantada quando a fila de hashing está cheia"""
+
+
+class ServicoSenhas:
+    """
+    Executa o bcrypt num pool de threads limitado.
+
+    O bcrypt libera o GIL, então as threads usam CPUs de verdade; o limite de
+    threads e de fila impede que uma rajada de logins tome todos os núcleos
+    do worker e deixe o restante da API sem CPU.
+
+    Args:
+        custo (int): Fator de custo do bcrypt para novos hashes
+        max_threads (int): Hashes calculados em paralelo
+        max_fila (int): Pedidos aguardando thread livre antes de recusar novos
+    """
+
+    def __init__(self, custo=12, max_threads=2, max_fila=32):
+        self.custo = custo
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="bcrypt")
+        self._vagas = threading.BoundedSemaphore(max_threads + max_fila)
+        self._lock = threading.Lock()
+        self._stats = {
+            'pendentes': 0,
+            'max_pendentes': 0,
+            'concluidos': 0,
+            'recusados': 0,
+            'rehashes': 0,
+            'tempo_total': 0.0,
+        }
+
+    def _executar(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self._stats['recusados'] += 1
+            raise ErroSobrecarga("Muitas requisições de autenticação em andamento")
+
+        with self._lock:
+            self._stats['pendentes'] += 1
+            self._stats['max_pendentes'] = max(self._stats['max_pendentes'], self._stats['pendentes'])
+        inicio = time.monotonic()
+        try:
+            return self._executor.submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
+            with self._lock:
+                self._stats['pendentes'] -= 1
+                self._stats['concluidos'] += 1
+                self._stats['tempo_total'] += time.monotonic() - inicio
+
+    def gerar_hash(self, senha):
+        """Gera o hash bcrypt de uma senha com o custo configurado"""
+        return self._executar(
+            lambda: bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(self.custo)).decode('utf-8')
+        )
+
+    def verificar(self, senha, senha_hash):
+        """Confere uma senha com o hash armazenado"""
+        return self._executar(
+            lambda: bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('utf-8'))
+        )
+
+    def precisa_rehash(self, senha_hash):
+        """Indica se o hash foi gerado com um custo diferente do configurado"""
+        try:
+            return int(senha_hash.split('$')[2]) != self.custo
+        except (IndexError, ValueError):
+            return True
+
+    def registrar_rehash(self):
+        """Conta um hash regravado após mudança de custo"""
+        with self._lock:
+            self._stats['rehashes'] += 1
+
+    def estatisticas(self):
+        """Retorna profundidade da fila, contadores e tempo médio por hash"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['tempo_medio'] = stats['tempo_total'] / stats['concluidos'] if stats['concluidos'] else 0.0
+        stats['custo'] = self.custo
+        return stats
+
+
+servico_senhas = ServicoSenhas(
+    custo=int(os.getenv("BCRYPT_CUSTO", 12)),
+    max_threads=int(os.getenv("BCRYPT_THREADS", 2)),
+    max_fila=int(os.getenv("BCRYPT_FILA", 32)),
+)
@@ -0,0 +1,45 @@
+# tests/test_planos.py
+"""
+Confere com EXPLAIN que as consultas de Movimento.consulta_com_filtros usam os
+índices de migracoes.PLANOS_ESPERADOS.
+
+Precisa de um MySQL com as migrações aplicadas (variáveis MYSQL* ou .env) e,
+de preferência, com dados em volume realista; sem MySQL configurado o teste
+é pulado. Rode da raiz do projeto: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sem o driver (ou o python-dotenv) o módulo é pulado em vez de falhar na coleta
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+
+# database.py carrega o .env
+from database import Database
+from migracoes import PLANOS_ESPERADOS, conferir_plano
+
+
+@pytest.fixture(scope="module")
+def banco():
+    if not os.getenv("MYSQLHOST"):
+        pytest.skip("MySQL não configurado (defina MYSQLHOST)")
+    try:
+        Database.execute_query("SELECT 1", fetch=True)
+    except Exception as e:
+        pytest.skip(f"MySQL indisponível: {e}")
+    return Database
+
+
+def _descricao(plano):
+    filtros, _ = plano
+    return "-".join(sorted(filtros))
+
+
+@pytest.mark.parametrize("filtros, esperados", PLANOS_ESPERADOS, ids=map(_descricao, PLANOS_ESPERADOS))
+def test_plano_usa_indices_esperados(banco, filtros, esperados):
+    falhas = conferir_plano(filtros, esperados)
+    assert not falhas, "\n".join(falhas)
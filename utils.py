@@ -1,13 +1,7 @@
 # utils.py
-import os
+import base64
+import json
 import re
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-
-# Carrega variáveis de ambiente
-load_dotenv()
 
 # Funções de validação
 def validar_email(email):
@@ -48,101 +42,70 @@ def validar_campos_obrigatorios(dados, campos):
     
     return True, "Dados válidos"
 
-# Funções para envio de email
-def enviar_email(destinatario, assunto, mensagem):
+# Funções de paginação
+def codificar_cursor(valores):
     """
-    Envia um email usando as configurações do arquivo .env
-    
+    Codifica os valores da chave de ordenação do último item em um cursor opaco
+
     Args:
-        destinatario (str): Email do destinatário
-        assunto (str): Assunto do email
-        mensagem (str): Corpo do email (pode conter HTML)
-        
+        valores (list): Valores das colunas de ordenação (ex: [nome, id])
+
     Returns:
-        bool: True se o email foi enviado com sucesso, False caso contrário
+        str: Cursor em base64 url-safe
     """
-    # Verificar se as configurações de email estão disponíveis
-    email_host = os.getenv("EMAIL_HOST")
-    email_port = os.getenv("EMAIL_PORT")
-    email_user = os.getenv("EMAIL_USER")
-    email_password = os.getenv("EMAIL_PASSWORD")
-
-    print('pqp', {email_host, email_port, email_user, email_password})
-    
-    if not all([email_host, email_port, email_user, email_password]):
-        print("Configurações de email incompletas. Verifique o arquivo .env")
-        return False
-    
-    # Criar mensagem
-    msg = MIMEMultipart()
-    msg['From'] = email_user
-    msg['To'] = destinatario
-    msg['Subject'] = assunto
-    
-    # Adicionar corpo da mensagem
-    msg.attach(MIMEText(mensagem, 'html'))
-    
-    try:
-        # Conectar ao servidor SMTP
-        server = smtplib.SMTP(email_host, int(email_port))
-        server.starttls()  # Iniciar conexão segura
-        server.login(email_user, email_password)
-        
-        # Enviar email
-        server.send_message(msg)
-        server.quit()
-        print(f"Email enviado com sucesso para {destinatario}")
-        return True
-    except Exception as e:
-        print(f"Erro ao enviar email: {e}")
-        return False
+    bruto = json.dumps(valores, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode('utf-8')).decode('ascii').rstrip('=')
 
-def alertar_estoque_baixo(produto, usuario_email):
+def decodificar_cursor(cursor, tamanho):
     """
-    Envia um email de alerta quando o estoque está abaixo do mínimo
-    
+    Decodifica um cursor gerado por codificar_cursor
+
     Args:
-        produto (dict): Dados do produto com estoque baixo
-        usuario_email (str): Email do usuário que receberá o alerta
-    """
-    assunto = f"ALERTA: Estoque baixo do produto {produto['nome']}"
-    
-    mensagem = f"""
-    <html>
-    <body>
-        <h2>Alerta de Estoque Baixo</h2>
-        <p>O produto <strong>{produto['nome']}</strong> está com estoque baixo!</p>
-        
-        <h3>Detalhes do Produto:</h3>
-        <ul>
-            <li><strong>ID:</strong> {produto['id']}</li>
-            <li><strong>Nome:</strong> {produto['nome']}</li>
-            <li><strong>Categoria:</strong> {produto.get('categoria_nome', 'N/A')}</li>
-            <li><strong>Quantidade Atual:</strong> {produto['quantidade']}</li>
-            <li><strong>Quantidade Mínima:</strong> {produto['quantidade_minima']}</li>
-        </ul>
-        
-        <p>Por favor, verifique e reponha o estoque quando possível.</p>
-    </body>
-    </html>
+        cursor (str): Cursor recebido do cliente
+        tamanho (int): Quantidade de valores esperada
+
+    Returns:
+        list: Valores da chave de ordenação
+
+    Raises:
+        ValueError: Se o cursor for inválido
     """
-    
-    return enviar_email(usuario_email, assunto, mensagem)
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        raise ValueError("Cursor inválido")
+    return valores
+
+def projetar_campos(itens, campos):
+    """Mantém em cada item apenas os campos solicitados"""
+    if not campos:
+        return itens
+    return [{campo: item[campo] for campo in campos if campo in item} for item in itens]
 
-def verificar_enviar_alertas(usuario_email):
+def linhas_para_json(colunas, linhas, dumps, lote=500):
     """
-    Verifica produtos com estoque baixo e envia alertas
-    
+    Serializa linhas (tuplas na ordem de `colunas`) como um array JSON de objetos,
+    em blocos, sem montar a lista de dicionários
+
     Args:
-        usuario_email (str): Email do usuário que receberá os alertas
+        colunas (tuple): Nomes das colunas
+        linhas (iterable): Tuplas do cursor
+        dumps (callable): Serializa um objeto (ex: app.json.dumps, como no jsonify)
+        lote (int): Linhas por bloco entregue
+
+    Yields:
+        str: Trechos do documento JSON
     """
-    from models import Produto
-    
-    produtos_baixos = Produto.produtos_com_estoque_baixo()
-    
-    if not produtos_baixos:
-        print("Nenhum produto com estoque baixo encontrado")
-        return
-    
-    for produto in produtos_baixos:
-        alertar_estoque_baixo(produto, usuario_email)
\ No newline at end of file
+    partes = ["["]
+    separador = ""
+    for linha in linhas:
+        partes.append(separador + dumps(dict(zip(colunas, linha))))
+        separador = ","
+        if len(partes) >= lote:
+            yield "".join(partes)
+            partes = []
+    partes.append("]")
+    yield "".join(partes)